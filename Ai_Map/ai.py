@@ -4,25 +4,41 @@
 
 import streamlit as st
 import json
+import asyncio
 import openai
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderTimedOut, GeocoderUnavailable
-from geopy.distance import geodesic # Utilise geodesic pour des distances plus précises
+from geopy.extra.rate_limiter import RateLimiter
 import folium
 from streamlit_folium import st_folium # Pour mieux intégrer Folium dans Streamlit
+import streamlit.components.v1 as components
 import os
-import pandas as pd
-import uuid
-import io # Ajouté pour le buffer Excel en mémoire
+import sys
+import hashlib
+from index_spatial import IndexSpatial # Grille spatiale pour éviter de parcourir tous les cinémas
+from moteur_distances import TableCinemas # Colonnes NumPy + haversine vectorisé
+from chargement_cinemas import charger_cinemas, charger_cinemas_base # Cinémas typés + cache binaire
+from allocation_salles import AllocateurSalles, CRITERE_DISTANCE, CRITERE_SALLES # Allocation par objectif de spectateurs
+from carte_legere import generer_carte_legere, carte_en_html, SEUIL_CARTE_LEGERE # Carte regroupée pour les grands résultats
+from export_resultats import tableau_zone, classeur_excel # Tableaux par zone et classeur Excel en mémoire
+from preparation_plan import geocoder_localisations, lire_preparation, memoriser_preparation # Géocodage des zones, préparation mémorisée dans la session
+from cache_llm import CacheLLM, completion_avec_cache, completion_avec_cache_async # Réponses OpenAI mémorisées entre les sessions
+# Modules partagés avec les scripts de prétraitement (dossier Geocod)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Geocod"))
+from cache_geocodage import CacheGeocodage, geocoder_avec_cache # Cache SQLite persistant
+from communes_france import TableCommunes # Table hors ligne des communes
+from base_cinemas import CHEMIN_BASE_PAR_DEFAUT, BaseCinemas, date_modification # Base SQLite unique des cinémas
 
 # --- CONFIGURATION DE LA PAGE (DOIT ÊTRE LA PREMIÈRE COMMANDE STREAMLIT) ---
 st.set_page_config(layout="wide", page_title="Assistant Cinéma MK2", page_icon="🗺️")
 
 # --- Configuration (Variables globales) ---
 GEOCATED_CINEMAS_FILE = "cinemas_groupedBig.json"
+BASE_CINEMAS_FILE = CHEMIN_BASE_PAR_DEFAUT # Utilisée à la place du JSON si elle existe (python Geocod/base_cinemas.py importer ...)
 GEOCODER_USER_AGENT = "CinemaMapApp/1.0 (App)"
 GEOCODER_TIMEOUT = 10
+GEOCODER_THREADS = 8 # Géocodage parallèle des zones d'un plan
 
 # --- Initialisation du client OpenAI ---
 try:
@@ -35,21 +51,35 @@ except Exception as e:
     st.stop()
 
 # --- Chargement des données des cinémas pré-géocodées ---
+@st.cache_resource(show_spinner=False)
+def charger_donnees_cinemas(fichier: str, mtime: float):
+    """
+    Charge les cinémas normalisés depuis la base SQLite (.sqlite) ou le JSON regroupé
+    (cache binaire sur disque, voir chargement_cinemas.py) et construit la grille spatiale et la table NumPy (lat/lon/capacité max).
+    Mis en cache pour tout le processus : le cache est invalidé si le fichier change.
+    Retourne (cinemas, nb_ignores, index_spatial, table_cinemas, allocateur_salles).
+    """
+    if fichier.endswith(".sqlite"):
+        cinemas, nb_ignores = charger_cinemas_base(BaseCinemas(fichier))
+    else:
+        cinemas, nb_ignores = charger_cinemas(fichier)
+    table = TableCinemas(cinemas)
+    return cinemas, nb_ignores, IndexSpatial((c.lat, c.lon) for c in cinemas), table, AllocateurSalles(cinemas, table)
+
 cinemas_ignored_info = None
+source_cinemas = BASE_CINEMAS_FILE if os.path.exists(BASE_CINEMAS_FILE) else GEOCATED_CINEMAS_FILE
 try:
-    with open(GEOCATED_CINEMAS_FILE, "r", encoding="utf-8") as f:
-        cinemas_data = json.load(f)
-    original_count = len(cinemas_data)
-    cinemas_data = [c for c in cinemas_data if c.get('lat') is not None and c.get('lon') is not None]
-    valid_count = len(cinemas_data)
-    if original_count > valid_count:
-        cinemas_ignored_info = f"{original_count - valid_count} cinémas sans coordonnées valides ont été ignorés lors du chargement."
+    mtime_cinemas = date_modification(source_cinemas) if source_cinemas == BASE_CINEMAS_FILE else os.path.getmtime(source_cinemas)
+    cinemas_data, nb_cinemas_ignores, index_cinemas, table_cinemas, allocateur_salles = charger_donnees_cinemas(
+        source_cinemas, mtime_cinemas)
+    if nb_cinemas_ignores > 0:
+        cinemas_ignored_info = f"{nb_cinemas_ignores} cinémas sans coordonnées valides ont été ignorés lors du chargement."
 except FileNotFoundError:
-    st.error(f"ERREUR : Le fichier de données '{GEOCATED_CINEMAS_FILE}' est introuvable.")
+    st.error(f"ERREUR : Le fichier de données '{source_cinemas}' est introuvable.")
     st.error("Veuillez exécuter le script 'preprocess_cinemas.py' pour générer ce fichier.")
     st.stop()
 except json.JSONDecodeError:
-    st.error(f"ERREUR : Le fichier de données '{GEOCATED_CINEMAS_FILE}' contient un JSON invalide.")
+    st.error(f"ERREUR : Le fichier de données '{source_cinemas}' contient un JSON invalide.")
     st.stop()
 except Exception as e:
     st.error(f"Erreur inattendue lors du chargement des données des cinémas : {e}")
@@ -58,76 +88,110 @@ except Exception as e:
 # --- Initialisation du Géocodeur (pour les requêtes utilisateur) ---
 geolocator = Nominatim(user_agent=GEOCODER_USER_AGENT, timeout=GEOCODER_TIMEOUT)
 
+@st.cache_resource(show_spinner=False)
+def initialiser_geocodage():
+    """
+    Cache de géocodage SQLite (partagé avec Geocod/preprocess_cinemas.py) et table hors ligne
+    des communes. La table est optionnelle : sans elle, seul le cache évite le réseau.
+    """
+    try:
+        table = TableCommunes.charger()
+    except (OSError, ValueError, KeyError):
+        table = None
+    return CacheGeocodage(), table
+
+cache_geocodage, table_communes = initialiser_geocodage()
+
+@st.cache_resource(show_spinner=False)
+def initialiser_cache_llm():
+    """Cache SQLite des réponses OpenAI, partagé par toutes les sessions et instances."""
+    return CacheLLM()
+
+cache_llm = initialiser_cache_llm()
+
+def _plan_exploitable(reponse: str) -> bool:
+    """
+    Vrai si analyser_requete_ia pourra lire la réponse du plan (réponse entière, ou partie entre crochets
+    qu'elle extrait elle-même) : elle peut être mise en cache.
+    """
+    for partie in (reponse, reponse[reponse.find("["):reponse.rfind("]") + 1]):
+        try:
+            json.loads(partie)
+            return True
+        except json.JSONDecodeError:
+            pass
+    return False
+
+def _contexte_exploitable(reponse: str) -> bool:
+    """Vrai si la réponse entière est un objet JSON, comme le lit analyser_contexte_geographique."""
+    try:
+        return isinstance(json.loads(reponse), dict)
+    except json.JSONDecodeError:
+        return False
+
 # --- Fonctions ---
 
-@st.cache_data(show_spinner=False)
+SYSTEM_PROMPT_REQUETE = (
+    "Tu es un expert en distribution de films en salles en France. L'utilisateur te décrit un projet (test, avant-première, tournée, etc.).\n\n"
+
+    "🎯 Ton objectif : retourner une liste JSON valide de villes avec :\n"
+    "- \"localisation\" : une ville en France,\n"
+    "- \"nombre\" : nombre de spectateurs à atteindre,\n"
+    "- \"nombre_seances\" : (optionnel) nombre de séances prévues.\n\n"
+
+    "🎯 Si l'utilisateur précise un nombre de séances et une fourchette de spectateurs (ex : entre 30 000 et 40 000) :\n"
+    "- Choisis un total réaliste dans cette fourchette,\n"
+    "- Répartis ce total entre les villes proportionnellement au nombre de séances,\n"
+    "- Ne dépasse jamais le maximum, et ne descends jamais en dessous du minimum.\n\n"
+
+    "🎯 Si l'utilisateur précise seulement une fourchette de spectateurs pour une zone :\n"
+    "- Choisis un total dans la fourchette,\n"
+    "- Répartis les spectateurs équitablement entre les villes de cette zone,\n"
+    "- Suppose 1 séance par ville sauf indication contraire.\n\n"
+
+    "🎯 Si plusieurs zones sont mentionnées, génère plusieurs blocs JSON.\n\n"
+
+    "🗺️ Pour les zones vagues, utilise les remplacements suivants :\n"
+    "- 'idf', 'île-de-france', 'région parisienne' → ['île-de-france']\n"
+    "- 'sud', 'paca', 'sud de la France', 'provence' → ['Marseille', 'Toulouse', 'Nice']\n"
+    "- 'nord', 'hauts-de-france' → ['Lille']\n"
+    "- 'ouest', 'bretagne', 'normandie' → ['Nantes', 'Rennes', 'Amiens']\n"
+    "- 'est', 'grand est', 'alsace' → ['Strasbourg']\n"
+    "- 'centre', 'centre-val de loire', 'auvergne' → ['Clermont-Ferrand']\n"
+    "- 'France entière', 'toute la France', 'province', 'le territoire', 'le reste du territoire français' → [\n"
+    "   'Île-de-france', 'Lille', 'Strasbourg', 'Lyon', 'Marseille', 'Nice',\n"
+    "   'Toulouse', 'Montpellier', 'Bordeaux', 'Limoges', 'Nantes', 'Rennes',\n"
+    "   'Caen', 'Dijon', 'Clermont-Ferrand', 'Orléans', 'Besançon'\n"
+    "]\n\n"
+
+    "💡 Le résultat doit être une **liste JSON strictement valide** :\n"
+    "- Format : [{\"localisation\": \"Paris\", \"nombre\": 1000, \"nombre_seances\": 10}]\n"
+    "- Utilise des guillemets doubles,\n"
+    "- Mets des virgules entre les paires clé/valeur,\n"
+    "- Ne retourne **aucun texte en dehors** du JSON.\n\n"
+
+    "💡 Si aucun lieu ni objectif n'est identifiable, retourne simplement : []\n\n"
+
+    "🔐 Règle obligatoire :\n"
+    "- Le **nombre total de séances** (addition des \"nombre_seances\") doit correspondre **exactement** à ce que demande l'utilisateur,\n"
+    "- Ne t'arrête pas à une distribution ronde ou facile : ajuste si besoin pour que la somme soit strictement exacte."
+    "🔐 Règle stricte sur la fourchette :\n"
+    "- Si l'utilisateur donne une fourchette de spectateurs (ex : minimum 30 000, maximum 160 000),\n"
+    "- Alors le **nombre total de spectateurs** (toutes zones confondues) doit rester **strictement dans cette fourchette**.\n"
+    "- Tu ne dois **pas appliquer cette fourchette à une seule zone**, mais à l'ensemble de la demande.\n"
+)
 
-def analyser_requete_ia(question: str):
+def analyser_requete_ia(question: str, raw_response: str = None):
     """
     Interprète la requête de l'utilisateur en utilisant GPT-4o pour extraire
     les localisations et la fourchette de spectateurs cible.
     Retourne un tuple (liste_instructions, reponse_brute_ia) ou ([], "") en cas d'échec.
+    Les réponses sont mémorisées dans le cache persistant (requêtes identiques à la casse et aux espaces près).
+    raw_response : réponse déjà obtenue (appel asynchrone), seule l'interprétation est alors faite.
     """
-    system_prompt = (
-        "Tu es un expert en distribution de films en salles en France. L'utilisateur te décrit un projet (test, avant-première, tournée, etc.).\n\n"
-
-        "🎯 Ton objectif : retourner une liste JSON valide de villes avec :\n"
-        "- \"localisation\" : une ville en France,\n"
-        "- \"nombre\" : nombre de spectateurs à atteindre,\n"
-        "- \"nombre_seances\" : (optionnel) nombre de séances prévues.\n\n"
-
-        "🎯 Si l'utilisateur précise un nombre de séances et une fourchette de spectateurs (ex : entre 30 000 et 40 000) :\n"
-        "- Choisis un total réaliste dans cette fourchette,\n"
-        "- Répartis ce total entre les villes proportionnellement au nombre de séances,\n"
-        "- Ne dépasse jamais le maximum, et ne descends jamais en dessous du minimum.\n\n"
-
-        "🎯 Si l'utilisateur précise seulement une fourchette de spectateurs pour une zone :\n"
-        "- Choisis un total dans la fourchette,\n"
-        "- Répartis les spectateurs équitablement entre les villes de cette zone,\n"
-        "- Suppose 1 séance par ville sauf indication contraire.\n\n"
-
-        "🎯 Si plusieurs zones sont mentionnées, génère plusieurs blocs JSON.\n\n"
-
-        "🗺️ Pour les zones vagues, utilise les remplacements suivants :\n"
-        "- 'idf', 'île-de-france', 'région parisienne' → ['île-de-france']\n"
-        "- 'sud', 'paca', 'sud de la France', 'provence' → ['Marseille', 'Toulouse', 'Nice']\n"
-        "- 'nord', 'hauts-de-france' → ['Lille']\n"
-        "- 'ouest', 'bretagne', 'normandie' → ['Nantes', 'Rennes', 'Amiens']\n"
-        "- 'est', 'grand est', 'alsace' → ['Strasbourg']\n"
-        "- 'centre', 'centre-val de loire', 'auvergne' → ['Clermont-Ferrand']\n"
-        "- 'France entière', 'toute la France', 'province', 'le territoire', 'le reste du territoire français' → [\n"
-        "   'Île-de-france', 'Lille', 'Strasbourg', 'Lyon', 'Marseille', 'Nice',\n"
-        "   'Toulouse', 'Montpellier', 'Bordeaux', 'Limoges', 'Nantes', 'Rennes',\n"
-        "   'Caen', 'Dijon', 'Clermont-Ferrand', 'Orléans', 'Besançon'\n"
-        "]\n\n"
-
-        "💡 Le résultat doit être une **liste JSON strictement valide** :\n"
-        "- Format : [{\"localisation\": \"Paris\", \"nombre\": 1000, \"nombre_seances\": 10}]\n"
-        "- Utilise des guillemets doubles,\n"
-        "- Mets des virgules entre les paires clé/valeur,\n"
-        "- Ne retourne **aucun texte en dehors** du JSON.\n\n"
-
-        "💡 Si aucun lieu ni objectif n'est identifiable, retourne simplement : []\n\n"
-
-        "🔐 Règle obligatoire :\n"
-        "- Le **nombre total de séances** (addition des \"nombre_seances\") doit correspondre **exactement** à ce que demande l'utilisateur,\n"
-        "- Ne t'arrête pas à une distribution ronde ou facile : ajuste si besoin pour que la somme soit strictement exacte."
-        "🔐 Règle stricte sur la fourchette :\n"
-        "- Si l'utilisateur donne une fourchette de spectateurs (ex : minimum 30 000, maximum 160 000),\n"
-        "- Alors le **nombre total de spectateurs** (toutes zones confondues) doit rester **strictement dans cette fourchette**.\n"
-        "- Tu ne dois **pas appliquer cette fourchette à une seule zone**, mais à l'ensemble de la demande.\n"
-    )
-
-    raw_response = ""
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": question}
-            ]
-        )
-        raw_response = response.choices[0].message.content.strip()
+        if raw_response is None:
+            raw_response = completion_avec_cache(client, cache_llm, "gpt-4o", SYSTEM_PROMPT_REQUETE, question, valider=_plan_exploitable)
         try:
             data = json.loads(raw_response)
             if isinstance(data, dict) and "message" in data:
@@ -216,105 +280,144 @@ def analyser_requete_ia(question: str):
         st.error(f"Erreur inattendue : {e}")
         return [], raw_response
 
-def geo_localisation(adresse: str):
+CORRECTIONS_REGIONALES = {
+    "région parisienne": "Paris, France", "idf": "Paris, France", "île-de-france": "Paris, France", "ile de france": "Paris, France",
+    "sud": "Marseille, France", "le sud": "Marseille, France", "paca": "Marseille, France", "provence-alpes-côte d'azur": "Marseille, France",
+    "nord": "Lille, France", "le nord": "Lille, France", "hauts-de-france": "Lille, France",
+    "bretagne": "Rennes, France", "côte d'azur": "Nice, France",
+    "rhône-alpes": "Lyon, France", "auvergne-rhône-alpes": "Lyon, France",
+    "aquitaine": "Bordeaux, France", "nouvelle-aquitaine": "Bordeaux, France",
+    "alsace": "Strasbourg, France", "grand est": "Strasbourg, France",
+    "france": "Paris, France", "territoire français": "Paris, France",
+    "ouest": "Nantes, France", "normandie": "Rouen, France",
+    "centre": "Orléans, France", "centre-val de loire": "Orléans, France",
+    "auvergne": "Clermont-Ferrand, France"
+}
+
+# Nominatim limite à 1 requête/s : le limiteur (thread-safe) sérialise les vrais appels réseau,
+# les recherches résolues par la table des communes ou le cache ne l'attendent pas.
+geocode_limite = RateLimiter(geolocator.geocode, min_delay_seconds=1, max_retries=0, swallow_exceptions=False)
+
+def _geocoder_localisation(adresse: str):
     """
-    Tente de trouver les coordonnées (latitude, longitude) pour une adresse donnée
-    en utilisant Nominatim. Affiche les erreurs/warnings directement dans Streamlit.
-    Retourne un tuple (lat, lon) ou None si introuvable ou en cas d'erreur.
+    Géocode une localisation sans appel Streamlit (utilisable depuis un thread).
+    Retourne (coords, message) : coords (lat, lon) ou None, message = (niveau, texte) ou None.
     """
-    corrections = {
-        "région parisienne": "Paris, France", "idf": "Paris, France", "île-de-france": "Paris, France", "ile de france": "Paris, France",
-        "sud": "Marseille, France", "le sud": "Marseille, France", "paca": "Marseille, France", "provence-alpes-côte d'azur": "Marseille, France",
-        "nord": "Lille, France", "le nord": "Lille, France", "hauts-de-france": "Lille, France",
-        "bretagne": "Rennes, France", "côte d'azur": "Nice, France",
-        "rhône-alpes": "Lyon, France", "auvergne-rhône-alpes": "Lyon, France",
-        "aquitaine": "Bordeaux, France", "nouvelle-aquitaine": "Bordeaux, France",
-        "alsace": "Strasbourg, France", "grand est": "Strasbourg, France",
-        "france": "Paris, France", "territoire français": "Paris, France",
-        "ouest": "Nantes, France", "normandie": "Rouen, France",
-        "centre": "Orléans, France", "centre-val de loire": "Orléans, France",
-        "auvergne": "Clermont-Ferrand, France"
-    }
-    adresse_norm = adresse.lower().strip()
-    adresse_corrigee = corrections.get(adresse_norm, adresse)
+    adresse_corrigee = CORRECTIONS_REGIONALES.get(adresse.lower().strip(), adresse)
     if ", france" not in adresse_corrigee.lower():
         adresse_requete = f"{adresse_corrigee}, France"
     else:
         adresse_requete = adresse_corrigee
     try:
-        loc = geolocator.geocode(adresse_requete)
-        if loc:
-            return (loc.latitude, loc.longitude)
-        else:
-            st.warning(f"⚠️ Adresse '{adresse_requete}' (issue de '{adresse}') non trouvée par le service de géolocalisation.")
-            return None
+        coords = geocoder_avec_cache(adresse_requete, geocode_limite, cache_geocodage, table_communes)
+        if coords:
+            return coords, None
+        return None, ("warning", f"⚠️ Adresse '{adresse_requete}' (issue de '{adresse}') non trouvée par le service de géolocalisation.")
     except (GeocoderTimedOut, GeocoderUnavailable) as e:
-        st.error(f"❌ Erreur de géocodage (timeout/indisponible) pour '{adresse_requete}': {e}")
-        return None
+        return None, ("error", f"❌ Erreur de géocodage (timeout/indisponible) pour '{adresse_requete}': {e}")
     except Exception as e:
-        st.error(f"❌ Erreur inattendue lors du géocodage de '{adresse_requete}': {e}")
-        return None
+        return None, ("error", f"❌ Erreur inattendue lors du géocodage de '{adresse_requete}': {e}")
+
+def afficher_message(message):
+    """Affiche un message (niveau, texte) produit hors du thread Streamlit."""
+    if message:
+        niveau, texte = message
+        getattr(st, niveau)(texte)
 
-def trouver_cinemas_proches(localisation_cible: str, spectateurs_voulus: int, nombre_de_salles_voulues: int, rayon_km: int = 50):
+def geo_localisation(adresse: str):
+    """
+    Tente de trouver les coordonnées (latitude, longitude) pour une adresse donnée :
+    table des communes hors ligne, puis cache SQLite, puis Nominatim en dernier recours.
+    Affiche les erreurs/warnings directement dans Streamlit.
+    Retourne un tuple (lat, lon) ou None si introuvable ou en cas d'erreur.
     """
-    Trouve des cinémas proches d'une localisation cible, pour un nombre EXACT de salles.
+    coords, message = _geocoder_localisation(adresse)
+    afficher_message(message)
+    return coords
+
+def _resultat_salle(cinema, salle, distance: float, localisation: str):
+    return {
+        "cinema": cinema.cinema, "salle": salle.salle,
+        "adresse": cinema.adresse, "lat": cinema.lat, "lon": cinema.lon,
+        "capacite": salle.capacite, "distance_km": round(distance, 2),
+        "contact": cinema.contact,
+        "source_localisation": localisation
+    }
+
+def trouver_cinemas_zones(zones: list, dedoublonner: bool = True, critere_allocation: str = None, geocodes_connus: dict = None):
+    """
+    Recherche groupée pour tout un plan de diffusion.
+    zones : liste de dicts {"localisation", "nombre_salles", "rayon_km", "spectateurs" et
+    "priorite_grandes_salles" (optionnels)}.
+    Les localisations sont géocodées en parallèle, puis toutes les recherches par rayon sont faites
+    en une seule passe vectorisée. Avec dedoublonner, une salle n'est attribuée qu'à une seule zone
+    même si plusieurs zones se chevauchent.
+    Avec critere_allocation (CRITERE_DISTANCE ou CRITERE_SALLES), le nombre de salles n'est plus imposé :
+    l'allocateur choisit les salles (plusieurs par cinéma possibles) pour atteindre "spectateurs".
+    geocodes_connus : localisations déjà géocodées (voir preparer_page_async).
+    Ne fait aucun affichage : retourne, dans l'ordre de zones, une liste de dicts
+    {"localisation", "coords", "resultats", "nombre_salles_demandees", "messages"}
+    (coords : centre géocodé de la zone, None si introuvable).
+    """
+    geocodes = geocoder_localisations([z["localisation"] for z in zones], _geocoder_localisation, geocodes_connus, GEOCODER_THREADS)
+    groupes = []
+    zones_valides = []
+    for zone in zones:
+        loc = zone["localisation"]
+        coords, message = geocodes[loc]
+        groupe = {"localisation": loc, "coords": coords, "resultats": [], "nombre_salles_demandees": zone["nombre_salles"],
+                  "messages": [message] if message else []}
+        groupes.append(groupe)
+        if coords:
+            zones_valides.append((groupe, zone, coords))
+
+    if critere_allocation:
+        allocations = allocateur_salles.allouer(
+            [(coords, zone.get("spectateurs", 0), zone["rayon_km"]) for _, zone, coords in zones_valides], critere_allocation)
+        for (groupe, zone, _), allocation in zip(zones_valides, allocations):
+            loc = zone["localisation"]
+            for idx_cinema, rang_salle, distance in allocation["salles"]:
+                cinema = cinemas_data[idx_cinema]
+                groupe["resultats"].append(_resultat_salle(cinema, cinema.salles[rang_salle], distance, loc))
+            groupe["nombre_salles_demandees"] = len(groupe["resultats"])
+            if not groupe["resultats"]:
+                groupe["messages"].append(("warning", f"Aucune salle trouvée pour '{loc}' dans un rayon de {zone['rayon_km']} km."))
+            elif allocation["capacite"] < allocation["objectif"]:
+                groupe["messages"].append(("warning", f"⚠️ Capacité disponible de {allocation['capacite']} places pour '{loc}' (objectif : {allocation['objectif']} spectateurs)."))
+        return groupes
+
+    # Colonnes limitées aux candidats de la grille spatiale pour l'ensemble des zones
+    candidats = sorted({i for _, zone, (lat, lon) in zones_valides for i in index_cinemas.candidats(lat, lon, zone["rayon_km"])})
+    selections = table_cinemas.plus_proches_zones(
+        [coords for _, _, coords in zones_valides],
+        [zone["nombre_salles"] for _, zone, _ in zones_valides],
+        [zone["rayon_km"] for _, zone, _ in zones_valides],
+        [bool(zone.get("priorite_grandes_salles", False)) for _, zone, _ in zones_valides],
+        dedoublonner=dedoublonner, indices=candidats,
+    )
+    for (groupe, zone, _), (indices, distances) in zip(zones_valides, selections):
+        loc, rayon_km, nombre = zone["localisation"], zone["rayon_km"], zone["nombre_salles"]
+        for idx_cinema, distance in zip(indices.tolist(), distances.tolist()):
+            cinema = cinemas_data[idx_cinema]
+            groupe["resultats"].append(_resultat_salle(cinema, cinema.meilleure_salle, distance, loc))
+        if not groupe["resultats"]:
+            groupe["messages"].append(("warning", f"Aucune salle trouvée pour '{loc}' dans un rayon de {rayon_km} km."))
+        elif len(groupe["resultats"]) < nombre:
+            groupe["messages"].append(("warning", f"⚠️ Seulement {len(groupe['resultats'])} salle(s) trouvée(s) pour '{loc}' (au lieu de {nombre} demandées)."))
+    return groupes
+
+def trouver_cinemas_proches(localisation_cible: str, spectateurs_voulus: int, nombre_de_salles_voulues: int, rayon_km: int = 50, critere_allocation: str = None):
+    """
+    Trouve des cinémas proches d'une localisation cible, pour un nombre EXACT de salles
+    ou, avec critere_allocation, pour atteindre spectateurs_voulus.
     Affiche les warnings/infos directement dans Streamlit.
     Retourne list: Liste des salles sélectionnées.
     """
-    point_central_coords = geo_localisation(localisation_cible)
-    if not point_central_coords:
-        return []
-
-    salles_eligibles = []
-    for cinema in cinemas_data:
-        lat, lon = cinema.get('lat'), cinema.get('lon')
-        if lat is None or lon is None: continue
-        try:
-            distance = geodesic(point_central_coords, (lat, lon)).km
-        except Exception as e:
-            st.warning(f"⚠️ Erreur calcul distance pour {cinema.get('cinema', 'Inconnu')} : {e}")
-            continue
-        if distance > rayon_km: continue
-        salles = cinema.get("salles", [])
-        # Ne garder que les 2 meilleures salles (par capacité décroissante)
-        # Nettoyage : on filtre les salles avec une capacité convertible en int
-        salles_valides = []
-        for s in salles:
-            try:
-                capacite = int(s.get("capacite", 0))
-                if capacite > 0:
-                    s["capacite"] = capacite
-                    salles_valides.append(s)
-            except (ValueError, TypeError):
-                continue
-
-        # Tri et limitation à 2 salles max par cinéma
-        salles = sorted(salles_valides, key=lambda s: s["capacite"], reverse=True)[:1]
-        for salle in salles:
-            try: capacite = int(salle.get("capacite", 0))
-            except (ValueError, TypeError): continue
-            if capacite <= 0: continue # Ignore salles capacité nulle
-            salles_eligibles.append({
-                "cinema": cinema.get("cinema"), "salle": salle.get("salle"),
-                "adresse": cinema.get("adresse"), "lat": lat, "lon": lon,
-                "capacite": capacite, "distance_km": round(distance, 2),
-                "contact": cinema.get("contact", {}),
-                "source_localisation": localisation_cible
-            })
-
-    if not salles_eligibles:
-        st.warning(f"Aucune salle trouvée pour '{localisation_cible}' dans un rayon de {rayon_km} km.")
-        return []
-
-    salles_eligibles.sort(key=lambda x: (x["distance_km"], -x["capacite"]))
-
-    if len(salles_eligibles) < nombre_de_salles_voulues:
-         st.warning(f"⚠️ Seulement {len(salles_eligibles)} salle(s) trouvée(s) pour '{localisation_cible}' (au lieu de {nombre_de_salles_voulues} demandées).")
-         resultats = salles_eligibles
-    else:
-        resultats = salles_eligibles[:nombre_de_salles_voulues]
-
-    return resultats
+    zone = {"localisation": localisation_cible, "nombre_salles": nombre_de_salles_voulues, "rayon_km": rayon_km, "spectateurs": spectateurs_voulus}
+    groupe = trouver_cinemas_zones([zone], critere_allocation=critere_allocation)[0]
+    for message in groupe["messages"]:
+        afficher_message(message)
+    return groupe["resultats"]
 
 def generer_carte_folium(groupes_de_cinemas: list):
     """
@@ -353,47 +456,114 @@ def generer_carte_folium(groupes_de_cinemas: list):
     folium.LayerControl().add_to(m)
     return m
 
-def analyser_contexte_geographique(description_projet: str):
+@st.cache_data(show_spinner=False, max_entries=8)
+def generer_carte_legere_html(groupes_de_cinemas: list, afficher_reseau: bool):
+    """
+    HTML de la carte légère (voir carte_legere.py), avec ou sans tout le réseau en fond.
+    Mis en cache : une relance de la page avec les mêmes résultats ne reconstruit pas la carte.
+    Retourne bytes ou None.
+    """
+    carte = generer_carte_legere(groupes_de_cinemas, cinemas_data if afficher_reseau else None)
+    return carte_en_html(carte) if carte else None
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def exporter_excel(cle_export: str, _groupes_de_cinemas: list) -> bytes:
+    """
+    Classeur Excel de tous les résultats (voir export_resultats.py), mis en cache par cle_export :
+    les interactions avec les widgets ne régénèrent pas le classeur tant que la recherche est la même.
+    """
+    return classeur_excel(_groupes_de_cinemas)
+
+SYSTEM_PROMPT_CONTEXTE = (
+    "Tu es un expert en distribution cinématographique et en analyse démographique en France.\n\n"
+    "🎯 Ton objectif : analyser le contexte d'un projet cinématographique pour suggérer les régions les plus pertinentes.\n\n"
+    "Considère les facteurs suivants :\n"
+    "1. Public cible (âge, centres d'intérêt)\n"
+    "2. Thème du film\n"
+    "3. Type d'événement (avant-première, test, etc.)\n"
+    "4. Contexte local (activités, industries, centres d'intérêt)\n\n"
+    "Retourne un JSON avec :\n"
+    "- regions : liste des régions suggérées\n"
+    "- justification : explication pour chaque région\n"
+    "- public_cible : description du public cible identifié\n"
+    "- facteurs_cles : liste des facteurs qui ont influencé le choix\n\n"
+    "Exemple de format de réponse :\n"
+    "{\n"
+    '  "regions": ["Île-de-France", "Lyon", "Bordeaux"],\n'
+    '  "justification": "Ces régions ont une forte concentration de jeunes urbains et d\'activités liées au thème",\n'
+    '  "public_cible": "Jeunes adultes 18-35 ans, urbains, intéressés par le thème",\n'
+    '  "facteurs_cles": ["Population jeune", "Centres urbains", "Activités liées au thème"]\n'
+    "}"
+)
+
+def analyser_contexte_geographique(description_projet: str, reponse: str = None):
     """
     Analyse le contexte du projet pour suggérer les régions les plus pertinentes
     en fonction du public cible, du thème du film, etc.
     Retourne un dictionnaire avec les régions suggérées et leur justification.
+    Les réponses sont mémorisées dans le cache persistant.
+    reponse : réponse déjà obtenue (appel asynchrone), seule l'interprétation est alors faite.
     """
-    system_prompt = (
-        "Tu es un expert en distribution cinématographique et en analyse démographique en France.\n\n"
-        "🎯 Ton objectif : analyser le contexte d'un projet cinématographique pour suggérer les régions les plus pertinentes.\n\n"
-        "Considère les facteurs suivants :\n"
-        "1. Public cible (âge, centres d'intérêt)\n"
-        "2. Thème du film\n"
-        "3. Type d'événement (avant-première, test, etc.)\n"
-        "4. Contexte local (activités, industries, centres d'intérêt)\n\n"
-        "Retourne un JSON avec :\n"
-        "- regions : liste des régions suggérées\n"
-        "- justification : explication pour chaque région\n"
-        "- public_cible : description du public cible identifié\n"
-        "- facteurs_cles : liste des facteurs qui ont influencé le choix\n\n"
-        "Exemple de format de réponse :\n"
-        "{\n"
-        '  "regions": ["Île-de-France", "Lyon", "Bordeaux"],\n'
-        '  "justification": "Ces régions ont une forte concentration de jeunes urbains et d\'activités liées au thème",\n'
-        '  "public_cible": "Jeunes adultes 18-35 ans, urbains, intéressés par le thème",\n'
-        '  "facteurs_cles": ["Population jeune", "Centres urbains", "Activités liées au thème"]\n'
-        "}"
-    )
-
     try:
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": description_projet}
-            ]
-        )
-        return json.loads(response.choices[0].message.content.strip())
+        if reponse is None:
+            reponse = completion_avec_cache(client, cache_llm, "gpt-4", SYSTEM_PROMPT_CONTEXTE, description_projet, valider=_contexte_exploitable)
+        return json.loads(reponse)
     except Exception as e:
         st.error(f"Erreur lors de l'analyse du contexte : {e}")
         return None
 
+def _localisations_du_plan(reponse: str) -> list:
+    """Localisations citées dans une réponse brute du plan (lecture rapide, sans avertissement)."""
+    for partie in (reponse, reponse[reponse.find("["):reponse.rfind("]") + 1]):
+        try:
+            donnees = json.loads(partie)
+        except json.JSONDecodeError:
+            continue
+        elements = donnees if isinstance(donnees, list) else [donnees]
+        return list(dict.fromkeys(e["localisation"] for e in elements if isinstance(e, dict) and isinstance(e.get("localisation"), str)))
+    return []
+
+async def preparer_page_async(description_projet: str, question: str, suivi):
+    """
+    Lance en parallèle l'analyse du contexte et l'interprétation du plan (AsyncOpenAI),
+    puis géocode chaque localisation du plan dès que celui-ci est connu, sans attendre le contexte.
+    suivi(texte) est appelé à chaque étape terminée (affichage progressif dans la page).
+    Retourne (reponse_contexte, reponse_plan, geocodes) ; une réponse vaut None si l'appel a échoué
+    (l'appel synchrone habituel est alors refait pour afficher l'erreur).
+    """
+    async def appeler(modele, system_prompt, texte, valider):
+        try:
+            return await completion_avec_cache_async(client_async, cache_llm, modele, system_prompt, texte, valider=valider)
+        except Exception:
+            return None
+
+    async def localiser(loc):
+        resultat = await asyncio.to_thread(_geocoder_localisation, loc)
+        coords = resultat[0]
+        suivi(f"📍 {loc} : {f'{coords[0]:.4f}, {coords[1]:.4f}' if coords else 'non localisée'}")
+        return loc, resultat
+
+    async def contexte():
+        reponse = await appeler("gpt-4", SYSTEM_PROMPT_CONTEXTE, description_projet, _contexte_exploitable)
+        suivi("✅ Contexte analysé" if reponse is not None else "⚠️ Analyse du contexte en échec")
+        return reponse
+
+    async def plan():
+        reponse = await appeler("gpt-4o", SYSTEM_PROMPT_REQUETE, question, _plan_exploitable)
+        if reponse is None:
+            suivi("⚠️ Interprétation du plan en échec")
+            return None, {}
+        localisations = _localisations_du_plan(reponse)
+        suivi(f"✅ Plan interprété : {len(localisations)} localisation(s)")
+        geocodes = dict(await asyncio.gather(*(localiser(loc) for loc in localisations)))
+        return reponse, geocodes
+
+    async with AsyncOpenAI(api_key=client.api_key) as client_async:
+        taches_contexte = contexte() if description_projet else asyncio.sleep(0, None)
+        taches_plan = plan() if question else asyncio.sleep(0, (None, {}))
+        reponse_contexte, (reponse_plan, geocodes) = await asyncio.gather(taches_contexte, taches_plan)
+    return reponse_contexte, reponse_plan, geocodes
+
 # --- Interface Utilisateur Streamlit ---
 st.title("🗺️ Assistant de Planification Cinéma MK2")
 st.markdown("Décrivez votre projet de diffusion et l'IA identifiera les cinémas pertinents en France.")
@@ -401,6 +571,13 @@ st.markdown("Décrivez votre projet de diffusion et l'IA identifiera les cinéma
 if cinemas_ignored_info:
     st.info(f"ℹ️ {cinemas_ignored_info}")
 
+stats_cache_llm = cache_llm.statistiques()
+st.sidebar.caption(
+    f"🧠 Cache IA : {stats_cache_llm['entrees']} réponses, "
+    f"{stats_cache_llm['taux_succes']:.0%} de succès ({stats_cache_llm['succes']}/{stats_cache_llm['succes'] + stats_cache_llm['echecs']}), "
+    f"{stats_cache_llm['evictions']} évictions"
+)
+
 with st.expander("ℹ️ Comment ça marche ?"):
     st.markdown("""
     Cette application vous aide à planifier des projections de films en identifiant les cinémas les plus adaptés en France.
@@ -430,33 +607,7 @@ description_projet = st.text_area(
     placeholder="Ex: Film sur l'automobile par Inoxtag, public jeune, avant-première"
 )
 
-if description_projet:
-    with st.spinner("🧠 Analyse du contexte par l'IA..."):
-        contexte = analyser_contexte_geographique(description_projet)
-        
-    if contexte:
-        st.success("✅ Analyse du contexte terminée !")
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.markdown("**📊 Public cible identifié :**")
-            st.info(contexte.get("public_cible", "Non spécifié"))
-            
-            st.markdown("**🎯 Facteurs clés :**")
-            for facteur in contexte.get("facteurs_cles", []):
-                st.markdown(f"- {facteur}")
-        
-        with col2:
-            st.markdown("**🗺️ Régions suggérées :**")
-            for region in contexte.get("regions", []):
-                st.markdown(f"- {region}")
-            
-            st.markdown("**💡 Justification :**")
-            st.info(contexte.get("justification", "Non spécifié"))
-        
-        st.markdown("---")
-        st.subheader("📝 Planification détaillée")
-        st.info("Maintenant que nous avons identifié les régions pertinentes, détaillez votre plan de diffusion.")
+zone_contexte = st.container() # Rempli une fois les analyses parallèles terminées
 
 # Deuxième étape : Planification détaillée
 query = st.text_input(
@@ -464,9 +615,50 @@ query = st.text_input(
     placeholder="Ex: 5 séances à Paris (500 pers.) et 2 séances test à Rennes (100 pers.)"
 )
 
+# Analyse du contexte, interprétation du plan et géocodage menés en parallèle, une fois par couple
+# (description, plan) : les reruns Streamlit (rayon, mode de sélection, carte) réutilisent le résultat de la session
+reponse_contexte, reponse_plan, geocodes_plan = None, None, {}
+if description_projet or query:
+    preparation = lire_preparation(st.session_state, description_projet, query)
+    if preparation:
+        reponse_contexte, reponse_plan, geocodes_plan = preparation
+    else:
+        with st.status("🧠 Analyse par l'IA en cours...", expanded=True) as statut:
+            reponse_contexte, reponse_plan, geocodes_plan = asyncio.run(preparer_page_async(description_projet, query, statut.write))
+            statut.update(label="✅ Analyse par l'IA terminée", state="complete", expanded=False)
+        # Appels IA en échec et localisations non trouvées ne sont pas mémorisés : retentés au prochain rerun
+        memoriser_preparation(st.session_state, description_projet, query, reponse_contexte, reponse_plan, geocodes_plan)
+
+with zone_contexte:
+    if description_projet:
+        contexte = analyser_contexte_geographique(description_projet, reponse_contexte)
+
+        if contexte:
+            st.success("✅ Analyse du contexte terminée !")
+            col1, col2 = st.columns(2)
+        
+            with col1:
+                st.markdown("**📊 Public cible identifié :**")
+                st.info(contexte.get("public_cible", "Non spécifié"))
+            
+                st.markdown("**🎯 Facteurs clés :**")
+                for facteur in contexte.get("facteurs_cles", []):
+                    st.markdown(f"- {facteur}")
+        
+            with col2:
+                st.markdown("**🗺️ Régions suggérées :**")
+                for region in contexte.get("regions", []):
+                    st.markdown(f"- {region}")
+            
+                st.markdown("**💡 Justification :**")
+                st.info(contexte.get("justification", "Non spécifié"))
+        
+            st.markdown("---")
+            st.subheader("📝 Planification détaillée")
+            st.info("Maintenant que nous avons identifié les régions pertinentes, détaillez votre plan de diffusion.")
+
 if query:
-    with st.spinner("🧠 Interprétation de votre requête par l'IA..."):
-        instructions_ia, reponse_brute_ia = analyser_requete_ia(query)
+    instructions_ia, reponse_brute_ia = analyser_requete_ia(query, reponse_plan)
 
     if not instructions_ia:
         st.warning("L'IA n'a pas pu interpréter votre demande ou n'a trouvé aucune intention valide. Essayez de reformuler.")
@@ -496,6 +688,15 @@ if query:
         rayons_par_loc = {}
 
         st.sidebar.header("⚙️ Options de Recherche")
+        modes_selection = {
+            "Une salle par séance (plus proches)": None,
+            "Objectif de spectateurs - salles les plus proches": CRITERE_DISTANCE,
+            "Objectif de spectateurs - le moins de salles": CRITERE_SALLES,
+        }
+        critere_allocation = modes_selection[st.sidebar.radio("Mode de sélection des salles", list(modes_selection), key="mode_selection")]
+        carte_legere = st.sidebar.checkbox("Carte légère (points regroupés)", key="carte_legere",
+                                           help=f"Activée automatiquement au-delà de {SEUIL_CARTE_LEGERE} salles.")
+        afficher_reseau = st.sidebar.checkbox("Afficher tout le réseau de cinémas sur la carte", key="afficher_reseau")
         for idx, instruction in enumerate(instructions_ia):
             loc = instruction.get('localisation')
             if loc:
@@ -509,49 +710,44 @@ if query:
         st.markdown("---")
         st.subheader("🔍 Recherche des cinémas...")
         dataframes_to_export = {}
+        zones_recherche = []
+        for instruction in instructions_ia:
+            loc = instruction.get('localisation')
+            num_spectateurs = instruction.get('nombre')
+            if loc and isinstance(num_spectateurs, int) and num_spectateurs >= 0:
+                seances_explicites = "nombre_seances" in instruction and isinstance(instruction["nombre_seances"], int) and instruction["nombre_seances"] > 0
+                zones_recherche.append({
+                    "localisation": loc, "spectateurs": num_spectateurs,
+                    "nombre_salles": instruction["nombre_seances"] if seances_explicites else 1,
+                    "seances_explicites": seances_explicites, "rayon_km": rayons_par_loc.get(loc, 50),
+                    "priorite_grandes_salles": bool(instruction.get("priorite_grandes_salles", False)),
+                })
+            else: st.warning(f"Instruction IA ignorée (format invalide) : {instruction}")
+
         with st.spinner(f"Recherche en cours pour {nb_zones} zone(s)..."):
-            for instruction in instructions_ia:
-                loc = instruction.get('localisation')
-                num_spectateurs = instruction.get('nombre')
-                if loc and isinstance(num_spectateurs, int) and num_spectateurs >= 0:
-                    st.write(f"**Recherche pour : {loc}**")
-                    rayon_recherche = rayons_par_loc.get(loc, 50)
-                    if "nombre_seances" in instruction and isinstance(instruction["nombre_seances"], int) and instruction["nombre_seances"] > 0:
-                        nombre_salles_a_trouver = instruction["nombre_seances"]
-                        st.info(f"   -> Objectif : trouver {nombre_salles_a_trouver} salle(s) dans {rayon_recherche} km (cible: {num_spectateurs} spect.).")
-                    else:
-                        nombre_salles_a_trouver = 1
-                        st.info(f"   -> Objectif : trouver {nombre_salles_a_trouver} salle (défaut) dans {rayon_recherche} km (cible: {num_spectateurs} spect.).")
-                    total_seances_estimees_ou_demandees += nombre_salles_a_trouver
-                    resultats_cinemas = trouver_cinemas_proches(loc, num_spectateurs, nombre_salles_a_trouver, rayon_recherche)
-                    groupe_actuel = {"localisation": loc, "resultats": resultats_cinemas, "nombre_salles_demandees": nombre_salles_a_trouver}
-                    liste_groupes_resultats.append(groupe_actuel)
-                    if resultats_cinemas:
-                        capacite_trouvee = sum(c['capacite'] for c in resultats_cinemas)
-                        st.write(f"   -> Trouvé {len(resultats_cinemas)} salle(s) (Capacité totale: {capacite_trouvee}).")
-                        cinemas_trouves_total += len(resultats_cinemas)
-                        data_for_df = []
-                        for cinema in resultats_cinemas:
-                            contact = cinema.get("contact", {})
-                            data_for_df.append({
-                                "Cinéma": cinema.get("cinema", "N/A"), 
-                                "Salle": cinema.get("salle", "N/A"),
-                                "Adresse": cinema.get("adresse", "N/A"), 
-                                "Capacité": cinema.get("capacite", 0),
-                                "Distance (km)": cinema.get("distance_km", 0), 
-                                # Remplacer les deux colonnes par une seule avec les informations combinées
-                                "Contact": " / ".join(filter(None, [
-                                    contact.get("nom", ""), 
-                                    contact.get("email", ""), 
-                                    contact.get("telephone", "")
-                                ])),
-                                "Latitude": cinema.get("lat", 0.0),
-                                "Longitude": cinema.get("lon", 0.0) 
-                            })
-                        df = pd.DataFrame(data_for_df)
-                        if not df.empty: dataframes_to_export[loc] = df
-                    else: st.write(f"   -> Aucune salle trouvée pour '{loc}' correspondant aux critères.")
-                else: st.warning(f"Instruction IA ignorée (format invalide) : {instruction}")
+            # Géocodage parallèle + une seule passe vectorisée pour toutes les zones
+            groupes_trouves = trouver_cinemas_zones(zones_recherche, critere_allocation=critere_allocation, geocodes_connus=geocodes_plan)
+            for zone, groupe_actuel in zip(zones_recherche, groupes_trouves):
+                loc, num_spectateurs = zone["localisation"], zone["spectateurs"]
+                rayon_recherche, nombre_salles_a_trouver = zone["rayon_km"], zone["nombre_salles"]
+                st.write(f"**Recherche pour : {loc}**")
+                if critere_allocation:
+                    st.info(f"   -> Objectif : atteindre {num_spectateurs} spectateurs dans {rayon_recherche} km (plusieurs salles par cinéma possibles).")
+                elif zone["seances_explicites"]:
+                    st.info(f"   -> Objectif : trouver {nombre_salles_a_trouver} salle(s) dans {rayon_recherche} km (cible: {num_spectateurs} spect.).")
+                else:
+                    st.info(f"   -> Objectif : trouver {nombre_salles_a_trouver} salle (défaut) dans {rayon_recherche} km (cible: {num_spectateurs} spect.).")
+                total_seances_estimees_ou_demandees += groupe_actuel["nombre_salles_demandees"]
+                for message in groupe_actuel["messages"]:
+                    afficher_message(message)
+                resultats_cinemas = groupe_actuel["resultats"]
+                liste_groupes_resultats.append(groupe_actuel)
+                if resultats_cinemas:
+                    capacite_trouvee = sum(c['capacite'] for c in resultats_cinemas)
+                    st.write(f"   -> Trouvé {len(resultats_cinemas)} salle(s) (Capacité totale: {capacite_trouvee}).")
+                    cinemas_trouves_total += len(resultats_cinemas)
+                    dataframes_to_export[loc] = tableau_zone(resultats_cinemas)
+                else: st.write(f"   -> Aucune salle trouvée pour '{loc}' correspondant aux critères.")
 
         st.markdown("---")
         st.subheader("📊 Résultats de la Recherche")
@@ -561,30 +757,41 @@ if query:
             else: st.success(f"✅ Recherche terminée ! {cinemas_trouves_total} salle(s) trouvée(s), correspondant aux {total_seances_estimees_ou_demandees} séance(s) visée(s).")
 
             st.subheader("🗺️ Carte des Cinémas Trouvés")
-            carte = generer_carte_folium(liste_groupes_resultats)
-            if carte:
-                map_html_path = "map_output.html"
-                carte.save(map_html_path)
-                st_folium(carte, width='100%', height=500)
-                with open(map_html_path, "rb") as f:
-                    st.download_button("📥 Télécharger la Carte Interactive (HTML)", f, "carte_cinemas.html", "text/html", use_container_width=True)
+            carte_legere_affichee = carte_legere or afficher_reseau or cinemas_trouves_total > SEUIL_CARTE_LEGERE
+            if carte_legere_affichee:
+                # Points regroupés côté navigateur, affichés tels quels (pas d'aller-retour st_folium)
+                carte_html = generer_carte_legere_html(liste_groupes_resultats, afficher_reseau)
+                if carte_html: components.html(carte_html.decode("utf-8"), height=500)
+            else:
+                carte = generer_carte_folium(liste_groupes_resultats)
+                carte_html = None
+                if carte:
+                    st_folium(carte, width='100%', height=500)
+                    carte_html = carte_en_html(carte)
+            if carte_html:
+                st.download_button("📥 Télécharger la Carte Interactive (HTML)", carte_html, "carte_cinemas.html", "text/html", use_container_width=True)
+                # La carte légère n'a pas une couche par zone : ses couches sont les salles trouvées et le réseau
+                aide_zones = ("- Points regroupés par proximité : zoomez pour les séparer ; une couleur par zone, rappelée au clic.\n"
+                              "- Contrôle des couches pour afficher ou masquer les salles trouvées et le réseau.\n"
+                              if carte_legere_affichee else "- Contrôle des couches pour filtrer par zone.\n")
                 with st.expander("💡 Comment utiliser le fichier HTML ?"):
-                      st.markdown("- Double-cliquez sur `carte_cinemas.html`.\n- S'ouvre dans votre navigateur.\n- Carte interactive: zoom, déplacement, clic sur points.\n- Contrôle des couches pour filtrer par zone.\n- Fonctionne hors ligne.")
+                      st.markdown("- Double-cliquez sur `carte_cinemas.html`.\n- S'ouvre dans votre navigateur.\n- Carte interactive: zoom, déplacement, clic sur points.\n" + aide_zones + "- Fonctionne hors ligne.")
             else: st.info("Génération de la carte annulée.")
 
             st.markdown("---")
             st.subheader("📋 Liste des Salles et Export")
 
             if dataframes_to_export:
-                excel_buffer = io.BytesIO()
-                with pd.ExcelWriter(excel_buffer, engine='xlsxwriter') as writer:
-                    for loc, df_to_write in dataframes_to_export.items():
-                        safe_sheet_name = "".join(c for c in loc if c.isalnum() or c in (' ', '_')).rstrip()[:31]
-                        df_to_write.to_excel(writer, sheet_name=safe_sheet_name, index=False)
+                # Classeur construit une seule fois par recherche (clé : paramètres de la recherche et
+                # centres géocodés, qui peuvent changer pour une même localisation quand le cache expire)
+                parametres_recherche = json.dumps(
+                    [zones_recherche, [groupe["coords"] for groupe in liste_groupes_resultats], critere_allocation, mtime_cinemas],
+                    sort_keys=True, ensure_ascii=False)
+                cle_export = hashlib.sha256(parametres_recherche.encode("utf-8")).hexdigest()
                 st.download_button(
                     label="💾 Télécharger Tous les Résultats (Excel)",
-                    data=excel_buffer.getvalue(),
-                    file_name=f"resultats_cinemas_{uuid.uuid4()}.xlsx",
+                    data=exporter_excel(cle_export, liste_groupes_resultats),
+                    file_name=f"resultats_cinemas_{cle_export[:12]}.xlsx",
                     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                     use_container_width=True, key="download_all_excel" )
 
@@ -0,0 +1,158 @@
+# --- allocation_salles.py ---
+# Allocation de salles par objectif de spectateurs (plusieurs salles par cinéma possibles)
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+CRITERE_DISTANCE = "distance"  # Minimiser la somme des distances des salles retenues
+CRITERE_SALLES = "salles"      # Minimiser le nombre de salles (à égalité : les plus proches)
+
+# Le sac à dos est résolu sur des capacités arrondies (par défaut) à ce nombre de cellules au plus,
+# et sur au plus MAX_CANDIDATS salles par zone : le coût reste borné quel que soit l'objectif.
+MAX_CELLULES = 2000
+MAX_CANDIDATS = 400
+# Les candidats retenus couvrent au moins MARGE_CANDIDATS fois l'objectif de la zone
+MARGE_CANDIDATS = 3
+
+
+class AllocateurSalles:
+    """
+    Choisit, pour chaque zone d'un plan (point, spectateurs visés, rayon), un ensemble de salles
+    dont la capacité totale atteint l'objectif, au moindre coût :
+    - CRITERE_DISTANCE : somme des distances au centre de la zone,
+    - CRITERE_SALLES : nombre de salles.
+    Chaque zone est un sac à dos « de couverture » résolu exactement par programmation dynamique
+    (vectorisée NumPy) sur une présélection gloutonne des salles les plus intéressantes.
+    Une salle n'est attribuée qu'à une seule zone ; les zones les plus contraintes sont servies en premier.
+    """
+
+    def __init__(self, cinemas, table):
+        self.table = table
+        salles_cinema, salles_rang, salles_capacite = [], [], []
+        for idx_cinema, cinema in enumerate(cinemas):
+            for rang, salle in enumerate(cinema.salles):
+                if salle.capacite > 0:
+                    salles_cinema.append(idx_cinema)
+                    salles_rang.append(rang)
+                    salles_capacite.append(salle.capacite)
+        self.salles_cinema = np.array(salles_cinema, dtype=np.int64)
+        self.salles_rang = np.array(salles_rang, dtype=np.int64)
+        self.salles_capacite = np.array(salles_capacite, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.salles_capacite)
+
+    def _candidats(self, distances_salles, disponibles, rayon_km, objectif, critere):
+        """Présélection gloutonne des salles d'une zone, triées par intérêt décroissant."""
+        positions = np.flatnonzero(disponibles & (distances_salles <= rayon_km))
+        if len(positions) == 0:
+            return positions
+        capacites = self.salles_capacite[positions]
+        distances = distances_salles[positions]
+        if critere == CRITERE_SALLES:
+            ordre = np.lexsort((distances, -capacites))
+        else:
+            # Coût par place : favorise les salles proches ET grandes
+            ordre = np.lexsort((-capacites, (distances + 0.1) / capacites))
+        positions = positions[ordre]
+        cumul = np.cumsum(self.salles_capacite[positions])
+        nb = int(np.searchsorted(cumul, MARGE_CANDIDATS * objectif)) + 1
+        return positions[:min(nb, MAX_CANDIDATS)]
+
+    @staticmethod
+    def _sac_a_dos(capacites, couts, objectif):
+        """
+        Sac à dos de couverture 0/1 : sous-ensemble de coût minimal dont la capacité totale
+        atteint objectif. Capacités arrondies par défaut à un pas de objectif / MAX_CELLULES places
+        (la couverture réelle est donc garantie). Retourne les positions retenues, ou None si impossible.
+        """
+        pas = max(1, -(-objectif // MAX_CELLULES))
+        cible = -(-objectif // pas)
+        unites = capacites // pas
+        dp = np.full(cible + 1, np.inf)
+        dp[0] = 0.0
+        garde = np.zeros((len(capacites), cible + 1), dtype=bool)
+        for i, (u, cout) in enumerate(zip(unites.tolist(), couts.tolist())):
+            if u <= 0:
+                continue
+            candidat = np.empty_like(dp)
+            u = min(u, cible)
+            candidat[:u] = cout                   # Cette salle suffit à elle seule jusqu'à u
+            candidat[u:] = dp[:cible + 1 - u] + cout
+            # Couverture « au moins t » : candidat[t] utilise dp[t - u]
+            ameliore = candidat < dp
+            garde[i] = ameliore
+            dp = np.where(ameliore, candidat, dp)
+        if not np.isfinite(dp[cible]):
+            return None
+        retenues, t = [], cible
+        for i in range(len(capacites) - 1, -1, -1):
+            if t > 0 and garde[i, t]:
+                retenues.append(i)
+                t = max(0, t - min(int(unites[i]), cible))
+        return retenues[::-1]
+
+    @staticmethod
+    def _couverture_gloutonne(capacites, objectif):
+        """
+        Repli quand l'arrondi des capacités empêche le sac à dos de conclure : candidats pris dans
+        l'ordre de la présélection jusqu'à atteindre objectif, puis retrait des salles devenues
+        inutiles (des moins intéressantes aux plus intéressantes). Retourne les positions retenues.
+        """
+        nb = int(np.searchsorted(np.cumsum(capacites), objectif)) + 1
+        retenues = list(range(min(nb, len(capacites))))
+        total = int(capacites[retenues].sum())
+        for i in reversed(retenues[:]):
+            if total - capacites[i] >= objectif:
+                retenues.remove(i)
+                total -= int(capacites[i])
+        return retenues
+
+    def allouer(self, zones, critere=CRITERE_DISTANCE):
+        """
+        zones : liste de tuples (point (lat, lon), spectateurs visés, rayon_km).
+        Retourne, dans l'ordre des zones, des dicts
+        {"salles": [(idx_cinema, rang_salle, distance_km), ...], "capacite": int, "objectif": int}.
+        Si la capacité disponible dans le rayon est insuffisante, toutes les salles disponibles
+        sont retenues et "capacite" < "objectif".
+        """
+        if not zones:
+            return []
+        distances_cinemas = [self.table.distances(point) for point, _, _ in zones]
+        distances_salles = [d[self.salles_cinema] for d in distances_cinemas]
+
+        # Les zones dont l'objectif est le plus difficile à couvrir choisissent en premier
+        tension = []
+        for (_, objectif, rayon_km), distances in zip(zones, distances_salles):
+            capacite_rayon = int(self.salles_capacite[distances <= rayon_km].sum())
+            tension.append(objectif / capacite_rayon if capacite_rayon else np.inf)
+        ordre_zones = sorted(range(len(zones)), key=lambda z: -tension[z])
+
+        disponibles = np.ones(len(self), dtype=bool)
+        resultats = [None] * len(zones)
+        for z in ordre_zones:
+            _, objectif, rayon_km = zones[z]
+            distances = distances_salles[z]
+            retenues = np.array([], dtype=np.int64)
+            if objectif > 0:
+                candidats = self._candidats(distances, disponibles, rayon_km, objectif, critere)
+                capacites = self.salles_capacite[candidats]
+                if capacites.sum() < objectif:
+                    retenues = candidats
+                else:
+                    if critere == CRITERE_SALLES:
+                        couts = 1.0 + distances[candidats] / 1e6  # Départage par la distance
+                    else:
+                        couts = distances[candidats] + 1e-3      # Une salle à 0 km n'est pas gratuite
+                    choix = self._sac_a_dos(capacites, couts, objectif)
+                    if choix is None:
+                        choix = self._couverture_gloutonne(capacites, objectif)
+                    retenues = candidats[choix]
+            disponibles[retenues] = False
+            retenues = retenues[np.lexsort((-self.salles_capacite[retenues], distances[retenues]))]
+            resultats[z] = {
+                "salles": [(int(self.salles_cinema[s]), int(self.salles_rang[s]), float(distances[s])) for s in retenues],
+                "capacite": int(self.salles_capacite[retenues].sum()),
+                "objectif": int(objectif),
+            }
+        return resultats
@@ -0,0 +1,75 @@
+# --- benchmark_allocation.py ---
+# Benchmark de l'allocateur de salles sur des plans synthétiques de 50 zones
+# Usage : python benchmark_allocation.py [nombre_de_plans] [cinemas_groupedBig.json]
+# -*- coding: utf-8 -*-
+
+import sys
+import time
+import numpy as np
+from chargement_cinemas import charger_cinemas
+from moteur_distances import TableCinemas
+from allocation_salles import AllocateurSalles, CRITERE_DISTANCE, CRITERE_SALLES
+
+FICHIER_PAR_DEFAUT = "cinemas_groupedBig.json"
+NB_ZONES = 50
+
+
+def plan_synthetique(cinemas, generateur):
+    """50 zones centrées près de cinémas existants, objectifs de 200 à 20 000 spectateurs."""
+    zones = []
+    for idx in generateur.choice(len(cinemas), size=NB_ZONES, replace=False):
+        point = (cinemas[idx].lat + generateur.normal(0, 0.05), cinemas[idx].lon + generateur.normal(0, 0.05))
+        zones.append((point, int(generateur.integers(200, 20000)), int(generateur.choice([30, 50, 100]))))
+    return zones
+
+
+def allocation_naive(allocateur, zones):
+    """Référence : salles les plus proches d'abord, jusqu'à atteindre l'objectif."""
+    disponibles = np.ones(len(allocateur), dtype=bool)
+    resultats = []
+    for point, objectif, rayon_km in zones:
+        distances = allocateur.table.distances(point)[allocateur.salles_cinema]
+        positions = np.flatnonzero(disponibles & (distances <= rayon_km))
+        positions = positions[np.argsort(distances[positions], kind="stable")]
+        cumul = np.cumsum(allocateur.salles_capacite[positions])
+        retenues = positions[:int(np.searchsorted(cumul, objectif)) + 1]
+        disponibles[retenues] = False
+        resultats.append({"salles": [(0, 0, float(distances[s])) for s in retenues],
+                          "capacite": int(allocateur.salles_capacite[retenues].sum()), "objectif": objectif})
+    return resultats
+
+
+def resumer(resultats):
+    couvertes = sum(1 for r in resultats if r["capacite"] >= r["objectif"])
+    nb_salles = sum(len(r["salles"]) for r in resultats)
+    distance = sum(d for r in resultats for _, _, d in r["salles"])
+    places = sum(r["capacite"] for r in resultats)
+    return couvertes, nb_salles, distance, places
+
+
+def main():
+    nb_plans = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    fichier = sys.argv[2] if len(sys.argv) > 2 else FICHIER_PAR_DEFAUT
+    cinemas, _ = charger_cinemas(fichier)
+    table = TableCinemas(cinemas)
+    allocateur = AllocateurSalles(cinemas, table)
+    print(f"{len(cinemas)} cinémas, {len(allocateur)} salles exploitables, {nb_plans} plans de {NB_ZONES} zones")
+
+    generateur = np.random.default_rng(42)
+    plans = [plan_synthetique(cinemas, generateur) for _ in range(nb_plans)]
+    methodes = [
+        ("Naïf (plus proches)", lambda zones: allocation_naive(allocateur, zones)),
+        ("Optimiseur distance", lambda zones: allocateur.allouer(zones, CRITERE_DISTANCE)),
+        ("Optimiseur salles", lambda zones: allocateur.allouer(zones, CRITERE_SALLES)),
+    ]
+    for nom, methode in methodes:
+        debut = time.perf_counter()
+        resumes = [resumer(methode(zones)) for zones in plans]
+        duree = (time.perf_counter() - debut) / nb_plans
+        couvertes, nb_salles, distance, places = (sum(r[i] for r in resumes) / nb_plans for i in range(4))
+        print(f"{nom:<20} : {duree * 1000:7.1f} ms/plan | zones couvertes {couvertes:4.1f}/{NB_ZONES} | "
+              f"{nb_salles:6.1f} salles | distance totale {distance:8.1f} km | {places:8.0f} places")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# --- benchmark_recherche.py ---
+# Compare le parcours complet (geodesic sur tous les cinémas), l'index spatial
+# et le moteur vectorisé (index + haversine NumPy)
+# Usage : python benchmark_recherche.py [cinemas_groupedBig.json]
+# -*- coding: utf-8 -*-
+
+import json
+import sys
+import time
+from geopy.distance import geodesic
+from index_spatial import IndexSpatial
+from moteur_distances import TableCinemas
+from chargement_cinemas import charger_cinemas
+
+FICHIER_PAR_DEFAUT = "cinemas_groupedBig.json"
+
+# Plan de tournée type (coordonnées fixes pour ne pas dépendre du géocodeur)
+PLAN_TEST = [
+    ("Paris", (48.8566, 2.3522), 50), ("Lille", (50.6292, 3.0573), 100),
+    ("Strasbourg", (48.5734, 7.7521), 100), ("Lyon", (45.7640, 4.8357), 100),
+    ("Marseille", (43.2965, 5.3698), 100), ("Nice", (43.7102, 7.2620), 100),
+    ("Toulouse", (43.6047, 1.4442), 100), ("Montpellier", (43.6109, 3.8772), 50),
+    ("Bordeaux", (44.8378, -0.5792), 100), ("Nantes", (47.2184, -1.5536), 100),
+    ("Rennes", (48.1173, -1.6778), 100), ("Caen", (49.1829, -0.3707), 50),
+]
+
+
+def recherche_parcours_complet(cinemas, point, rayon_km):
+    """Ancien chemin : distance géodésique vers chaque cinéma."""
+    resultats = []
+    for i, cinema in enumerate(cinemas):
+        distance = geodesic(point, (cinema.lat, cinema.lon)).km
+        if distance <= rayon_km:
+            resultats.append((i, distance))
+    return resultats
+
+
+def lire_json(fichier):
+    with open(fichier, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def chronometrer(fonction, repetitions):
+    debut = time.perf_counter()
+    for _ in range(repetitions):
+        resultat = fonction()
+    return (time.perf_counter() - debut) / repetitions, resultat
+
+
+def main():
+    fichier = sys.argv[1] if len(sys.argv) > 1 else FICHIER_PAR_DEFAUT
+    t_json, _ = chronometrer(lambda: lire_json(fichier), 5)
+    t_normalisation, _ = chronometrer(lambda: charger_cinemas(fichier, utiliser_cache=False), 5)
+    charger_cinemas(fichier)  # Crée le cache binaire si besoin
+    t_cache, (cinemas, _) = chronometrer(lambda: charger_cinemas(fichier), 5)
+    print(f"{len(cinemas)} cinémas chargés depuis {fichier}, plan de {len(PLAN_TEST)} zones")
+    print(f"json.load : {t_json * 1000:.1f} ms, JSON + normalisation : {t_normalisation * 1000:.1f} ms, "
+          f"cache binaire : {t_cache * 1000:.1f} ms")
+
+    t_index, index = chronometrer(lambda: IndexSpatial((c.lat, c.lon) for c in cinemas), 5)
+    t_table, table = chronometrer(lambda: TableCinemas(cinemas), 5)
+    print(f"Construction de l'index : {t_index * 1000:.1f} ms, de la table : {t_table * 1000:.1f} ms")
+
+    t_ancien, res_ancien = chronometrer(
+        lambda: [recherche_parcours_complet(cinemas, point, rayon) for _, point, rayon in PLAN_TEST], 1)
+    t_nouveau, res_nouveau = chronometrer(
+        lambda: [index.rechercher(point, rayon) for _, point, rayon in PLAN_TEST], 5)
+    t_vecto, _ = chronometrer(
+        lambda: [table.plus_proches(point, 10, rayon, index.candidats(point[0], point[1], rayon))
+                 for _, point, rayon in PLAN_TEST], 50)
+
+    for (nom, _, rayon), ancien, nouveau in zip(PLAN_TEST, res_ancien, res_nouveau):
+        statut = "OK" if ancien == nouveau else "DIFFÉRENT"
+        print(f"  {nom:<12} rayon {rayon:>3} km : {len(nouveau):>4} cinémas [{statut}]")
+
+    print(f"Parcours complet : {t_ancien * 1000:.1f} ms pour le plan")
+    print(f"Index spatial    : {t_nouveau * 1000:.1f} ms pour le plan (x{t_ancien / t_nouveau:.1f})")
+    print(f"Index + NumPy    : {t_vecto * 1000:.2f} ms pour le plan (x{t_ancien / t_vecto:.0f})")
+
+
+if __name__ == "__main__":
+    main()
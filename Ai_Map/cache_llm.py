@@ -0,0 +1,160 @@
+# --- cache_llm.py ---
+# Cache persistant (SQLite) des réponses OpenAI, partagé par toutes les instances de l'application
+# -*- coding: utf-8 -*-
+
+import hashlib
+import os
+import re
+import sys
+import threading
+import time
+import unicodedata
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Geocod"))
+from connexion_sqlite import connexion_sqlite # Connexion par opération, commune aux bases SQLite
+
+CHEMIN_CACHE_PAR_DEFAUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reponses_llm_cache.sqlite")
+TTL_REPONSE = 30 * 24 * 3600  # Une réponse est réutilisée pendant 30 jours
+MAX_ENTREES = 5000            # Au-delà, les réponses les moins récemment utilisées sont supprimées
+NB_VERROUS = 64               # Verrous partagés entre les clés : nombre fixe, quel que soit le nombre de requêtes
+
+
+def normaliser_texte(texte: str) -> str:
+    """Texte utilisateur normalisé : casse, espaces et ponctuation finale ignorés."""
+    texte = unicodedata.normalize("NFC", texte or "").casefold()
+    texte = re.sub(r"\s+", " ", texte).strip()
+    return re.sub(r"\s*([.!?;,])+$", "", texte)
+
+
+def cle_requete(modele: str, system_prompt: str, texte_utilisateur: str) -> str:
+    """Clé : modèle + empreinte du prompt système + texte utilisateur normalisé."""
+    empreinte_prompt = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+    contenu = "\x1f".join((modele, empreinte_prompt, normaliser_texte(texte_utilisateur)))
+    return hashlib.sha256(contenu.encode("utf-8")).hexdigest()
+
+
+class CacheLLM:
+    """
+    Cache clé -> réponse brute du modèle, stocké dans SQLite avec durée de vie et éviction LRU.
+    Les compteurs (succès, échecs, évictions) sont persistés pour mesurer l'efficacité du cache
+    sur l'ensemble des instances. Une connexion est ouverte par opération (objet partageable entre threads).
+    """
+
+    def __init__(self, chemin: str = CHEMIN_CACHE_PAR_DEFAUT, ttl: int = TTL_REPONSE, max_entrees: int = MAX_ENTREES):
+        self.chemin = chemin
+        self.ttl = ttl
+        self.max_entrees = max_entrees
+        self._verrous = [threading.Lock() for _ in range(NB_VERROUS)]
+        with self._connexion() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS reponses ("
+                " cle TEXT PRIMARY KEY, modele TEXT NOT NULL, reponse TEXT NOT NULL,"
+                " cree_le REAL NOT NULL, utilise_le REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS reponses_utilise_le ON reponses (utilise_le)")
+            conn.execute("CREATE TABLE IF NOT EXISTS compteurs (nom TEXT PRIMARY KEY, valeur INTEGER NOT NULL)")
+
+    def _connexion(self):
+        return connexion_sqlite(self.chemin)
+
+    @staticmethod
+    def _incrementer(conn, nom: str, valeur: int = 1):
+        conn.execute(
+            "INSERT INTO compteurs (nom, valeur) VALUES (?, ?) ON CONFLICT(nom) DO UPDATE SET valeur = valeur + excluded.valeur",
+            (nom, valeur),
+        )
+
+    def lire(self, cle: str):
+        """Retourne la réponse en cache (et la marque comme récemment utilisée), ou None."""
+        maintenant = time.time()
+        with self._connexion() as conn:
+            ligne = conn.execute("SELECT reponse, cree_le FROM reponses WHERE cle = ?", (cle,)).fetchone()
+            if ligne and maintenant - ligne[1] <= self.ttl:
+                conn.execute("UPDATE reponses SET utilise_le = ? WHERE cle = ?", (maintenant, cle))
+                self._incrementer(conn, "succes")
+                return ligne[0]
+            self._incrementer(conn, "echecs")
+        return None
+
+    def ecrire(self, cle: str, modele: str, reponse: str):
+        """Mémorise une réponse puis évince les entrées expirées et les moins récemment utilisées."""
+        maintenant = time.time()
+        with self._connexion() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO reponses (cle, modele, reponse, cree_le, utilise_le) VALUES (?, ?, ?, ?, ?)",
+                (cle, modele, reponse, maintenant, maintenant),
+            )
+            evincees = conn.execute("DELETE FROM reponses WHERE cree_le < ?", (maintenant - self.ttl,)).rowcount
+            evincees += conn.execute(
+                "DELETE FROM reponses WHERE cle IN ("
+                " SELECT cle FROM reponses ORDER BY utilise_le DESC LIMIT -1 OFFSET ?)",
+                (self.max_entrees,),
+            ).rowcount
+            if evincees:
+                self._incrementer(conn, "evictions", evincees)
+
+    def statistiques(self) -> dict:
+        """{"entrees", "succes", "echecs", "evictions", "taux_succes"} cumulés depuis la création du fichier."""
+        with self._connexion() as conn:
+            compteurs = dict(conn.execute("SELECT nom, valeur FROM compteurs").fetchall())
+            entrees = conn.execute("SELECT COUNT(*) FROM reponses").fetchone()[0]
+        succes, echecs = compteurs.get("succes", 0), compteurs.get("echecs", 0)
+        return {
+            "entrees": entrees, "succes": succes, "echecs": echecs,
+            "evictions": compteurs.get("evictions", 0),
+            "taux_succes": succes / (succes + echecs) if succes + echecs else 0.0,
+        }
+
+    def verrou(self, cle: str) -> threading.Lock:
+        """
+        Verrou de la clé, choisi parmi NB_VERROUS selon son empreinte : deux requêtes identiques simultanées
+        ne déclenchent qu'un seul appel (deux clés différentes peuvent rarement partager un verrou).
+        """
+        return self._verrous[int(cle[:8], 16) % len(self._verrous)]
+
+
+def completion_avec_cache(client, cache: CacheLLM, modele: str, system_prompt: str, texte_utilisateur: str, valider=None) -> str:
+    """
+    Retourne le contenu de la réponse du modèle pour (system_prompt, texte_utilisateur),
+    depuis le cache si possible. Seules les réponses pour lesquelles valider(reponse) est vrai
+    sont mises en cache (une réponse inexploitable sera redemandée). Les erreurs de l'API sont propagées.
+    """
+    cle = cle_requete(modele, system_prompt, texte_utilisateur)
+    with cache.verrou(cle):
+        reponse = cache.lire(cle)
+        if reponse is not None:
+            return reponse
+        response = client.chat.completions.create(
+            model=modele,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": texte_utilisateur}
+            ]
+        )
+        reponse = response.choices[0].message.content.strip()
+        if valider is None or valider(reponse):
+            cache.ecrire(cle, modele, reponse)
+        return reponse
+
+
+async def completion_avec_cache_async(client_async, cache: CacheLLM, modele: str, system_prompt: str, texte_utilisateur: str, valider=None) -> str:
+    """
+    Équivalent de completion_avec_cache pour un client AsyncOpenAI : plusieurs appels peuvent
+    être en vol en même temps. Les accès SQLite, très courts, restent synchrones.
+    """
+    cle = cle_requete(modele, system_prompt, texte_utilisateur)
+    reponse = cache.lire(cle)
+    if reponse is not None:
+        return reponse
+    response = await client_async.chat.completions.create(
+        model=modele,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": texte_utilisateur}
+        ]
+    )
+    reponse = response.choices[0].message.content.strip()
+    if valider is None or valider(reponse):
+        cache.ecrire(cle, modele, reponse)
+    return reponse
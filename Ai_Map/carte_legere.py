@@ -0,0 +1,90 @@
+# --- carte_legere.py ---
+# Carte Folium allégée pour les grands résultats : points regroupés côté navigateur, popups construites au clic
+# -*- coding: utf-8 -*-
+
+import folium
+from folium.plugins import FastMarkerCluster
+
+COULEURS = ["blue", "green", "red", "purple", "orange", "darkred", "lightred", "beige", "darkblue", "darkgreen", "cadetblue", "lightgray", "black"]
+COULEUR_RESEAU = "gray"
+SEUIL_CARTE_LEGERE = 200  # Au-delà de ce nombre de salles, la carte légère est utilisée d'office
+
+# Une ligne de données = [lat, lon, couleur, cinéma, salle, adresse, capacité, distance, zone, contact, email].
+# Le HTML de la popup n'est construit qu'à l'ouverture (fonction passée à bindPopup).
+# folium préfixe le callback par « var callback = » : ce doit être une expression de fonction.
+CALLBACK_SALLE = """(function () {
+    function echapper(texte) {
+        return String(texte).replace(/[&<>"']/g, function (c) {
+            return {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;"}[c];
+        });
+    }
+    return function (row) {
+        var marker = L.circleMarker(new L.LatLng(row[0], row[1]),
+            {radius: 5, color: row[2], fillColor: row[2], fill: true, fillOpacity: 0.7});
+        marker.bindPopup(function () {
+            return "<b>" + echapper(row[3]) + " - Salle " + echapper(row[4]) + "</b><br>"
+                + "<i>" + echapper(row[5]) + "</i><br>"
+                + "Capacité : " + echapper(row[6]) + " places<br>"
+                + "Distance (" + echapper(row[8]) + ") : " + echapper(row[7]) + " km<br>"
+                + "Contact : <b>" + echapper(row[9]) + "</b><br>📧 " + echapper(row[10]);
+        }, {maxWidth: 300});
+        return marker;
+    };
+})()"""
+
+# Réseau complet : [lat, lon, cinéma, adresse]
+CALLBACK_RESEAU = """function (row) {
+        var marker = L.circleMarker(new L.LatLng(row[0], row[1]),
+            {radius: 3, color: "%s", fillOpacity: 0.5, weight: 1});
+        marker.bindPopup(function () {
+            var div = document.createElement("div");
+            div.appendChild(document.createElement("b")).textContent = row[2];
+            div.appendChild(document.createElement("br"));
+            div.appendChild(document.createElement("i")).textContent = row[3];
+            return div;
+        });
+        return marker;
+    }""" % COULEUR_RESEAU
+
+
+def generer_carte_legere(groupes_de_cinemas: list, reseau: list = None):
+    """
+    Variante de generer_carte_folium pour des centaines de salles (ou tout le réseau) :
+    une seule couche de données compactes pour les salles trouvées, regroupées côté navigateur,
+    les popups n'étant construites qu'au clic. reseau : cinémas (chargement_cinemas.Cinema)
+    à afficher en fond, dans une couche séparée.
+    Retourne folium.Map ou None.
+    """
+    lignes = []
+    for idx, groupe in enumerate(groupes_de_cinemas):
+        couleur = COULEURS[idx % len(COULEURS)]
+        localisation_origine = groupe.get("localisation", "Inconnue")
+        for cinema in groupe.get("resultats", []):
+            contact = cinema.get("contact", {})
+            lignes.append([
+                round(cinema["lat"], 6), round(cinema["lon"], 6), couleur,
+                cinema.get("cinema", "N/A"), cinema.get("salle", "N/A"), cinema.get("adresse", "N/A"),
+                cinema.get("capacite", "N/A"), cinema.get("distance_km", "N/A"), localisation_origine,
+                contact.get("nom", "N/A"), contact.get("email", "N/A"),
+            ])
+    if not lignes and not reseau:
+        return None
+
+    points = lignes or [[c.lat, c.lon] for c in reseau]
+    avg_lat = sum(p[0] for p in points) / len(points)
+    avg_lon = sum(p[1] for p in points) / len(points)
+    m = folium.Map(location=[avg_lat, avg_lon], zoom_start=6, tiles="CartoDB positron")
+    if reseau:
+        donnees_reseau = [[round(c.lat, 6), round(c.lon, 6), c.cinema, c.adresse] for c in reseau]
+        FastMarkerCluster(donnees_reseau, callback=CALLBACK_RESEAU, name=f"Réseau complet ({len(reseau)} cinémas)",
+                          disableClusteringAtZoom=12).add_to(m)
+    if lignes:
+        FastMarkerCluster(lignes, callback=CALLBACK_SALLE, name=f"Salles trouvées ({len(lignes)})",
+                          disableClusteringAtZoom=12).add_to(m)
+    folium.LayerControl().add_to(m)
+    return m
+
+
+def carte_en_html(carte: folium.Map) -> bytes:
+    """HTML autonome de la carte, produit en mémoire (aucun fichier écrit)."""
+    return carte.get_root().render().encode("utf-8")
@@ -0,0 +1,166 @@
+# --- chargement_cinemas.py ---
+# Chargement normalisé des cinémas pré-géocodés, avec cache binaire sur disque
+# -*- coding: utf-8 -*-
+
+import hashlib
+import os
+import pickle
+import sys
+from typing import NamedTuple, Optional, Tuple
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Geocod"))
+from flux_json import iterer_elements # Lecture en flux (tableau JSON ou JSONL)
+
+# À incrémenter si la structure des enregistrements change (invalide les caches existants)
+VERSION_CACHE = 1
+
+
+# NamedTuple plutôt que dataclass : immuable (plus de mutation des données partagées)
+# et nettement plus rapide à relire depuis le cache pickle
+class Salle(NamedTuple):
+    salle: str
+    cnc: str
+    capacite: int  # 0 si la capacité source est vide ou non numérique
+    equipement: str
+    format_projection: str
+
+
+class Cinema(NamedTuple):
+    cinema: str
+    adresse: str
+    lat: float
+    lon: float
+    contact_nom: str
+    contact_email: str
+    contact_telephone: str
+    salles: Tuple[Salle, ...]
+    meilleure_salle: Optional[Salle]  # Plus grande salle (la première en cas d'égalité), None si aucune capacité
+
+    @property
+    def capacite_max(self) -> int:
+        return self.meilleure_salle.capacite if self.meilleure_salle else 0
+
+    @property
+    def contact(self) -> dict:
+        return {"nom": self.contact_nom, "email": self.contact_email, "telephone": self.contact_telephone}
+
+
+def _entier(valeur) -> int:
+    try:
+        return max(int(valeur), 0)
+    except (ValueError, TypeError):
+        return 0
+
+
+def normaliser_cinema(brut: dict) -> Cinema:
+    """Convertit un cinéma du JSON regroupé en enregistrement typé (capacités entières, contact à plat)."""
+    salles = tuple(
+        Salle(
+            salle=str(s.get("salle", "") or ""), cnc=str(s.get("cnc", "") or ""),
+            capacite=_entier(s.get("capacite", 0)),
+            equipement=str(s.get("equipement", "") or ""),
+            format_projection=str(s.get("format_projection", "") or ""),
+        )
+        for s in brut.get("salles", [])
+    )
+    meilleure = None
+    for salle in salles:
+        if salle.capacite > (meilleure.capacite if meilleure else 0):
+            meilleure = salle
+    contact = brut.get("contact") or {}
+    return Cinema(
+        cinema=brut.get("cinema", "") or "", adresse=brut.get("adresse", "") or "",
+        lat=float(brut["lat"]), lon=float(brut["lon"]),
+        contact_nom=contact.get("nom", "") or "", contact_email=contact.get("email", "") or "",
+        contact_telephone=contact.get("telephone", "") or "",
+        salles=salles, meilleure_salle=meilleure,
+    )
+
+
+def _empreinte_fichier(chemin: str) -> str:
+    sha = hashlib.sha256()
+    with open(chemin, "rb") as f:
+        for bloc in iter(lambda: f.read(1 << 20), b""):
+            sha.update(bloc)
+    return sha.hexdigest()
+
+
+def chemin_cache_par_defaut(chemin_json: str) -> str:
+    base, _ = os.path.splitext(chemin_json)
+    return f"{base}.cache.pkl"
+
+
+def _lire_cache(chemin_cache: str):
+    try:
+        with open(chemin_cache, "rb") as f:
+            contenu = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+    if not isinstance(contenu, dict) or contenu.get("version") != VERSION_CACHE:
+        return None
+    return contenu
+
+
+def _ecrire_cache(chemin_cache: str, contenu: dict):
+    # Écriture atomique : un cache à moitié écrit ne doit jamais être relu
+    temporaire = f"{chemin_cache}.{os.getpid()}.tmp"
+    try:
+        with open(temporaire, "wb") as f:
+            pickle.dump(contenu, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporaire, chemin_cache)
+    except OSError:
+        if os.path.exists(temporaire):
+            os.remove(temporaire)
+
+
+def charger_cinemas(chemin_json: str, chemin_cache: Optional[str] = None, utiliser_cache: bool = True):
+    """
+    Charge les cinémas pré-géocodés sous forme d'enregistrements typés.
+    Les cinémas sans coordonnées sont écartés. Le résultat est mis en cache (pickle) à côté
+    du fichier source, indexé par la date de modification, la taille et le SHA-256 du JSON :
+    si le fichier n'a pas changé, le JSON n'est pas relu.
+    Retourne un tuple (liste de Cinema, nombre de cinémas ignorés).
+    Le fichier peut être un tableau JSON ou un fichier JSONL (un cinéma par ligne).
+    Lève FileNotFoundError / json.JSONDecodeError comme un json.load classique.
+    """
+    stat = os.stat(chemin_json)
+    chemin_cache = chemin_cache or chemin_cache_par_defaut(chemin_json)
+
+    empreinte = None
+    if utiliser_cache:
+        contenu = _lire_cache(chemin_cache)
+        if contenu:
+            if contenu["mtime_ns"] == stat.st_mtime_ns and contenu["taille"] == stat.st_size:
+                return contenu["cinemas"], contenu["nb_ignores"]
+            # Date modifiée (copie, checkout...) : on compare le contenu avant de tout reparser
+            empreinte = _empreinte_fichier(chemin_json)
+            if contenu["sha256"] == empreinte:
+                contenu.update(mtime_ns=stat.st_mtime_ns, taille=stat.st_size)
+                _ecrire_cache(chemin_cache, contenu)
+                return contenu["cinemas"], contenu["nb_ignores"]
+
+    # Normalisation au fil de la lecture : le JSON brut n'est jamais entièrement en mémoire
+    cinemas, nb_ignores = [], 0
+    for brut in iterer_elements(chemin_json):
+        if brut.get('lat') is not None and brut.get('lon') is not None:
+            cinemas.append(normaliser_cinema(brut))
+        else:
+            nb_ignores += 1
+
+    if utiliser_cache:
+        _ecrire_cache(chemin_cache, {
+            "version": VERSION_CACHE, "mtime_ns": stat.st_mtime_ns, "taille": stat.st_size,
+            "sha256": empreinte or _empreinte_fichier(chemin_json),
+            "cinemas": cinemas, "nb_ignores": nb_ignores,
+        })
+    return cinemas, nb_ignores
+
+
+def charger_cinemas_base(base):
+    """
+    Même résultat que charger_cinemas, lu dans la base SQLite (Geocod/base_cinemas.py, objet BaseCinemas).
+    Pas de cache pickle : la lecture de la base indexée est déjà de l'ordre de quelques dizaines de ms.
+    """
+    groupes = base.cinemas()
+    cinemas = [normaliser_cinema(c) for c in groupes if c["lat"] is not None and c["lon"] is not None]
+    return cinemas, len(groupes) - len(cinemas)
@@ -0,0 +1,70 @@
+# --- export_resultats.py ---
+# Export des résultats de recherche : tableaux par zone (construits par colonnes) et classeur Excel en mémoire
+# -*- coding: utf-8 -*-
+
+import io
+import re
+import pandas as pd
+import xlsxwriter
+
+COLONNES = ["Cinéma", "Salle", "Adresse", "Capacité", "Distance (km)", "Contact", "Latitude", "Longitude"]
+LARGEURS = {"Cinéma": 30, "Salle": 12, "Adresse": 45, "Capacité": 10, "Distance (km)": 13, "Contact": 45, "Latitude": 11, "Longitude": 11}
+
+
+def colonnes_zone(resultats: list) -> dict:
+    """Résultats d'une zone (dicts de trouver_cinemas_zones) -> dict colonne -> liste de valeurs."""
+    contacts = [r.get("contact", {}) for r in resultats]
+    return {
+        "Cinéma": [r.get("cinema", "N/A") for r in resultats],
+        "Salle": [r.get("salle", "N/A") for r in resultats],
+        "Adresse": [r.get("adresse", "N/A") for r in resultats],
+        "Capacité": [r.get("capacite", 0) for r in resultats],
+        "Distance (km)": [r.get("distance_km", 0) for r in resultats],
+        "Contact": [" / ".join(filter(None, [c.get("nom", ""), c.get("email", ""), c.get("telephone", "")])) for c in contacts],
+        "Latitude": [r.get("lat", 0.0) for r in resultats],
+        "Longitude": [r.get("lon", 0.0) for r in resultats],
+    }
+
+
+def tableau_zone(resultats: list) -> pd.DataFrame:
+    """DataFrame d'affichage d'une zone, construit directement à partir des colonnes."""
+    return pd.DataFrame(colonnes_zone(resultats), columns=COLONNES)
+
+
+def noms_feuilles(localisations: list) -> list:
+    """Noms de feuilles Excel valides (31 caractères, sans []:*?/\\) et uniques, dans l'ordre des zones."""
+    noms, vus = [], set()
+    for loc in localisations:
+        base = re.sub(r"[\[\]:*?/\\]", "", "".join(c for c in loc if c.isalnum() or c in (" ", "_"))).strip()[:31] or "Zone"
+        nom, i = base, 2
+        while nom.lower() in vus:
+            suffixe = f" ({i})"
+            nom, i = base[:31 - len(suffixe)] + suffixe, i + 1
+        vus.add(nom.lower())
+        noms.append(nom)
+    return noms
+
+
+def classeur_excel(groupes: list) -> bytes:
+    """
+    Classeur .xlsx avec une feuille par zone ayant des résultats.
+    Écriture ligne à ligne en mode constant_memory d'xlsxwriter : la mémoire ne dépend pas du nombre de salles.
+    Retourne les octets du fichier, ou b"" si aucune zone n'a de résultat.
+    """
+    groupes = [g for g in groupes if g.get("resultats")]
+    if not groupes:
+        return b""
+    sortie = io.BytesIO()
+    classeur = xlsxwriter.Workbook(sortie, {"constant_memory": True})
+    entete = classeur.add_format({"bold": True, "border": 1})
+    for nom, groupe in zip(noms_feuilles([g["localisation"] for g in groupes]), groupes):
+        feuille = classeur.add_worksheet(nom)
+        for j, colonne in enumerate(COLONNES):
+            feuille.set_column(j, j, LARGEURS[colonne])
+        feuille.write_row(0, 0, COLONNES, entete)
+        colonnes = colonnes_zone(groupe["resultats"])
+        # constant_memory impose d'écrire les lignes dans l'ordre
+        for i, ligne in enumerate(zip(*(colonnes[c] for c in COLONNES)), start=1):
+            feuille.write_row(i, 0, ligne)
+    classeur.close()
+    return sortie.getvalue()
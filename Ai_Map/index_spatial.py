@@ -0,0 +1,82 @@
+# --- index_spatial.py ---
+# Index spatial en grille pour la recherche de cinémas par rayon
+# -*- coding: utf-8 -*-
+
+import math
+from collections import defaultdict
+from geopy.distance import geodesic
+
+# Taille d'une cellule de la grille (en degrés). 0.5° ≈ 55 km en latitude,
+# ≈ 37 km en longitude en métropole : un rayon de 50 km touche une dizaine de cellules.
+TAILLE_CELLULE_DEG = 0.5
+# Longueur minimale d'un degré de latitude sur l'ellipsoïde WGS84 (à l'équateur).
+# On prend la borne basse pour que la boîte englobante ne soit jamais trop petite.
+KM_PAR_DEGRE_MIN = 110.5
+
+
+class IndexSpatial:
+    """
+    Grille régulière lat/lon construite une seule fois au chargement des cinémas.
+    Chaque cellule contient les indices (dans la liste d'origine) des cinémas qu'elle contient.
+    Une recherche par rayon ne parcourt que les cellules qui recouvrent la boîte englobante
+    du cercle, puis affine les candidats avec la distance géodésique exacte.
+    """
+
+    def __init__(self, points, taille_cellule_deg=TAILLE_CELLULE_DEG):
+        self.taille = taille_cellule_deg
+        self.points = []
+        self.cellules = defaultdict(list)
+        for i, (lat, lon) in enumerate(points):
+            self.points.append((lat, lon))
+            if lat is None or lon is None:
+                continue
+            self.cellules[self._cellule(lat, lon)].append(i)
+
+    def __len__(self):
+        return len(self.points)
+
+    def _cellule(self, lat, lon):
+        return (math.floor(lat / self.taille), math.floor(lon / self.taille))
+
+    def candidats(self, lat, lon, rayon_km):
+        """
+        Retourne les indices des cinémas situés dans la boîte englobante du cercle
+        (sur-ensemble du résultat exact), triés dans l'ordre de la liste d'origine.
+        """
+        dlat = rayon_km / KM_PAR_DEGRE_MIN
+        cos_lat = math.cos(math.radians(min(abs(lat) + dlat, 90.0)))
+        # Près d'un pôle la boîte couvre toutes les longitudes
+        dlon = 180.0 if cos_lat < 1e-6 else min(dlat / cos_lat, 180.0)
+
+        i_min, j_min = self._cellule(lat - dlat, lon - dlon)
+        i_max, j_max = self._cellule(lat + dlat, lon + dlon)
+        nb_cellules_boite = (i_max - i_min + 1) * (j_max - j_min + 1)
+
+        indices = []
+        if nb_cellules_boite > len(self.cellules):
+            # Boîte très large : plus rapide de parcourir les cellules occupées
+            for (i, j), contenu in self.cellules.items():
+                if i_min <= i <= i_max and j_min <= j <= j_max:
+                    indices.extend(contenu)
+        else:
+            for i in range(i_min, i_max + 1):
+                for j in range(j_min, j_max + 1):
+                    contenu = self.cellules.get((i, j))
+                    if contenu:
+                        indices.extend(contenu)
+        indices.sort()
+        return indices
+
+    def rechercher(self, point_central, rayon_km):
+        """
+        Recherche par rayon autour de point_central (lat, lon).
+        Retourne une liste de tuples (indice, distance_km) pour les cinémas à moins de rayon_km,
+        dans l'ordre de la liste d'origine (comme un parcours complet).
+        """
+        lat, lon = point_central
+        resultats = []
+        for i in self.candidats(lat, lon, rayon_km):
+            distance = geodesic(point_central, self.points[i]).km
+            if distance <= rayon_km:
+                resultats.append((i, distance))
+        return resultats
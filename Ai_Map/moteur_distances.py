@@ -0,0 +1,146 @@
+# --- moteur_distances.py ---
+# Représentation en colonnes des cinémas et calcul vectorisé des distances (haversine)
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+# Rayon moyen de la Terre (IUGG), en km
+RAYON_TERRE_KM = 6371.0088
+
+# Tolérance documentée par rapport à geopy.distance.geodesic (ellipsoïde WGS84) :
+# la formule haversine suppose une Terre sphérique, l'écart relatif reste sous 0,5 %
+# pour des distances en France (≈ 0,25 km sur un rayon de 50 km).
+# Vérifié par test_moteur_distances.py sur cinemas_groupedBig.json.
+TOLERANCE_RELATIVE = 0.005
+TOLERANCE_ABSOLUE_KM = 0.01
+
+
+def haversine_km(lat, lon, lats, lons):
+    """
+    Distance orthodromique (km) entre un point (lat, lon) et des tableaux de latitudes/longitudes.
+    Tous les angles sont en degrés. Retourne un np.ndarray de la taille de lats.
+    """
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2.0) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2.0) ** 2
+    return 2.0 * RAYON_TERRE_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class TableCinemas:
+    """
+    Colonnes NumPy construites une seule fois à partir des cinémas normalisés
+    (chargement_cinemas.Cinema) : lats, lons et capacité de la plus grande salle.
+    Les indices renvoyés par les recherches sont ceux de la liste d'origine.
+    """
+
+    def __init__(self, cinemas):
+        self.lats = np.array([c.lat for c in cinemas], dtype=np.float64)
+        self.lons = np.array([c.lon for c in cinemas], dtype=np.float64)
+        self.capacite_max = np.array([c.capacite_max for c in cinemas], dtype=np.int64)
+
+    def __len__(self):
+        return len(self.lats)
+
+    def distances(self, point, indices=None):
+        """Distances (km) depuis point vers tous les cinémas, ou vers le sous-ensemble indices."""
+        if indices is None:
+            return haversine_km(point[0], point[1], self.lats, self.lons)
+        return haversine_km(point[0], point[1], self.lats[indices], self.lons[indices])
+
+    def dans_rayon(self, point, rayon_km, indices=None):
+        """
+        Cinémas ayant au moins une salle exploitable à moins de rayon_km de point.
+        indices permet de restreindre le calcul à des candidats (ex : IndexSpatial.candidats).
+        Retourne (indices, distances_km) dans l'ordre de la liste d'origine.
+        """
+        indices = np.arange(len(self)) if indices is None else np.asarray(indices, dtype=np.int64)
+        distances = self.distances(point, indices)
+        masque = (distances <= rayon_km) & (self.capacite_max[indices] > 0)
+        return indices[masque], distances[masque]
+
+    def _ordre(self, indices, distances, n, priorite_capacite=False):
+        """
+        Positions (dans indices) des n meilleurs cinémas, triées.
+        Ordre par défaut : distance arrondie au 10 m, puis capacité décroissante, puis ordre d'origine.
+        Avec priorite_capacite : capacité décroissante, puis ordre d'origine.
+        Un argpartition isole les n premiers (et les ex æquo à la frontière) : seuls eux sont triés.
+        """
+        capacites = self.capacite_max[indices]
+        cle = -capacites if priorite_capacite else np.round(distances, 2)
+        if n < len(indices):
+            seuil = cle[np.argpartition(cle, n - 1)[n - 1]]
+            selection = np.flatnonzero(cle <= seuil)
+        else:
+            selection = np.arange(len(indices))
+        if priorite_capacite:
+            cles_tri = (indices[selection], cle[selection])
+        else:
+            cles_tri = (indices[selection], -capacites[selection], cle[selection])
+        return selection[np.lexsort(cles_tri)][:n]
+
+    def plus_proches(self, point, n, rayon_km=None, indices=None, priorite_capacite=False):
+        """
+        Les n meilleurs cinémas autour de point (voir _ordre), éventuellement limités à rayon_km.
+        Retourne (indices, distances_km) triés.
+        """
+        if rayon_km is None:
+            indices = np.arange(len(self)) if indices is None else np.asarray(indices, dtype=np.int64)
+            distances = self.distances(point, indices)
+            masque = self.capacite_max[indices] > 0
+            indices, distances = indices[masque], distances[masque]
+        else:
+            indices, distances = self.dans_rayon(point, rayon_km, indices)
+        if n <= 0 or len(indices) == 0:
+            return indices[:0], distances[:0]
+        ordre = self._ordre(indices, distances, n, priorite_capacite)
+        return indices[ordre], distances[ordre]
+
+    def plus_proches_zones(self, points, nombres, rayons_km, priorites=None, dedoublonner=True, indices=None):
+        """
+        Recherche groupée pour plusieurs zones : une seule matrice de distances (zones x cinémas)
+        calculée par diffusion NumPy, puis sélection par zone.
+        Avec dedoublonner, un cinéma revendiqué par plusieurs zones qui se chevauchent n'est attribué
+        qu'une fois : les zones choisissent à tour de rôle, dans l'ordre de points, leur meilleur cinéma
+        encore libre. Un cinéma revient donc à la première zone qui l'atteint dans ce tour de table,
+        pas forcément à celle qui le classe le mieux (ni à la plus proche).
+        indices permet de limiter les colonnes de la matrice aux candidats (union des IndexSpatial.candidats).
+        Retourne une liste de (indices, distances_km) triés, une entrée par zone.
+        """
+        nb_zones = len(points)
+        priorites = priorites or [False] * nb_zones
+        if nb_zones == 0:
+            return []
+        colonnes = np.arange(len(self)) if indices is None else np.asarray(indices, dtype=np.int64)
+        lats = np.array([p[0] for p in points], dtype=np.float64)[:, None]
+        lons = np.array([p[1] for p in points], dtype=np.float64)[:, None]
+        matrice = haversine_km(lats, lons, self.lats[colonnes][None, :], self.lons[colonnes][None, :])
+        eligibles = (matrice <= np.asarray(rayons_km, dtype=np.float64)[:, None]) & (self.capacite_max[colonnes] > 0)[None, :]
+
+        classements = []
+        for z in range(nb_zones):
+            positions = np.flatnonzero(eligibles[z])
+            indices_zone, distances = colonnes[positions], matrice[z, positions]
+            # Sans dédoublonnage, seuls les n premiers sont utiles ; avec, il faut tout le classement
+            n = len(positions) if dedoublonner else max(nombres[z], 0)
+            ordre = self._ordre(indices_zone, distances, n, priorites[z]) if len(positions) else positions
+            classements.append((indices_zone[ordre], distances[ordre]))
+        if not dedoublonner:
+            return classements
+
+        attribues = np.zeros(len(self), dtype=bool)
+        choix = [[] for _ in range(nb_zones)]
+        rangs = [0] * nb_zones
+        actives = [z for z in range(nb_zones) if nombres[z] > 0]
+        while actives:
+            for z in list(actives):
+                classement = classements[z][0]
+                while rangs[z] < len(classement) and attribues[classement[rangs[z]]]:
+                    rangs[z] += 1
+                if rangs[z] < len(classement):
+                    attribues[classement[rangs[z]]] = True
+                    choix[z].append(rangs[z])
+                    rangs[z] += 1
+                if len(choix[z]) >= nombres[z] or rangs[z] >= len(classement):
+                    actives.remove(z)
+        return [(classement[positions], distances[positions])
+                for (classement, distances), positions in zip(classements, (np.array(c, dtype=np.int64) for c in choix))]
@@ -0,0 +1,42 @@
+# --- preparation_plan.py ---
+# Géocodage des localisations d'un plan et préparation IA mémorisée dans la session Streamlit entre deux reruns
+# -*- coding: utf-8 -*-
+
+from concurrent.futures import ThreadPoolExecutor
+
+CLE_SESSION = "preparation_ia"
+
+
+def geocoder_localisations(localisations: list, geocoder, geocodes_connus: dict = None, nb_threads: int = 8):
+    """
+    Géocode en parallèle une liste de localisations (sans doublons).
+    geocoder(localisation) -> (coords, message), appelé depuis des threads (aucun appel Streamlit).
+    geocodes_connus : résultats déjà obtenus (orchestration asynchrone ou session), non recalculés.
+    Retourne un dict localisation -> (coords, message).
+    """
+    geocodes = dict(geocodes_connus or {})
+    uniques = [loc for loc in dict.fromkeys(localisations) if loc not in geocodes]
+    if uniques:
+        with ThreadPoolExecutor(max_workers=min(nb_threads, len(uniques))) as executor:
+            geocodes.update(zip(uniques, executor.map(geocoder, uniques)))
+    return geocodes
+
+
+def lire_preparation(session, description: str, question: str):
+    """(reponse_contexte, reponse_plan, geocodes) mémorisés pour ce couple (description, plan), ou None."""
+    preparation = session.get(CLE_SESSION)
+    if preparation and preparation[0] == (description, question):
+        return preparation[1]
+    return None
+
+
+def memoriser_preparation(session, description: str, question: str, reponse_contexte, reponse_plan, geocodes: dict):
+    """
+    Mémorise la préparation dans session (st.session_state) si les appels à l'IA demandés ont abouti.
+    Seules les localisations trouvées sont gardées : une localisation en échec (timeout, service
+    indisponible) ou introuvable est regéocodée au rerun suivant par geocoder_localisations.
+    """
+    if (reponse_contexte is None and description) or (reponse_plan is None and question):
+        return  # Appel en échec : retenté au prochain rerun
+    trouves = {loc: resultat for loc, resultat in geocodes.items() if resultat[0] is not None}
+    session[CLE_SESSION] = ((description, question), (reponse_contexte, reponse_plan, trouves))
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+Allocation par objectif de spectateurs (allocation_salles.py) : quand l'arrondi des capacités
+empêche le sac à dos de conclure, le repli glouton s'arrête dès que l'objectif est atteint.
+"""
+
+from types import SimpleNamespace
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from allocation_salles import AllocateurSalles, CRITERE_DISTANCE
+
+
+class TableFactice:
+    """Distances fixes (km) de chaque cinéma au centre de la zone."""
+
+    def __init__(self, distances):
+        self._distances = np.asarray(distances, dtype=float)
+
+    def distances(self, point):
+        return self._distances
+
+
+def _allocateur(capacites):
+    cinemas = [SimpleNamespace(salles=[SimpleNamespace(capacite=c)]) for c in capacites]
+    return AllocateurSalles(cinemas, TableFactice(np.linspace(1, 20, len(capacites))))
+
+
+def test_sac_a_dos_couvre_l_objectif_au_moindre_cout():
+    allocateur = _allocateur([300, 200, 120, 100, 80])
+    (resultat,) = allocateur.allouer([((48.85, 2.35), 280, 50)], CRITERE_DISTANCE)
+    assert resultat["salles"] == [(0, 0, 1.0)] and resultat["capacite"] == 300  # La plus proche suffit
+
+
+def test_repli_glouton_quand_l_arrondi_empeche_le_sac_a_dos():
+    # Objectif 4001 : pas de 3 places, une salle de 14 places ne compte que pour 12 ;
+    # 300 salles (4200 places) couvrent l'objectif, mais pas leurs capacités arrondies.
+    capacites = np.full(300, 14)
+    assert AllocateurSalles._sac_a_dos(capacites, np.ones(300), 4001) is None
+    (resultat,) = _allocateur(capacites).allouer([((48.85, 2.35), 4001, 50)], CRITERE_DISTANCE)
+    assert 4001 <= resultat["capacite"] < 4001 + 14
+    assert len(resultat["salles"]) == 286
+
+
+def test_repli_glouton_retire_les_salles_inutiles():
+    assert AllocateurSalles._couverture_gloutonne(np.array([5, 100, 3, 50]), 120) == [1, 3]
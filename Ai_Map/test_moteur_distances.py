@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Test de non-régression : le moteur haversine vectorisé doit reproduire
+l'ancien calcul geopy.distance.geodesic sur cinemas_groupedBig.json,
+à la tolérance documentée dans moteur_distances.py.
+"""
+
+import json
+import os
+import pytest
+
+np = pytest.importorskip("numpy")
+geodesic = pytest.importorskip("geopy.distance").geodesic
+
+from chargement_cinemas import charger_cinemas as charger_cinemas_normalises
+from moteur_distances import TableCinemas, TOLERANCE_RELATIVE, TOLERANCE_ABSOLUE_KM
+
+FICHIER_CINEMAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cinemas_groupedBig.json")
+
+POINTS_TEST = [(48.8566, 2.3522), (43.2965, 5.3698), (50.6292, 3.0573), (44.8378, -0.5792), (48.5734, 7.7521)]
+
+
+def charger_cinemas():
+    with open(FICHIER_CINEMAS, "r", encoding="utf-8") as f:
+        return [c for c in json.load(f) if c.get('lat') is not None and c.get('lon') is not None]
+
+
+def construire_table():
+    cinemas, _ = charger_cinemas_normalises(FICHIER_CINEMAS, utiliser_cache=False)
+    return TableCinemas(cinemas)
+
+
+def ancienne_recherche(cinemas, point, nombre, rayon_km):
+    """Reproduction de l'ancien trouver_cinemas_proches (geodesic + une salle par cinéma)."""
+    eligibles = []
+    for i, cinema in enumerate(cinemas):
+        distance = geodesic(point, (cinema['lat'], cinema['lon'])).km
+        if distance > rayon_km:
+            continue
+        capacites = []
+        for s in cinema.get("salles", []):
+            try:
+                capacite = int(s.get("capacite", 0))
+            except (ValueError, TypeError):
+                continue
+            if capacite > 0:
+                capacites.append(capacite)
+        if capacites:
+            eligibles.append((round(distance, 2), -max(capacites), i, distance))
+    eligibles.sort(key=lambda x: (x[0], x[1]))
+    return eligibles[:nombre]
+
+
+def test_distances_dans_la_tolerance():
+    cinemas = charger_cinemas()
+    table = construire_table()
+    for point in POINTS_TEST:
+        distances = table.distances(point)
+        reference = np.array([geodesic(point, (c['lat'], c['lon'])).km for c in cinemas])
+        ecart = np.abs(distances - reference)
+        assert np.all(ecart <= TOLERANCE_RELATIVE * reference + TOLERANCE_ABSOLUE_KM)
+
+
+def _tolerance(distance_km):
+    return TOLERANCE_RELATIVE * distance_km + TOLERANCE_ABSOLUE_KM
+
+
+def test_plus_proches_identique_a_l_ancienne_recherche():
+    cinemas = charger_cinemas()
+    table = construire_table()
+    for point in POINTS_TEST:
+        reference = np.array([geodesic(point, (c['lat'], c['lon'])).km for c in cinemas])
+        for nombre, rayon in [(1, 50), (10, 50), (40, 100)]:
+            indices, distances = table.plus_proches(point, nombre, rayon)
+            attendu = ancienne_recherche(cinemas, point, nombre, rayon)
+            assert len(indices) == len(attendu) and len(set(indices.tolist())) == len(indices)
+            for rang, (idx, distance, (_, _, idx_attendu, distance_attendue)) in enumerate(zip(indices, distances, attendu)):
+                assert abs(distance - reference[idx]) <= _tolerance(reference[idx])
+                if idx != idx_attendu:
+                    # Seule différence admise : inversion de deux cinémas dont les distances de référence
+                    # sont indiscernables à la tolérance près (écart de chaque côté)
+                    assert abs(reference[idx] - distance_attendue) <= 2 * _tolerance(distance_attendue), (point, nombre, rang)
+            # Mêmes cinémas retenus ; au dernier rang, un cinéma équidistant du dernier attendu peut le remplacer
+            derniere = attendu[-1][3] if attendu else 0.0
+            for idx in set(indices.tolist()) ^ {a[2] for a in attendu}:
+                assert abs(reference[idx] - derniere) <= 2 * _tolerance(derniere), (point, nombre, idx)
+
+
+def test_meilleure_salle_precalculee():
+    cinemas = charger_cinemas()
+    normalises, nb_ignores = charger_cinemas_normalises(FICHIER_CINEMAS, utiliser_cache=False)
+    assert len(normalises) == len(cinemas) and nb_ignores > 0
+    for brut, cinema in zip(cinemas, normalises):
+        capacites = [int(s["capacite"]) for s in brut["salles"] if str(s.get("capacite", "")).isdigit()]
+        assert cinema.capacite_max == max(capacites, default=0)
+        assert all(isinstance(s.capacite, int) for s in cinema.salles)
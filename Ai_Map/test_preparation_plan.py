@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+Préparation IA mémorisée dans la session (preparation_plan.py) : un rerun réutilise les réponses
+de l'IA et les localisations trouvées, mais regéocode celles qui étaient en échec.
+"""
+
+from preparation_plan import geocoder_localisations, lire_preparation, memoriser_preparation
+
+PARIS = ((48.8566, 2.3522), None)
+TIMEOUT = (None, ("error", "❌ Erreur de géocodage (timeout/indisponible) pour 'Rennes, France'"))
+
+
+class GeocodeurFactice:
+    def __init__(self):
+        self.appels = []
+
+    def __call__(self, localisation):
+        self.appels.append(localisation)
+        return {"Paris": PARIS, "Rennes": ((48.1173, -1.6778), None)}[localisation]
+
+
+def test_localisation_en_echec_regeocodee_au_rerun():
+    session = {}
+    # Premier passage : Nominatim en timeout pour Rennes
+    memoriser_preparation(session, "Film", "Paris et Rennes", '{"regions": []}', "[...]", {"Paris": PARIS, "Rennes": TIMEOUT})
+
+    # Rerun (rayon modifié) : l'IA n'est pas rappelée, Paris est repris, Rennes regéocodée
+    reponse_contexte, reponse_plan, geocodes_connus = lire_preparation(session, "Film", "Paris et Rennes")
+    assert (reponse_contexte, reponse_plan) == ('{"regions": []}', "[...]")
+    geocodeur = GeocodeurFactice()
+    geocodes = geocoder_localisations(["Paris", "Rennes", "Rennes"], geocodeur, geocodes_connus)
+    assert geocodeur.appels == ["Rennes"]
+    assert geocodes == {"Paris": PARIS, "Rennes": ((48.1173, -1.6778), None)}
+
+
+def test_appel_ia_en_echec_non_memorise():
+    session = {}
+    memoriser_preparation(session, "Film", "Paris", None, "[...]", {"Paris": PARIS})
+    assert lire_preparation(session, "Film", "Paris") is None
+    memoriser_preparation(session, "", "Paris", None, "[...]", {"Paris": PARIS})  # Pas de description : rien à analyser
+    assert lire_preparation(session, "", "Paris") == (None, "[...]", {"Paris": PARIS})
+    assert lire_preparation(session, "", "Paris (modifié)") is None
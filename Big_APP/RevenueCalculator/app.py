@@ -9,6 +9,14 @@ from reportlab.lib.units import inch
 import matplotlib.pyplot as plt
 import io
 import base64
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Geocod"))
+from base_cinemas import CHEMIN_BASE_PAR_DEFAUT, BaseCinemas # Base SQLite unique des cinémas
+
+# Colonnes de BaseCinemas.salles() -> libellés affichés
+COLONNES_BASE = {"cinema": "Cinéma", "adresse": "Adresse", "salle": "Salle", "cnc": "CNC", "capacite": "Capacité"}
 
 def create_pdf_report(combined_df, total_capacity, budget_global, revenu_brut_ttc, 
                      revenu_brut_ht, revenu_exploitant, revenu_ayant_droit, 
@@ -146,27 +154,38 @@ st.set_page_config(page_title="Calculateur de Revenus", layout="wide")
 
 st.title("Calculateur de Revenus")
 
-# Upload Excel file
-uploaded_file = st.file_uploader("Choisissez votre fichier Excel contenant les capacités des salles", type=['xlsx', 'xls'])
+# Source des capacités : fichier Excel, ou cinémas choisis dans la base commune (Geocod/base_cinemas.py)
+uploaded_file = None
+salles_base = None
+if os.path.exists(CHEMIN_BASE_PAR_DEFAUT) and st.radio("Source des capacités", ["Fichier Excel", "Base cinémas"], horizontal=True) == "Base cinémas":
+    base_cinemas = BaseCinemas()
+    choix_cinemas = st.multiselect("Cinémas", base_cinemas.noms(), format_func=lambda c: f"{c[0]} — {c[1]}")
+    if choix_cinemas:
+        salles_base = base_cinemas.salles(choix_cinemas)
+else:
+    # Upload Excel file
+    uploaded_file = st.file_uploader("Choisissez votre fichier Excel contenant les capacités des salles", type=['xlsx', 'xls'])
 
-if uploaded_file is not None:
+if uploaded_file is not None or salles_base:
     try:
-        # Read all sheets from Excel file
-        excel_file = pd.ExcelFile(uploaded_file)
-        sheet_names = excel_file.sheet_names
-        
-        st.subheader("Onglets trouvés dans le fichier")
+        if salles_base:
+            # Un onglet par cinéma choisi dans la base : (nom, adresse) comme dans la liste de choix,
+            # deux cinémas homonymes à des adresses différentes restent séparés
+            salles_df = pd.DataFrame(salles_base).rename(columns=COLONNES_BASE)
+            all_dfs = {f"{nom} — {adresse}": df.reset_index(drop=True)
+                       for (nom, adresse), df in salles_df.groupby(["Cinéma", "Adresse"], sort=False)}
+            sheet_names = list(all_dfs)
+            st.subheader("Cinémas sélectionnés dans la base")
+        else:
+            # Read all sheets from Excel file
+            excel_file = pd.ExcelFile(uploaded_file)
+            sheet_names = excel_file.sheet_names
+            all_dfs = {sheet_name: pd.read_excel(uploaded_file, sheet_name=sheet_name) for sheet_name in sheet_names}
+            st.subheader("Onglets trouvés dans le fichier")
         st.write(sheet_names)
         
-        # Create a dictionary to store all dataframes
-        all_dfs = {}
         all_capacity_cols = set()
-        
-        # Read each sheet
-        for sheet_name in sheet_names:
-            df = pd.read_excel(uploaded_file, sheet_name=sheet_name)
-            all_dfs[sheet_name] = df
-            
+        for df in all_dfs.values():
             # Detect capacity columns
             for col in df.columns:
                 col_lower = str(col).lower()
@@ -18,15 +18,18 @@ from urllib.parse import urlparse, parse_qs
 import base64
 from io import BytesIO
 import re
-from functools import lru_cache
+from functools import lru_cache, wraps
 import hashlib
 import logging
 from datetime import timedelta
-import sqlite3
 from pathlib import Path
 from Levenshtein import distance
 import sys
 import dateutil.parser
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import inspect
+from cache_donnees import CacheDonnees, cle_appel # Résultats d'API mémorisés entre les sessions
 
 # Configuration du logging
 logging.basicConfig(
@@ -49,8 +52,8 @@ logging.getLogger("urllib3").setLevel(logging.WARNING)
 API_QUOTA_EXCEEDED_ERROR = "quotaExceeded"
 API_RETRY_DELAY = 1
 API_MAX_RETRIES = 3
-CACHE_DURATION = 3600  # 1 heure
-CLEANUP_INTERVAL = 300  # 5 minutes
+YOUTUBE_BATCH_SIZE = 50  # Maximum d'identifiants par appel videos().list
+YOUTUBE_PARALLEL_BATCHES = 4  # Appels videos().list simultanés
 
 # Log au démarrage de l'application
 logger.info("=== DÉMARRAGE DE L'APPLICATION ===")
@@ -93,49 +96,6 @@ if not NEWS_API_KEY:
 else:
     logger.info("NEWS_API_KEY trouvée")
 
-class APICache:
-    """Gestionnaire de cache pour les requêtes API"""
-    def __init__(self, cache_duration=CACHE_DURATION):
-        self.cache = {}
-        self.cache_duration = cache_duration
-        self.last_cleanup = time.time()
-
-    def get(self, key):
-        """Récupère une valeur du cache"""
-        self._cleanup_if_needed()
-        if key in self.cache:
-            data, timestamp = self.cache[key]
-            if time.time() - timestamp < self.cache_duration:
-                logger.debug(f"Cache hit pour {key}")
-                return data
-            else:
-                logger.debug(f"Cache expiré pour {key}")
-                del self.cache[key]
-        return None
-
-    def set(self, key, value):
-        """Stocke une valeur dans le cache"""
-        self.cache[key] = (value, time.time())
-        logger.debug(f"Cache mis à jour pour {key}")
-
-    def _cleanup_if_needed(self):
-        """Nettoie le cache si nécessaire"""
-        current_time = time.time()
-        if current_time - self.last_cleanup > CLEANUP_INTERVAL:
-            self._cleanup()
-            self.last_cleanup = current_time
-
-    def _cleanup(self):
-        """Nettoie les entrées expirées du cache"""
-        current_time = time.time()
-        expired_keys = [
-            key for key, (_, timestamp) in self.cache.items()
-            if current_time - timestamp >= self.cache_duration
-        ]
-        for key in expired_keys:
-            del self.cache[key]
-        logger.debug(f"Nettoyage du cache: {len(expired_keys)} entrées supprimées")
-
 class APIRequestManager:
     """Gestionnaire de requêtes API avec retry et rate limiting"""
     def __init__(self, max_retries=API_MAX_RETRIES, retry_delay=API_RETRY_DELAY):
@@ -179,7 +139,7 @@ class APIRequestManager:
                 time.sleep(self.min_request_interval - elapsed)
 
 class APIKeyManager:
-    """Gestionnaire de clés API avec mise en cache et gestion des erreurs"""
+    """Gestionnaire de clés API avec gestion des erreurs"""
     
     def __init__(self):
         self.youtube_api_key = None
@@ -189,8 +149,6 @@ class APIKeyManager:
         self.max_errors = 3  # Nombre maximum d'erreurs avant de désactiver une clé
         self.error_reset_time = 3600  # Temps en secondes avant de réinitialiser les erreurs (1 heure)
         self.last_error_reset = time.time()
-        self.cache = {}  # Cache pour les résultats d'API
-        self.cache_duration = 3600  # Durée de vie du cache en secondes (1 heure)
         
         # Chargement initial des clés
         self._load_api_keys()
@@ -246,63 +204,6 @@ class APIKeyManager:
             self.youtube_api_errors = 0
             self.news_api_errors = 0
             self.last_error_reset = current_time
-    
-    def get_cached_result(self, key):
-        """Récupère un résultat du cache s'il est valide"""
-        if key in self.cache:
-            result, timestamp = self.cache[key]
-            if time.time() - timestamp < self.cache_duration:
-                logger.debug(f"Résultat trouvé dans le cache pour {key}")
-                return result
-            else:
-                logger.debug(f"Résultat expiré dans le cache pour {key}")
-                del self.cache[key]
-        return None
-    
-    def cache_result(self, key, result):
-        """Met en cache un résultat"""
-        self.cache[key] = (result, time.time())
-        logger.debug(f"Résultat mis en cache pour {key}")
-    
-    def clear_cache(self):
-        """Vide le cache"""
-        self.cache = {}
-        logger.info("Cache vidé")
-
-class CacheManager:
-    def __init__(self, cache_duration=3600):  # 1 heure par défaut
-        self.cache = {}
-        self.cache_duration = cache_duration
-        self.last_cleanup = time.time()
-        self.cleanup_interval = 300  # Nettoyage toutes les 5 minutes
-
-    def get(self, key):
-        self._cleanup_if_needed()
-        if key in self.cache:
-            data, timestamp = self.cache[key]
-            if time.time() - timestamp < self.cache_duration:
-                return data
-            else:
-                del self.cache[key]
-        return None
-
-    def set(self, key, value):
-        self.cache[key] = (value, time.time())
-
-    def _cleanup_if_needed(self):
-        current_time = time.time()
-        if current_time - self.last_cleanup > self.cleanup_interval:
-            self._cleanup()
-            self.last_cleanup = current_time
-
-    def _cleanup(self):
-        current_time = time.time()
-        expired_keys = [
-            key for key, (_, timestamp) in self.cache.items()
-            if current_time - timestamp >= self.cache_duration
-        ]
-        for key in expired_keys:
-            del self.cache[key]
 
 class RetryManager:
     """Gestionnaire de tentatives avec backoff exponentiel"""
@@ -327,8 +228,8 @@ class RetryManager:
 
 # Initialisation des gestionnaires globaux
 api_manager = APIKeyManager()
-cache_manager = CacheManager()
 retry_manager = RetryManager()
+cache_donnees = CacheDonnees()
 
 # Configuration des API keys avec le nouveau gestionnaire
 YOUTUBE_API_KEY = api_manager.get_youtube_api_key()
@@ -506,28 +407,50 @@ class FallbackData:
                 }
             }
 
+def avec_cache(point, valider=None, demo=False):
+    """Mémorise le résultat d'une méthode de DataManager dans le cache persistant (point d'accès point).
+
+    La clé est formée des arguments nommés (valeurs par défaut comprises). Seuls les résultats non vides
+    pour lesquels valider(resultat) est vrai sont mémorisés : un échec sera redemandé.
+    En mode démo, la méthode est appelée directement sauf si demo est vrai (résultat identique dans les deux modes).
+    """
+    def decorateur(methode):
+        signature = inspect.signature(methode)
+
+        @wraps(methode)
+        def enveloppe(self, *args, **kwargs):
+            if not self.use_api and not demo:
+                return methode(self, *args, **kwargs)
+            arguments = signature.bind(self, *args, **kwargs)
+            arguments.apply_defaults()
+            cle = cle_appel({nom: valeur for nom, valeur in arguments.arguments.items() if nom != "self"})
+            resultat = self.cache_donnees.lire(point, cle)
+            if resultat is not None:
+                logger.info(f"Cache {point} utilisé pour {cle}")
+                return resultat
+            resultat = methode(self, *args, **kwargs)
+            if resultat and (valider is None or valider(resultat)):
+                self.cache_donnees.ecrire(point, cle, resultat)
+            return resultat
+        return enveloppe
+    return decorateur
+
 class DataManager:
     """Gestionnaire centralisé des données"""
     def __init__(self, use_api=True):
-        self.cache = APICache()
+        self.cache_donnees = cache_donnees
         self.request_manager = APIRequestManager()
         self.fallback_data = FallbackData()
         self.use_api = use_api
         self.news_api_key = os.getenv("NEWS_API_KEY")
+        self._thread_local = threading.local()  # Un client YouTube par thread (httplib2 n'est pas thread-safe)
         
     def get_platform_data(self, username, platform):
-        """Récupère les données d'une plateforme avec gestion du cache"""
+        """Récupère les données d'une plateforme (chaque appel d'API passe par le cache persistant)"""
         if not username:
             logger.error("Nom d'utilisateur non fourni")
             return None
             
-        cache_key = f"{platform}_{username}_{'api' if self.use_api else 'demo'}"
-        cached_data = self.cache.get(cache_key)
-        
-        if cached_data:
-            logger.info(f"Données récupérées du cache pour {username} sur {platform}")
-            return cached_data
-            
         try:
             if platform.lower() == "youtube":
                 data = self._fetch_youtube_data(username)
@@ -535,8 +458,6 @@ class DataManager:
                 data = self._fetch_instagram_data(username)
                 
             if data:
-                self.cache.set(cache_key, data)
-                logger.info(f"Données mises en cache pour {username} sur {platform}")
                 return data
                 
         except HttpError as e:
@@ -676,6 +597,7 @@ class DataManager:
             logger.error(f"Erreur lors de l'analyse de sentiment: {str(e)}")
             return 0
 
+    @avec_cache("reputation", valider=lambda resultat: resultat.get("status") != "error", demo=True)
     def _analyze_reputation(self, username):
         """Analyse la réputation du créateur (API ou démo)"""
         # Mots-clés étendus pour la détection des polémiques
@@ -864,6 +786,7 @@ class DataManager:
                 "metrics": {}
             }
     
+    @avec_cache("youtube_video_stats")
     def _analyze_video_stats(self, channel_id, period_months=None):
         """Analyse les statistiques des vidéos YouTube avec une gestion améliorée de la pagination et des catégories
         
@@ -954,63 +877,51 @@ class DataManager:
                 "videos": []  # Liste des vidéos pour le logging
             } for cat in categories}
 
-            # Récupération de toutes les vidéos avec pagination améliorée
-            max_retries = 3
-            retry_delay = 2
-            total_videos_retrieved = 0
+            # Playlist "uploads" de la chaîne et nombre total de vidéos
             total_videos_expected = None
-
-            # Première requête pour obtenir le nombre total de vidéos
+            uploads_playlist_id = "UU" + channel_id[2:] if channel_id.startswith("UC") else None
             try:
-                channel_response = youtube.channels().list(
-                    part="statistics",
-                    id=channel_id
-                ).execute()
+                channel_response = self._execute_youtube_request(
+                    lambda: youtube.channels().list(part="statistics,contentDetails", id=channel_id),
+                    "de la chaîne"
+                )
                 if channel_response["items"]:
-                    total_videos_expected = int(channel_response["items"][0]["statistics"]["videoCount"])
+                    channel = channel_response["items"][0]
+                    total_videos_expected = int(channel["statistics"]["videoCount"])
+                    uploads_playlist_id = channel["contentDetails"]["relatedPlaylists"]["uploads"]
                     logger.info(f"Nombre total de vidéos attendu : {total_videos_expected}")
             except Exception as e:
-                logger.warning(f"Impossible de récupérer le nombre total de vidéos : {str(e)}")
+                logger.warning(f"Impossible de récupérer les informations de la chaîne : {str(e)}")
 
-            # Récupération des vidéos avec pagination
-            while True:
-                for attempt in range(max_retries):
-                    try:
-                        search_response = youtube.search().list(
-                            channelId=channel_id,
-                            part="id,snippet",
-                            order="date",
-                            maxResults=50,  # Maximum autorisé par l'API
-                            type="video",
-                            pageToken=nextPageToken
-                        ).execute()
-                        break
-                    except HttpError as e:
-                        if "quotaExceeded" in str(e):
-                            logger.warning(f"Quota API dépassé, tentative {attempt + 1}/{max_retries}")
-                            if attempt < max_retries - 1:
-                                time.sleep(retry_delay * (2 ** attempt))
-                                continue
-                            raise
-                        raise
-                    except Exception as e:
-                        logger.error(f"Erreur lors de la récupération des vidéos : {str(e)}")
-                        if attempt < max_retries - 1:
-                            time.sleep(retry_delay * (2 ** attempt))
-                            continue
-                        raise
+            if not uploads_playlist_id:
+                logger.warning(f"Playlist des vidéos introuvable pour la chaîne {channel_id}")
+                return {}
 
-                items = search_response.get("items", [])
-                if not items:
-                    break
+            # Parcours de la playlist : playlistItems.list coûte 1 unité de quota par page (100 pour search.list),
+            # n'est pas plafonné et renvoie les vidéos de la plus récente à la plus ancienne :
+            # on s'arrête à la première vidéo antérieure à la période demandée.
+            while True:
+                playlist_response = self._execute_youtube_request(
+                    lambda: youtube.playlistItems().list(
+                        playlistId=uploads_playlist_id,
+                        part="snippet,contentDetails",
+                        maxResults=YOUTUBE_BATCH_SIZE,
+                        pageToken=nextPageToken
+                    ),
+                    "des vidéos"
+                )
 
-                for item in items:
-                    published_at = dateutil.parser.parse(item["snippet"]["publishedAt"])
+                cutoff_reached = False
+                for item in playlist_response.get("items", []):
+                    video_id = item["contentDetails"]["videoId"]
+                    published_at = dateutil.parser.parse(
+                        item["contentDetails"].get("videoPublishedAt") or item["snippet"]["publishedAt"]
+                    )
                     if cutoff and published_at < cutoff:
-                        logger.debug(f"Vidéo {item['id']['videoId']} ignorée car trop ancienne ({published_at})")
-                        continue
+                        logger.debug(f"Vidéo {video_id} antérieure à la période ({published_at}) : fin du parcours")
+                        cutoff_reached = True
+                        break
 
-                    video_id = item["id"]["videoId"]
                     video_ids.append(video_id)
                     video_info.append({
                         "videoId": video_id,
@@ -1018,57 +929,29 @@ class DataManager:
                         "publishedAt": published_at,
                         "description": item["snippet"]["description"]
                     })
-                    total_videos_retrieved += 1
-
-                nextPageToken = search_response.get("nextPageToken")
-                if not nextPageToken:
-                    break
 
-                # Vérification si on a atteint le nombre total de vidéos attendu
-                if total_videos_expected and total_videos_retrieved >= total_videos_expected:
-                    logger.info(f"Nombre total de vidéos atteint : {total_videos_retrieved}")
+                nextPageToken = playlist_response.get("nextPageToken")
+                if cutoff_reached or not nextPageToken:
                     break
 
-            logger.info(f"Nombre total de vidéos récupérées : {total_videos_retrieved}")
-            if total_videos_expected and total_videos_retrieved < total_videos_expected:
-                logger.warning(f"Écart détecté : {total_videos_expected - total_videos_retrieved} vidéos manquantes")
+            logger.info(f"Nombre total de vidéos récupérées : {len(video_ids)}")
+            if not cutoff and total_videos_expected and len(video_ids) < total_videos_expected:
+                logger.warning(f"Écart détecté : {total_videos_expected - len(video_ids)} vidéos manquantes")
 
             if not video_ids:
                 logger.warning(f"Aucune vidéo trouvée pour la période de {period_months} mois")
                 return {}
 
-            # Récupération des statistiques détaillées par lots
+            # Récupération des statistiques détaillées par lots de 50, plusieurs lots en parallèle
+            batches = [video_ids[i:i + YOUTUBE_BATCH_SIZE] for i in range(0, len(video_ids), YOUTUBE_BATCH_SIZE)]
             all_stats = {}
-            batch_size = 50  # Maximum autorisé par l'API
-            for i in range(0, len(video_ids), batch_size):
-                batch_ids = video_ids[i:i+batch_size]
-                for attempt in range(max_retries):
-                    try:
-                        stats_response = youtube.videos().list(
-                            part="statistics,snippet",
-                            id=",".join(batch_ids)
-                        ).execute()
-                        break
-                    except HttpError as e:
-                        if "quotaExceeded" in str(e):
-                            logger.warning(f"Quota API dépassé pour les statistiques, tentative {attempt + 1}/{max_retries}")
-                            if attempt < max_retries - 1:
-                                time.sleep(retry_delay * (2 ** attempt))
-                                continue
-                            raise
-                        raise
-                    except Exception as e:
-                        logger.error(f"Erreur lors de la récupération des statistiques : {str(e)}")
-                        if attempt < max_retries - 1:
-                            time.sleep(retry_delay * (2 ** attempt))
-                            continue
-                        raise
-
-                for item in stats_response["items"]:
-                    all_stats[item["id"]] = {
-                        "statistics": item["statistics"],
-                        "snippet": item["snippet"]
-                    }
+            with ThreadPoolExecutor(max_workers=min(YOUTUBE_PARALLEL_BATCHES, len(batches))) as executor:
+                for stats_response in executor.map(self._fetch_video_batch, batches):
+                    for item in stats_response["items"]:
+                        all_stats[item["id"]] = {
+                            "statistics": item["statistics"],
+                            "snippet": item["snippet"]
+                        }
 
             # Catégorisation et calcul des statistiques
             total_count = 0
@@ -1174,6 +1057,35 @@ class DataManager:
             logger.error(f"Erreur lors de l'analyse des vidéos API: {str(e)}", exc_info=True)
             return {}
 
+    def _fetch_video_batch(self, batch_ids):
+        """Statistiques d'un lot de vidéos (appelé depuis plusieurs threads)"""
+        youtube = getattr(self._thread_local, "youtube", None)
+        if youtube is None:
+            youtube = self._thread_local.youtube = get_youtube_client()
+        return self._execute_youtube_request(
+            lambda: youtube.videos().list(part="statistics,snippet", id=",".join(batch_ids)),
+            "des statistiques"
+        )
+
+    def _execute_youtube_request(self, build_request, description, max_retries=3, retry_delay=2):
+        """Exécute une requête YouTube avec nouvelles tentatives et backoff exponentiel"""
+        for attempt in range(max_retries):
+            try:
+                return build_request().execute()
+            except HttpError as e:
+                if API_QUOTA_EXCEEDED_ERROR in str(e):
+                    logger.warning(f"Quota API dépassé pour la récupération {description}, tentative {attempt + 1}/{max_retries}")
+                    if attempt < max_retries - 1:
+                        time.sleep(retry_delay * (2 ** attempt))
+                        continue
+                raise
+            except Exception as e:
+                logger.error(f"Erreur lors de la récupération {description} : {str(e)}")
+                if attempt < max_retries - 1:
+                    time.sleep(retry_delay * (2 ** attempt))
+                    continue
+                raise
+
     def _analyze_post_stats(self, username):
         if self.use_api:
             return {}
@@ -1193,6 +1105,7 @@ class DataManager:
                 }
             }
 
+    @avec_cache("youtube_channel_id")
     def _get_youtube_channel_id(self, username):
         if self.use_api:
             try:
@@ -1215,6 +1128,7 @@ class DataManager:
             # Simulation
             return "UC_x5XG1OV2P6uZZ5FSM9Ttw"
 
+    @avec_cache("youtube_channel_stats")
     def _get_youtube_stats_api(self, channel_id):
         """Récupère les statistiques YouTube via l'API"""
         try:
@@ -1242,6 +1156,7 @@ class DataManager:
             logger.error(f"Erreur lors de la récupération des stats YouTube: {str(e)}")
             return None
             
+    @avec_cache("instagram_stats")
     def _get_instagram_stats_api(self, username):
         """Récupère les statistiques Instagram via l'API"""
         try:
@@ -1588,7 +1503,16 @@ def main():
     try:
         logger.info("=== DÉMARRAGE DE L'APPLICATION ===")
         st.title("Analyseur de Créateurs de Contenu")
-        
+
+        stats_cache = cache_donnees.statistiques()
+        st.sidebar.caption(
+            f"🗄️ Cache des API : {stats_cache['entrees']} résultats, "
+            f"{stats_cache['taux_succes']:.0%} de succès ({stats_cache['succes']}/{stats_cache['succes'] + stats_cache['echecs']}), "
+            f"{stats_cache['evictions']} évictions"
+        )
+        for point, stats in stats_cache["par_point"].items():
+            st.sidebar.caption(f"{point} : {stats['entrees']} résultats, {stats['taux_succes']:.0%} de succès")
+
         # Configuration de l'interface
         mode = st.radio(
             "Mode d'exécution",
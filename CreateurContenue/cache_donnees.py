@@ -0,0 +1,125 @@
+# --- cache_donnees.py ---
+# Cache persistant (SQLite) des appels d'API de l'analyseur (YouTube, Instagram, actualités), durée de vie par point d'accès
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+CHEMIN_CACHE_PAR_DEFAUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "donnees_api_cache.sqlite")
+# Durée de vie (secondes) de chaque point d'accès : les compteurs d'une chaîne bougent vite,
+# les statistiques des vidéos publiées beaucoup moins, l'identifiant d'une chaîne presque jamais.
+TTL_PAR_POINT = {
+    "youtube_channel_id": 30 * 24 * 3600,
+    "youtube_channel_stats": 6 * 3600,
+    "youtube_video_stats": 7 * 24 * 3600,
+    "reputation": 24 * 3600,
+    "instagram_stats": 6 * 3600,
+}
+MAX_ENTREES = 2000  # Au-delà, les entrées les moins récemment utilisées sont supprimées
+
+
+def cle_appel(arguments: dict) -> str:
+    """Clé d'un appel : arguments nommés sérialisés dans un ordre stable."""
+    return json.dumps(arguments, sort_keys=True, ensure_ascii=False, default=str)
+
+
+class CacheDonnees:
+    """
+    Cache (point d'accès, clé) -> résultat JSON, stocké dans SQLite avec une durée de vie par point
+    d'accès (TTL_PAR_POINT) et éviction LRU au-delà de max_entrees. Les compteurs (succès, échecs,
+    évictions) sont persistés par point d'accès. Une connexion est ouverte par opération, comme pour CacheLLM.
+    """
+
+    def __init__(self, chemin: str = CHEMIN_CACHE_PAR_DEFAUT, ttl_par_point: dict = None, max_entrees: int = MAX_ENTREES):
+        self.chemin = chemin
+        self.ttl_par_point = dict(TTL_PAR_POINT, **(ttl_par_point or {}))
+        self.max_entrees = max_entrees
+        with self._connexion() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entrees ("
+                " point TEXT NOT NULL, cle TEXT NOT NULL, valeur TEXT NOT NULL,"
+                " cree_le REAL NOT NULL, utilise_le REAL NOT NULL, PRIMARY KEY (point, cle))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entrees_utilise_le ON entrees (utilise_le)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS compteurs ("
+                " point TEXT NOT NULL, nom TEXT NOT NULL, valeur INTEGER NOT NULL, PRIMARY KEY (point, nom))"
+            )
+
+    @contextmanager
+    def _connexion(self):
+        # Copie de Geocod/connexion_sqlite.py : l'analyseur est déployé seul, sans le dossier Geocod
+        conn = sqlite3.connect(self.chemin, timeout=30)
+        try:
+            with conn:  # commit ou rollback
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _incrementer(conn, point: str, nom: str, valeur: int = 1):
+        conn.execute(
+            "INSERT INTO compteurs (point, nom, valeur) VALUES (?, ?, ?)"
+            " ON CONFLICT(point, nom) DO UPDATE SET valeur = valeur + excluded.valeur",
+            (point, nom, valeur),
+        )
+
+    def lire(self, point: str, cle: str):
+        """Retourne le résultat en cache (et le marque comme récemment utilisé), ou None."""
+        maintenant = time.time()
+        with self._connexion() as conn:
+            ligne = conn.execute("SELECT valeur, cree_le FROM entrees WHERE point = ? AND cle = ?", (point, cle)).fetchone()
+            if ligne and maintenant - ligne[1] <= self.ttl_par_point[point]:
+                conn.execute("UPDATE entrees SET utilise_le = ? WHERE point = ? AND cle = ?", (maintenant, point, cle))
+                self._incrementer(conn, point, "succes")
+                return json.loads(ligne[0])
+            self._incrementer(conn, point, "echecs")
+        return None
+
+    def ecrire(self, point: str, cle: str, valeur):
+        """Mémorise un résultat puis évince les entrées expirées du point d'accès et les moins récemment utilisées."""
+        maintenant = time.time()
+        with self._connexion() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entrees (point, cle, valeur, cree_le, utilise_le) VALUES (?, ?, ?, ?, ?)",
+                (point, cle, json.dumps(valeur, ensure_ascii=False, default=str), maintenant, maintenant),
+            )
+            expirees = conn.execute(
+                "DELETE FROM entrees WHERE point = ? AND cree_le < ?", (point, maintenant - self.ttl_par_point[point])
+            ).rowcount
+            if expirees:
+                self._incrementer(conn, point, "evictions", expirees)
+            # Entrées les moins récemment utilisées, comptées sur le point d'accès qui les perd
+            lru = "SELECT rowid FROM entrees ORDER BY utilise_le DESC LIMIT -1 OFFSET ?"
+            for point_evince, nombre in conn.execute(
+                    f"SELECT point, COUNT(*) FROM entrees WHERE rowid IN ({lru}) GROUP BY point", (self.max_entrees,)).fetchall():
+                self._incrementer(conn, point_evince, "evictions", nombre)
+            conn.execute(f"DELETE FROM entrees WHERE rowid IN ({lru})", (self.max_entrees,))
+
+    def statistiques(self) -> dict:
+        """
+        {"entrees", "succes", "echecs", "evictions", "taux_succes", "par_point"} cumulés depuis la création
+        du fichier ; par_point donne les mêmes compteurs pour chaque point d'accès.
+        """
+        with self._connexion() as conn:
+            compteurs = conn.execute("SELECT point, nom, valeur FROM compteurs").fetchall()
+            entrees = dict(conn.execute("SELECT point, COUNT(*) FROM entrees GROUP BY point").fetchall())
+        par_point = {}
+        for point in sorted(set(entrees) | {point for point, _, _ in compteurs}):
+            par_point[point] = {"entrees": entrees.get(point, 0), "succes": 0, "echecs": 0, "evictions": 0}
+        for point, nom, valeur in compteurs:
+            par_point[point][nom] = valeur
+        for stats in par_point.values():
+            stats["taux_succes"] = _taux(stats["succes"], stats["echecs"])
+        total = {nom: sum(stats[nom] for stats in par_point.values()) for nom in ("entrees", "succes", "echecs", "evictions")}
+        total["taux_succes"] = _taux(total["succes"], total["echecs"])
+        total["par_point"] = par_point
+        return total
+
+
+def _taux(succes: int, echecs: int) -> float:
+    return succes / (succes + echecs) if succes + echecs else 0.0
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Cache des appels d'API (cache_donnees.py) : durée de vie par point d'accès, éviction des entrées
+les moins récemment utilisées et compteurs persistés par point d'accès.
+"""
+
+import pytest
+
+import cache_donnees
+from cache_donnees import CacheDonnees, cle_appel
+
+
+class Horloge:
+    def __init__(self):
+        self.maintenant = 1_000_000.0
+
+    def __call__(self):
+        return self.maintenant
+
+
+@pytest.fixture
+def horloge(monkeypatch):
+    horloge = Horloge()
+    monkeypatch.setattr(cache_donnees.time, "time", horloge)
+    return horloge
+
+
+def test_duree_de_vie_par_point(tmp_path, horloge):
+    cache = CacheDonnees(str(tmp_path / "cache.sqlite"), ttl_par_point={"reputation": 100})
+    cle = cle_appel({"requete": "Le Rex", "pays": "FR"})
+    assert cle == cle_appel({"pays": "FR", "requete": "Le Rex"})  # Ordre des arguments sans effet
+    cache.ecrire("reputation", cle, {"score": 4.5, "avis": ["bien"]})
+    cache.ecrire("youtube_channel_id", "rex", "UC123")
+    horloge.maintenant += 100
+    assert cache.lire("reputation", cle) == {"score": 4.5, "avis": ["bien"]}
+    horloge.maintenant += 1
+    assert cache.lire("reputation", cle) is None  # Expirée pour reputation...
+    assert cache.lire("youtube_channel_id", "rex") == "UC123"  # ... pas pour l'identifiant de chaîne
+
+    # L'entrée expirée est supprimée à la prochaine écriture du même point d'accès, et comptée
+    cache.ecrire("reputation", "autre", 1)
+    stats = cache.statistiques()["par_point"]["reputation"]
+    assert (stats["entrees"], stats["succes"], stats["echecs"], stats["evictions"]) == (1, 1, 1, 1)
+
+
+def test_eviction_lru_et_compteurs(tmp_path, horloge):
+    chemin = str(tmp_path / "cache.sqlite")
+    cache = CacheDonnees(chemin, max_entrees=2)
+    cache.ecrire("instagram_stats", "a", 1)
+    horloge.maintenant += 1
+    cache.ecrire("youtube_video_stats", "b", 2)
+    horloge.maintenant += 1
+    assert cache.lire("instagram_stats", "a") == 1  # a devient la plus récemment utilisée
+    horloge.maintenant += 1
+    cache.ecrire("youtube_video_stats", "c", 3)  # b, la moins récemment utilisée, est évincée
+    assert cache.lire("youtube_video_stats", "b") is None
+    assert (cache.lire("instagram_stats", "a"), cache.lire("youtube_video_stats", "c")) == (1, 3)
+
+    # Compteurs conservés dans le fichier : une nouvelle instance les retrouve
+    stats = CacheDonnees(chemin, max_entrees=2).statistiques()
+    assert (stats["entrees"], stats["succes"], stats["echecs"], stats["evictions"]) == (2, 3, 1, 1)
+    assert stats["taux_succes"] == 0.75
+    assert stats["par_point"]["youtube_video_stats"] == {"entrees": 1, "succes": 1, "echecs": 1, "evictions": 1,
+                                                         "taux_succes": 0.5}
+    assert CacheDonnees(str(tmp_path / "vide.sqlite")).statistiques()["taux_succes"] == 0.0
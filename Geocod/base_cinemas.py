@@ -0,0 +1,262 @@
+# --- base_cinemas.py ---
+# Base SQLite unique des cinémas (cinémas, salles, contacts, géocodes + index R-tree) et import des fichiers existants
+# Usage : python base_cinemas.py importer fichier1.json [fichier2.csv ...] | python base_cinemas.py stats
+# -*- coding: utf-8 -*-
+
+import argparse
+import csv
+import math
+import os
+from flux_json import iterer_elements
+from connexion_sqlite import connexion_sqlite
+
+# Fichier partagé : Geocod/base_cinemas.sqlite, quel que soit le répertoire de lancement
+CHEMIN_BASE_PAR_DEFAUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "base_cinemas.sqlite")
+KM_PAR_DEGRE = 111.32
+RAYON_TERRE_KM = 6371.0
+
+# En-têtes du CSV exporté par Scrap_Cinego/cinego.py -> clés des fichiers JSON
+COLONNES_CSV = {
+    "Cinéma": "cinema", "Adresse du cinéma": "adresse", "Salle": "salle", "CNC": "cnc",
+    "Capacité": "capacite", "Équipement": "equipement", "Format de projection": "format_projection",
+    "Nom contact": "nom_contact", "Email": "email", "Téléphone": "telephone",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cinemas (
+    id INTEGER PRIMARY KEY, nom TEXT NOT NULL, adresse TEXT NOT NULL, source TEXT,
+    UNIQUE (nom, adresse));
+CREATE TABLE IF NOT EXISTS salles (
+    id INTEGER PRIMARY KEY, cinema_id INTEGER NOT NULL REFERENCES cinemas(id) ON DELETE CASCADE,
+    salle TEXT, cnc TEXT, capacite INTEGER NOT NULL DEFAULT 0, equipement TEXT, format_projection TEXT);
+CREATE INDEX IF NOT EXISTS salles_cinema ON salles (cinema_id);
+CREATE INDEX IF NOT EXISTS salles_cnc ON salles (cnc);
+CREATE TABLE IF NOT EXISTS contacts (
+    cinema_id INTEGER PRIMARY KEY REFERENCES cinemas(id) ON DELETE CASCADE, nom TEXT, email TEXT, telephone TEXT);
+CREATE TABLE IF NOT EXISTS geocodes (
+    cinema_id INTEGER PRIMARY KEY REFERENCES cinemas(id) ON DELETE CASCADE,
+    lat REAL NOT NULL, lon REAL NOT NULL, source TEXT);
+CREATE VIRTUAL TABLE IF NOT EXISTS geocodes_rtree USING rtree (id, lat_min, lat_max, lon_min, lon_max);
+CREATE TRIGGER IF NOT EXISTS geocodes_rtree_ajout AFTER INSERT ON geocodes BEGIN
+    INSERT INTO geocodes_rtree VALUES (new.cinema_id, new.lat, new.lat, new.lon, new.lon); END;
+CREATE TRIGGER IF NOT EXISTS geocodes_rtree_maj AFTER UPDATE ON geocodes BEGIN
+    UPDATE geocodes_rtree SET lat_min = new.lat, lat_max = new.lat, lon_min = new.lon, lon_max = new.lon
+    WHERE id = new.cinema_id; END;
+CREATE TRIGGER IF NOT EXISTS geocodes_rtree_suppr AFTER DELETE ON geocodes BEGIN
+    DELETE FROM geocodes_rtree WHERE id = old.cinema_id; END;
+"""
+
+
+def _entier(valeur) -> int:
+    try:
+        return max(int(valeur), 0)
+    except (ValueError, TypeError):
+        return 0
+
+
+def _texte(valeur) -> str:
+    return str(valeur or "").strip()
+
+
+def date_modification(chemin: str = CHEMIN_BASE_PAR_DEFAUT) -> float:
+    """Dernière écriture dans la base (fichier principal ou journal WAL) : sert de clé d'invalidation."""
+    return max(os.path.getmtime(f) for f in (chemin, f"{chemin}-wal") if os.path.exists(f))
+
+
+def lire_csv(chemin: str):
+    """Lignes du CSV Cinego sous forme de dicts aux clés des fichiers JSON (cinema, adresse, salle...)."""
+    with open(chemin, "r", encoding="utf-8", newline="") as f:
+        for ligne in csv.DictReader(f):
+            yield {COLONNES_CSV.get(colonne, colonne): valeur for colonne, valeur in ligne.items()}
+
+
+def enregistrements(elements):
+    """
+    Normalise les trois formats rencontrés en (nom, adresse, salles ou None, contact ou None, coords ou None) :
+    - fichier regroupé (cinemas_grouped*.json, mk2_cinemas.json) : un cinéma avec sa liste "salles" ;
+    - export de salles (BigTest.json, cinemas_export_save.json/csv) : une salle par élément, regroupées ici ;
+    - fichier géocodé (cinemas_geocoded*.json) : un cinéma avec lat/lon, sans salles.
+    """
+    salles_par_cinema = {}
+    for element in elements:
+        nom, adresse = _texte(element.get("cinema")), _texte(element.get("adresse"))
+        if not nom:
+            continue
+        if "salles" in element:
+            coords = (element["lat"], element["lon"]) if element.get("lat") is not None and element.get("lon") is not None else None
+            yield nom, adresse, element["salles"], element.get("contact"), coords
+        elif "salle" in element:
+            bloc = salles_par_cinema.setdefault((nom, adresse), {"salles": [], "contact": None})
+            bloc["salles"].append(element)
+            bloc["contact"] = {"nom": element.get("nom_contact"), "email": element.get("email"), "telephone": element.get("telephone")}
+        else:
+            coords = (element["lat"], element["lon"]) if element.get("lat") is not None and element.get("lon") is not None else None
+            contact = {"nom": element.get("nom_contact"), "email": element.get("email"), "telephone": element.get("telephone")}
+            yield nom, adresse, None, contact, coords
+    for (nom, adresse), bloc in salles_par_cinema.items():
+        yield nom, adresse, bloc["salles"], bloc["contact"], None
+
+
+def _distance_km(lat1, lon1, lat2, lon2) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((phi2 - phi1) / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * RAYON_TERRE_KM * math.asin(math.sqrt(a))
+
+
+class BaseCinemas:
+    """
+    Base unique des cinémas : une ligne par (nom, adresse), ses salles, son contact et ses coordonnées.
+    L'index R-tree (geocodes_rtree) est tenu à jour par triggers et sert aux recherches par zone.
+    Les imports successifs fusionnent : le dernier fichier importé l'emporte pour les salles, le contact
+    et les coordonnées qu'il fournit ; ce qu'il ne fournit pas est conservé.
+    Une connexion est ouverte par opération : l'objet peut être partagé entre threads (Streamlit).
+    """
+
+    def __init__(self, chemin: str = CHEMIN_BASE_PAR_DEFAUT):
+        self.chemin = chemin
+        with self._connexion() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connexion(self):
+        return connexion_sqlite(self.chemin, "foreign_keys=ON")
+
+    # --- Import ---
+
+    def importer(self, chemin: str, source: str = None) -> int:
+        """Importe un fichier .json / .jsonl (regroupé, salles ou géocodé) ou .csv (export Cinego). Retourne le nombre de cinémas."""
+        elements = lire_csv(chemin) if chemin.endswith(".csv") else iterer_elements(chemin)
+        return self.importer_elements(elements, source or os.path.basename(chemin))
+
+    def importer_elements(self, elements, source: str) -> int:
+        nb = 0
+        with self._connexion() as conn:  # Une seule transaction par fichier
+            for nom, adresse, salles, contact, coords in enregistrements(elements):
+                conn.execute("INSERT OR IGNORE INTO cinemas (nom, adresse) VALUES (?, ?)", (nom, adresse))
+                cinema_id = conn.execute("SELECT id FROM cinemas WHERE nom = ? AND adresse = ?", (nom, adresse)).fetchone()[0]
+                conn.execute("UPDATE cinemas SET source = ? WHERE id = ?", (source, cinema_id))
+                if salles is not None:
+                    conn.execute("DELETE FROM salles WHERE cinema_id = ?", (cinema_id,))
+                    conn.executemany(
+                        "INSERT INTO salles (cinema_id, salle, cnc, capacite, equipement, format_projection) VALUES (?, ?, ?, ?, ?, ?)",
+                        [(cinema_id, _texte(s.get("salle")), _texte(s.get("cnc")), _entier(s.get("capacite")),
+                          _texte(s.get("equipement")), _texte(s.get("format_projection"))) for s in salles],
+                    )
+                if contact and any(contact.values()):
+                    conn.execute(
+                        "INSERT OR REPLACE INTO contacts (cinema_id, nom, email, telephone) VALUES (?, ?, ?, ?)",
+                        (cinema_id, _texte(contact.get("nom")), _texte(contact.get("email")), _texte(contact.get("telephone"))),
+                    )
+                if coords:
+                    conn.execute(
+                        "INSERT INTO geocodes (cinema_id, lat, lon, source) VALUES (?, ?, ?, ?)"
+                        " ON CONFLICT (cinema_id) DO UPDATE SET lat = excluded.lat, lon = excluded.lon, source = excluded.source",
+                        (cinema_id, float(coords[0]), float(coords[1]), source),
+                    )
+                nb += 1
+        return nb
+
+    # --- Requêtes ---
+
+    def _groupes(self, conn, condition: str = "", parametres=()):
+        """Cinémas au format des fichiers regroupés (cinema, adresse, lat, lon, contact, salles)."""
+        lignes = conn.execute(
+            "SELECT c.id, c.nom, c.adresse, g.lat, g.lon, k.nom, k.email, k.telephone FROM cinemas c"
+            " LEFT JOIN geocodes g ON g.cinema_id = c.id LEFT JOIN contacts k ON k.cinema_id = c.id"
+            f" {condition} ORDER BY c.id", parametres,
+        ).fetchall()
+        groupes = {}
+        for cinema_id, nom, adresse, lat, lon, contact_nom, email, telephone in lignes:
+            groupes[cinema_id] = {
+                "cinema": nom, "adresse": adresse, "lat": lat, "lon": lon,
+                "contact": {"nom": contact_nom or "", "email": email or "", "telephone": telephone or ""},
+                "salles": [],
+            }
+        if not groupes:
+            return []
+        # Table temporaire plutôt qu'un IN (...) : pas de limite sur le nombre de paramètres
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS selection (id INTEGER PRIMARY KEY)")
+        conn.execute("DELETE FROM selection")
+        conn.executemany("INSERT INTO selection VALUES (?)", ((i,) for i in groupes))
+        for cinema_id, salle, cnc, capacite, equipement, format_projection in conn.execute(
+            "SELECT cinema_id, salle, cnc, capacite, equipement, format_projection FROM salles"
+            " WHERE cinema_id IN (SELECT id FROM selection) ORDER BY cinema_id, id"
+        ):
+            groupes[cinema_id]["salles"].append({
+                "salle": salle, "cnc": cnc, "capacite": capacite, "equipement": equipement, "format_projection": format_projection,
+            })
+        return list(groupes.values())
+
+    def cinemas(self, avec_coordonnees: bool = False) -> list:
+        """Tous les cinémas (ou seulement ceux qui ont des coordonnées), dans l'ordre d'import."""
+        with self._connexion() as conn:
+            return self._groupes(conn, "WHERE g.lat IS NOT NULL" if avec_coordonnees else "")
+
+    def dans_rectangle(self, lat_min: float, lat_max: float, lon_min: float, lon_max: float) -> list:
+        """Cinémas dont les coordonnées sont dans le rectangle (index R-tree)."""
+        with self._connexion() as conn:
+            return self._groupes(
+                conn, # Recouvrement plutôt qu'inclusion : le R-tree arrondit les coordonnées en float 32 bits
+                "WHERE c.id IN (SELECT id FROM geocodes_rtree WHERE lat_max >= ? AND lat_min <= ? AND lon_max >= ? AND lon_min <= ?)",
+                (lat_min, lat_max, lon_min, lon_max),
+            )
+
+    def proches(self, lat: float, lon: float, rayon_km: float) -> list:
+        """Cinémas à moins de rayon_km du point : [(cinéma, distance_km)] triés par distance."""
+        delta_lat = rayon_km / KM_PAR_DEGRE
+        delta_lon = rayon_km / (KM_PAR_DEGRE * max(math.cos(math.radians(lat)), 0.01))
+        candidats = self.dans_rectangle(lat - delta_lat, lat + delta_lat, lon - delta_lon, lon + delta_lon)
+        resultats = [(c, _distance_km(lat, lon, c["lat"], c["lon"])) for c in candidats]
+        return sorted((r for r in resultats if r[1] <= rayon_km), key=lambda r: r[1])
+
+    def noms(self) -> list:
+        """(nom, adresse) de tous les cinémas, triés par nom (listes de choix)."""
+        with self._connexion() as conn:
+            return conn.execute("SELECT nom, adresse FROM cinemas ORDER BY nom, adresse").fetchall()
+
+    def rechercher(self, texte: str, limite: int = 50) -> list:
+        """(nom, adresse) des cinémas dont le nom ou l'adresse contient texte (insensible à la casse ASCII)."""
+        motif = f"%{texte.strip()}%"
+        with self._connexion() as conn:
+            return conn.execute(
+                "SELECT nom, adresse FROM cinemas WHERE nom LIKE ? OR adresse LIKE ? ORDER BY nom LIMIT ?",
+                (motif, motif, limite),
+            ).fetchall()
+
+    def salles(self, cinemas: list) -> list:
+        """Salles à plat des cinémas [(nom, adresse)] : dicts cinema, adresse, salle, cnc, capacite."""
+        with self._connexion() as conn:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS choix (nom TEXT, adresse TEXT)")
+            conn.execute("DELETE FROM choix")
+            conn.executemany("INSERT INTO choix VALUES (?, ?)", cinemas)
+            lignes = conn.execute(
+                "SELECT c.nom, c.adresse, s.salle, s.cnc, s.capacite FROM choix x"
+                " JOIN cinemas c ON c.nom = x.nom AND c.adresse = x.adresse JOIN salles s ON s.cinema_id = c.id"
+                " ORDER BY c.id, s.id"
+            ).fetchall()
+        return [dict(zip(("cinema", "adresse", "salle", "cnc", "capacite"), ligne)) for ligne in lignes]
+
+    def statistiques(self) -> dict:
+        with self._connexion() as conn:
+            return {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                    for table in ("cinemas", "salles", "contacts", "geocodes")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Base SQLite unique des cinémas.")
+    parser.add_argument("--base", default=CHEMIN_BASE_PAR_DEFAUT)
+    commandes = parser.add_subparsers(dest="commande", required=True)
+    importer = commandes.add_parser("importer", help="Importe des fichiers JSON / JSONL / CSV (le dernier l'emporte)")
+    importer.add_argument("fichiers", nargs="+")
+    commandes.add_parser("stats", help="Nombre de cinémas, salles, contacts et géocodes")
+    args = parser.parse_args()
+
+    base = BaseCinemas(args.base)
+    if args.commande == "importer":
+        for fichier in args.fichiers:
+            print(f"{fichier} : {base.importer(fichier)} cinémas importés")
+    print(", ".join(f"{n} {table}" for table, n in base.statistiques().items()))
+
+
+if __name__ == "__main__":
+    main()
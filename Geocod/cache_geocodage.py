@@ -0,0 +1,131 @@
+# --- cache_geocodage.py ---
+# Cache de géocodage persistant (SQLite) partagé par l'application Ai_Map et les scripts de prétraitement
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import time
+from connexion_sqlite import connexion_sqlite
+
+# Fichier partagé : Geocod/geocodage_cache.sqlite, quel que soit le répertoire de lancement
+CHEMIN_CACHE_PAR_DEFAUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "geocodage_cache.sqlite")
+TTL_POSITIF = 180 * 24 * 3600  # Une adresse trouvée reste valable 6 mois
+TTL_NEGATIF = 7 * 24 * 3600    # Une adresse introuvable est retentée au bout d'une semaine
+SOURCE_PAR_DEFAUT = "nominatim"  # Géocodeur de l'application et des anciens fichiers de cache
+
+
+def normaliser_requete(requete: str) -> str:
+    """Clé de cache : minuscules, espaces et virgules normalisés."""
+    requete = re.sub(r"\s+", " ", (requete or "").strip().lower())
+    return re.sub(r"\s*,\s*", ", ", requete)
+
+
+class CacheGeocodage:
+    """
+    Cache (requête, géocodeur) -> coordonnées stocké dans SQLite, avec durée de vie (TTL) et cache négatif :
+    une adresse introuvable est mémorisée (lat/lon NULL) pour ne pas réinterroger le géocodeur.
+    Chaque géocodeur (source) a ses propres entrées : un « introuvable » de l'instance auto-hébergée
+    n'empêche pas d'interroger Nominatim, et une réponse de l'un n'est pas servie pour l'autre.
+    Les erreurs réseau (timeout, service indisponible) ne doivent pas être mises en cache.
+    Une connexion est ouverte par opération : l'objet peut être partagé entre threads (Streamlit).
+    """
+
+    def __init__(self, chemin: str = CHEMIN_CACHE_PAR_DEFAUT, ttl_positif: int = TTL_POSITIF, ttl_negatif: int = TTL_NEGATIF):
+        self.chemin = chemin
+        self.ttl_positif = ttl_positif
+        self.ttl_negatif = ttl_negatif
+        with self._connexion() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")  # Lecture pendant qu'un script de prétraitement écrit
+            cles = [nom for _, nom, _, _, _, pk in conn.execute("PRAGMA table_info(geocodage)") if pk]
+            if cles == ["requete"]:
+                # Ancien schéma (clé = requête seule) : les entrées sont conservées sous leur source
+                conn.execute("ALTER TABLE geocodage RENAME TO geocodage_ancien")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS geocodage ("
+                " requete TEXT NOT NULL, source TEXT NOT NULL, lat REAL, lon REAL, horodatage REAL NOT NULL,"
+                " PRIMARY KEY (requete, source))"
+            )
+            if cles == ["requete"]:
+                conn.execute(
+                    "INSERT OR REPLACE INTO geocodage (requete, source, lat, lon, horodatage)"
+                    " SELECT requete, COALESCE(source, ?), lat, lon, horodatage FROM geocodage_ancien",
+                    (SOURCE_PAR_DEFAUT,),
+                )
+                conn.execute("DROP TABLE geocodage_ancien")
+
+    def _connexion(self):
+        return connexion_sqlite(self.chemin)
+
+    def lire(self, requete: str, source: str = SOURCE_PAR_DEFAUT):
+        """
+        Retourne (present, coords) pour la requête telle que géocodée par source :
+        - (True, (lat, lon)) si la requête est en cache et a été trouvée,
+        - (True, None) si elle est en cache négatif (introuvable récemment),
+        - (False, None) si elle est absente ou expirée.
+        """
+        with self._connexion() as conn:
+            ligne = conn.execute(
+                "SELECT lat, lon, horodatage FROM geocodage WHERE requete = ? AND source = ?",
+                (normaliser_requete(requete), source),
+            ).fetchone()
+        if not ligne:
+            return False, None
+        lat, lon, horodatage = ligne
+        ttl = self.ttl_negatif if lat is None else self.ttl_positif
+        if time.time() - horodatage > ttl:
+            return False, None
+        return True, (None if lat is None else (lat, lon))
+
+    def ecrire(self, requete: str, coords, source: str = SOURCE_PAR_DEFAUT):
+        """Mémorise le résultat d'un géocodage. coords=None enregistre un résultat négatif."""
+        lat, lon = coords if coords else (None, None)
+        with self._connexion() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO geocodage (requete, lat, lon, source, horodatage) VALUES (?, ?, ?, ?, ?)",
+                (normaliser_requete(requete), lat, lon, source, time.time()),
+            )
+
+    def oublier_coordonnees(self, points) -> int:
+        """
+        Supprime les réponses (toutes requêtes et sources) situées sur l'un des points (lat, lon),
+        à 1e-6 degré près : des coordonnées jugées fausses seront redemandées au géocodeur.
+        Retourne le nombre de lignes supprimées.
+        """
+        with self._connexion() as conn:
+            curseur = conn.executemany(
+                "DELETE FROM geocodage WHERE lat IS NOT NULL AND round(lat, 6) = round(?, 6) AND round(lon, 6) = round(?, 6)",
+                [(lat, lon) for lat, lon in set(points)],
+            )
+            return curseur.rowcount
+
+    def purger(self) -> int:
+        """Supprime les entrées expirées. Retourne le nombre de lignes supprimées."""
+        maintenant = time.time()
+        with self._connexion() as conn:
+            curseur = conn.execute(
+                "DELETE FROM geocodage WHERE (lat IS NULL AND horodatage < ?) OR (lat IS NOT NULL AND horodatage < ?)",
+                (maintenant - self.ttl_negatif, maintenant - self.ttl_positif),
+            )
+            return curseur.rowcount
+
+
+def geocoder_avec_cache(requete: str, geocoder, cache: CacheGeocodage, table_communes=None, source: str = SOURCE_PAR_DEFAUT):
+    """
+    Géocode une requête en évitant le réseau autant que possible :
+    1. table des communes hors ligne (si fournie),
+    2. cache SQLite (positif ou négatif) des réponses de ce géocodeur (source),
+    3. appel à geocoder(requete) -> objet geopy Location ou None, dont le résultat est mis en cache sous source.
+    Les exceptions du géocodeur (timeout, indisponibilité) sont propagées et rien n'est mis en cache.
+    Retourne (lat, lon) ou None.
+    """
+    if table_communes is not None:
+        coords = table_communes.rechercher(requete)
+        if coords:
+            return coords
+    present, coords = cache.lire(requete, source)
+    if present:
+        return coords
+    location = geocoder(requete)
+    coords = (location.latitude, location.longitude) if location else None
+    cache.ecrire(requete, coords, source)
+    return coords
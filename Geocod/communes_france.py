@@ -0,0 +1,186 @@
+# --- communes_france.py ---
+# Table hors ligne des communes françaises (code postal + commune -> coordonnées) : sans la base La Poste,
+# simple cache des géocodages passés, pas une référence
+# -*- coding: utf-8 -*-
+
+import csv
+import os
+import re
+import unicodedata
+from collections import defaultdict
+from typing import NamedTuple
+
+# Table livrée avec le dépôt, générée par construire_table_communes.py à partir des cinémas déjà géocodés :
+# chaque commune y est la médiane des positions obtenues par le pipeline (source "cinemas"). C'est un cache
+# des résultats passés, pas une référence indépendante : il ne peut que reproduire ces positions, erreurs comprises.
+# Seules les lignes de la base officielle des codes postaux (--laposte, source "laposte") sont indépendantes.
+CHEMIN_TABLE_PAR_DEFAUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "communes_france.csv")
+SOURCE_CINEMAS = "cinemas"  # Médiane des cinémas géocodés de la commune
+SOURCE_LAPOSTE = "laposte"  # Base officielle des codes postaux (data.gouv.fr)
+
+
+def normaliser_nom(nom: str) -> str:
+    """'Saint-Étienne-du-Rouvray' -> 'saint etienne du rouvray' (sans accents, tirets ni apostrophes)."""
+    nom = unicodedata.normalize("NFKD", nom or "").encode("ascii", "ignore").decode("ascii").lower()
+    nom = re.sub(r"[-'’_.]", " ", nom)
+    nom = re.sub(r"\bst\b", "saint", nom)
+    nom = re.sub(r"\bste\b", "sainte", nom)
+    return re.sub(r"\s+", " ", nom).strip()
+
+
+def departement(code_postal: str) -> str:
+    """Département approximatif déduit du code postal (97x pour l'outre-mer)."""
+    return code_postal[:3] if code_postal.startswith("97") else code_postal[:2]
+
+
+class AdresseFr(NamedTuple):
+    """Adresse découpée : voie, code postal et commune (chaînes vides si absents)."""
+    voie: str
+    code_postal: str
+    commune: str
+
+
+# Boîtes postales et distribution spéciale, inutiles (voire nuisibles) pour le géocodage
+MOTIF_BOITE_POSTALE = re.compile(r"\b(?:B\.?\s?P|C\.?\s?S|TSA)\.?\s*\d+\b", re.IGNORECASE)
+MOTIF_CEDEX = re.compile(r"\s*\bcedex\b\s*\d*", re.IGNORECASE)
+MOTIF_VOIE = re.compile(
+    r"\b(?:rue|av|avenue|bd|boulevard|place|pl|all[ée]e|chemin|route|rte|quai|cours|impasse|esplanade|"
+    r"square|parvis|promenade|faubourg|mail|passage|rond[- ]point|voie|lieu[- ]dit)\b\.?", re.IGNORECASE)
+MOTIF_CP_COMMUNE = re.compile(r"(?:^|\D)(\d{5})\s+([^\d,\s][^,]*?)\s*$")
+
+
+def segments_adresse(adresse: str) -> list:
+    """'rue X - BP 12 - 50500 Ville Cedex' -> ['rue X', '50500 Ville'] (boîtes postales et cedex retirés)."""
+    segments = []
+    for segment in re.split(r"\s+[-–/]\s+|\n", adresse or ""):
+        segment = MOTIF_CEDEX.sub("", MOTIF_BOITE_POSTALE.sub("", segment))
+        segment = re.sub(r"\s+", " ", segment).strip(" ,;")
+        if segment:
+            segments.append(segment)
+    return segments
+
+
+def analyser_adresse(adresse: str) -> AdresseFr:
+    """
+    Découpe une adresse au format Cinego, sans appel réseau :
+    'rue Holgate - 50500 Carentan-les-Marais' -> AdresseFr('rue Holgate', '50500', 'Carentan-les-Marais').
+    Le couple code postal + commune est cherché en partant de la fin ; la voie est le premier
+    segment contenant un type de voie (rue, avenue, place...), à défaut le premier segment restant.
+    """
+    segments = segments_adresse(adresse)
+    code_postal = commune = ""
+    for i in range(len(segments) - 1, -1, -1):
+        # 'ZAC du Mas, route d'Argeles' : le couple peut suivre une virgule dans un même segment
+        match = MOTIF_CP_COMMUNE.search(segments[i].rsplit(",", 1)[-1].strip())
+        if match:
+            code_postal, commune = match.group(1), match.group(2).strip()
+            segments = segments[:i]
+            break
+    voie = next((seg for seg in segments if MOTIF_VOIE.search(seg)), segments[0] if segments else "")
+    return AdresseFr(voie, code_postal, commune)
+
+
+def extraire_cp_commune(adresse: str):
+    """
+    Extrait (code_postal, commune) d'une adresse au format Cinego :
+    'rue Holgate - 50500 Carentan-les-Marais' -> ('50500', 'Carentan-les-Marais').
+    Retourne None si aucun code postal suivi d'un nom de commune n'est trouvé.
+    """
+    resultat = analyser_adresse(adresse)
+    if not resultat.code_postal:
+        return None
+    return resultat.code_postal, resultat.commune
+
+
+class TableCommunes:
+    """
+    Résolution hors ligne (sans appel réseau) d'une commune ou d'un code postal en coordonnées.
+    Le fichier CSV contient une ligne par couple (code postal, commune) avec le centre, un poids et
+    la source de la ligne (voir CHEMIN_TABLE_PAR_DEFAUT : les lignes "cinemas" ne sont qu'un cache).
+    Les requêtes sur le seul nom ('Lyon', 'Paris, France') sont agrégées par (nom, département) ;
+    en cas d'homonymes, la commune la plus représentée l'emporte.
+    """
+
+    def __init__(self, lignes, sources=None):
+        self.sources = sources or {}  # Nombre de lignes par source
+        self.par_cp_commune = {}
+        self.par_cp = defaultdict(list)
+        sommes = defaultdict(lambda: [0.0, 0.0, 0])
+        for code_postal, commune, lat, lon, poids in lignes:
+            nom = normaliser_nom(commune)
+            self.par_cp_commune[(code_postal, nom)] = (lat, lon)
+            self.par_cp[code_postal].append((lat, lon, poids))
+            somme = sommes[(nom, departement(code_postal))]
+            somme[0] += lat * poids
+            somme[1] += lon * poids
+            somme[2] += poids
+
+        meilleurs = {}
+        for (nom, _), (somme_lat, somme_lon, poids) in sommes.items():
+            if nom not in meilleurs or poids > meilleurs[nom][2]:
+                meilleurs[nom] = (somme_lat / poids, somme_lon / poids, poids)
+        self.par_nom = {nom: (lat, lon) for nom, (lat, lon, _) in meilleurs.items()}
+
+    @classmethod
+    def charger(cls, chemin: str = CHEMIN_TABLE_PAR_DEFAUT):
+        with open(chemin, "r", encoding="utf-8", newline="") as f:
+            lecteur = csv.DictReader(f, delimiter=";")
+            lignes, sources = [], defaultdict(int)
+            for l in lecteur:
+                lignes.append((l["code_postal"], l["commune"], float(l["lat"]), float(l["lon"]), int(l.get("poids") or 1)))
+                sources[l.get("source") or SOURCE_CINEMAS] += 1
+        return cls(lignes, dict(sources))
+
+    @property
+    def independante(self) -> bool:
+        """Vrai si la table contient des lignes de la base La Poste (et pas seulement le cache des cinémas)."""
+        return self.sources.get(SOURCE_LAPOSTE, 0) > 0
+
+    def __len__(self):
+        return len(self.par_cp_commune)
+
+    def rechercher(self, requete: str):
+        """
+        Cherche une commune dans la table : 'Lyon', 'Lyon, France', '69001 Lyon',
+        'rue X - 50500 Carentan-les-Marais' ou un code postal seul.
+        Retourne (lat, lon) ou None (la requête doit alors partir au géocodeur).
+        """
+        requete = re.sub(r",?\s*france\s*$", "", (requete or "").strip(), flags=re.IGNORECASE)
+        cp_commune = extraire_cp_commune(requete)
+        if cp_commune:
+            code_postal, commune = cp_commune
+            coords = self.par_cp_commune.get((code_postal, normaliser_nom(commune)))
+            if coords:
+                return coords
+        if re.fullmatch(r"\d{5}", requete):
+            return self.centre_code_postal(requete)
+        return self.par_nom.get(normaliser_nom(requete))
+
+    def centre_code_postal(self, code_postal: str):
+        """Barycentre (pondéré) des communes d'un code postal, ou None."""
+        points = self.par_cp.get(code_postal)
+        if not points:
+            return None
+        poids = sum(p for _, _, p in points)
+        return (sum(lat * p for lat, _, p in points) / poids, sum(lon * p for _, lon, p in points) / poids)
+
+    def resoudre_adresse(self, adresse: str):
+        """
+        Résolution hors ligne d'une adresse complète de cinéma, du plus précis au plus grossier :
+        code postal + commune, puis centre du code postal, puis nom de la commune analysée.
+        Les autres segments ne sont pas essayés : une voie ou un lieu ('Saint-Denis', 'Gare')
+        peut porter le nom d'une commune d'un autre département.
+        Retourne ((lat, lon), precision) avec precision 'commune', 'code_postal' ou 'nom', ou (None, None).
+        """
+        analyse = analyser_adresse(adresse)
+        if analyse.code_postal:
+            coords = self.par_cp_commune.get((analyse.code_postal, normaliser_nom(analyse.commune)))
+            if coords:
+                return coords, "commune"
+            coords = self.centre_code_postal(analyse.code_postal)
+            if coords:
+                return coords, "code_postal"
+        coords = self.par_nom.get(normaliser_nom(analyse.commune)) if analyse.commune else None
+        if coords:
+            return coords, "nom"
+        return None, None
@@ -0,0 +1,26 @@
+# --- connexion_sqlite.py ---
+# Connexion SQLite par opération, commune aux caches et bases d'état (Geocod, Ai_Map, Scrap_Cinego)
+# CreateurContenue/cache_donnees.py en garde une copie : l'analyseur est déployé sans le dossier Geocod
+# -*- coding: utf-8 -*-
+
+import sqlite3
+from contextlib import contextmanager
+
+DELAI_VERROU = 30  # Secondes d'attente quand un autre processus écrit dans le même fichier
+
+
+@contextmanager
+def connexion_sqlite(chemin: str, *pragmas: str):
+    """
+    Connexion ouverte pour une seule opération : transaction validée à la sortie du bloc (annulée en cas
+    d'exception), puis connexion fermée. Aucune connexion n'est conservée : l'objet qui l'utilise peut
+    être partagé entre threads (Streamlit). pragmas : exécutés à l'ouverture (ex. "foreign_keys=ON").
+    """
+    conn = sqlite3.connect(chemin, timeout=DELAI_VERROU)
+    try:
+        for pragma in pragmas:
+            conn.execute(f"PRAGMA {pragma}")
+        with conn:  # commit ou rollback
+            yield conn
+    finally:
+        conn.close()
@@ -0,0 +1,94 @@
+# --- construire_table_communes.py ---
+# Génère communes_france.csv (table hors ligne code postal + commune -> coordonnées)
+# Sans --laposte, la table n'est qu'un cache des positions déjà obtenues pour les cinémas, pas une référence
+# Usage : python construire_table_communes.py [--laposte base_codes_postaux.csv] [fichiers_groupes.json ...]
+# -*- coding: utf-8 -*-
+
+import argparse
+import csv
+import json
+import os
+import statistics
+from collections import Counter, defaultdict
+from communes_france import CHEMIN_TABLE_PAR_DEFAUT, SOURCE_CINEMAS, SOURCE_LAPOSTE, extraire_cp_commune, normaliser_nom
+
+REPERTOIRE = os.path.dirname(os.path.abspath(__file__))
+FICHIERS_PAR_DEFAUT = [os.path.join(REPERTOIRE, "All_data_test", "cinemas_groupedBig.json")]
+
+
+def lignes_depuis_cinemas(fichiers):
+    """
+    Centre approximatif de chaque (code postal, commune) : médiane des coordonnées
+    des cinémas déjà géocodés dans cette commune (robuste à un cinéma mal placé).
+    Ces lignes résument les géocodages passés : elles ne permettent pas de les vérifier.
+    """
+    points = defaultdict(list)
+    orthographes = defaultdict(Counter)
+    for fichier in fichiers:
+        with open(fichier, "r", encoding="utf-8") as f:
+            cinemas = json.load(f)
+        for cinema in cinemas:
+            if cinema.get("lat") is None or cinema.get("lon") is None:
+                continue
+            cp_commune = extraire_cp_commune(cinema.get("adresse", ""))
+            if not cp_commune:
+                continue
+            code_postal, commune = cp_commune
+            cle = (code_postal, normaliser_nom(commune))
+            points[cle].append((cinema["lat"], cinema["lon"]))
+            orthographes[cle][commune] += 1
+
+    lignes = {}
+    for cle, coords in points.items():
+        lat = statistics.median(c[0] for c in coords)
+        lon = statistics.median(c[1] for c in coords)
+        lignes[cle] = (cle[0], orthographes[cle].most_common(1)[0][0], lat, lon, len(coords), SOURCE_CINEMAS)
+    return lignes
+
+
+def lignes_depuis_laposte(fichier):
+    """
+    Base officielle des codes postaux (La Poste, data.gouv.fr), séparateur ';'.
+    Accepte l'ancien format (coordonnees_gps) et le nouveau (_geopoint).
+    """
+    lignes = {}
+    with open(fichier, "r", encoding="utf-8-sig", newline="") as f:
+        lecteur = csv.reader(f, delimiter=";")
+        entetes = [e.strip().lstrip("#").lower() for e in next(lecteur)]
+        i_cp = entetes.index("code_postal")
+        i_nom = entetes.index("nom_de_la_commune" if "nom_de_la_commune" in entetes else "nom_commune")
+        i_gps = next(i for i, e in enumerate(entetes) if "gps" in e or "geopoint" in e)
+        for ligne in lecteur:
+            if len(ligne) <= max(i_cp, i_nom, i_gps) or "," not in ligne[i_gps]:
+                continue
+            lat, lon = (float(v) for v in ligne[i_gps].split(",")[:2])
+            code_postal, commune = ligne[i_cp].zfill(5), ligne[i_nom].strip().title()
+            lignes[(code_postal, normaliser_nom(commune))] = (code_postal, commune, lat, lon, 1, SOURCE_LAPOSTE)
+    return lignes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Construit la table hors ligne des communes françaises.")
+    parser.add_argument("fichiers", nargs="*", default=FICHIERS_PAR_DEFAUT, help="Fichiers cinemas_grouped*.json géocodés")
+    parser.add_argument("--laposte", help="Base officielle des codes postaux (prioritaire sur les cinémas) : seule source "
+                                           "indépendante, sans elle la table ne fait que résumer les géocodages passés")
+    parser.add_argument("--sortie", default=CHEMIN_TABLE_PAR_DEFAUT)
+    args = parser.parse_args()
+
+    lignes = lignes_depuis_cinemas(args.fichiers)
+    print(f"{len(lignes)} communes déduites des cinémas géocodés")
+    if args.laposte:
+        officielles = lignes_depuis_laposte(args.laposte)
+        print(f"{len(officielles)} communes lues dans la base La Poste")
+        lignes.update(officielles)
+
+    with open(args.sortie, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow(["code_postal", "commune", "lat", "lon", "poids", "source"])
+        for code_postal, commune, lat, lon, poids, source in sorted(lignes.values()):
+            writer.writerow([code_postal, commune, f"{lat:.6f}", f"{lon:.6f}", poids, source])
+    print(f"✅ Table enregistrée : {args.sortie} ({len(lignes)} lignes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+# --- controle_geocodes.py ---
+# Contrôle qualité des coordonnées : cinéma hors de son département, hors de France, coordonnées partagées
+# Usage : python controle_geocodes.py groupes.json [--seuil 0.5] [--rapport suspects.json] [--invalider [--cache geocodage_cache.sqlite]]
+# -*- coding: utf-8 -*-
+
+import argparse
+import json
+from collections import defaultdict
+import numpy as np
+from cache_geocodage import CHEMIN_CACHE_PAR_DEFAUT, CacheGeocodage
+from communes_france import analyser_adresse, departement, normaliser_nom
+from flux_json import ecrire_elements, iterer_elements
+
+# France métropolitaine (Corse comprise), avec une petite marge
+LAT_FRANCE, LON_FRANCE = (41.2, 51.2), (-5.3, 9.7)
+# Demi-étendue minimale / maximale autour du centre d'un département (degrés lat, lon) :
+# la plus grande distance centre -> limite d'un département métropolitain reste sous ~1° de latitude
+DEMI_LARGEUR_MIN = (1.0, 1.3)
+DEMI_LARGEUR_MAX = (1.6, 2.2)
+# Paris et petite couronne : départements bien plus petits que DEMI_LARGEUR_MIN (lat_min, lat_max, lon_min, lon_max)
+RECTANGLES_CONNUS = {
+    "75": (48.80, 48.92, 2.21, 2.48),
+    "92": (48.72, 48.96, 2.14, 2.35),
+    "93": (48.79, 49.02, 2.27, 2.62),
+    "94": (48.68, 48.88, 2.30, 2.63),
+}
+FACTEUR_MAD = 4.0  # Écarts absolus médians tolérés autour du centre (1,4826 * MAD ~ écart-type)
+POIDS = {"hors_france": 1.0, "hors_departement": 0.6, "coordonnees_partagees": 0.4}
+SEUIL_PAR_DEFAUT = 0.5
+
+
+def departement_adresse(adresse: str) -> str:
+    """Département déduit du code postal de l'adresse ('' si pas de code postal)."""
+    code_postal = analyser_adresse(adresse or "").code_postal
+    return departement(code_postal) if code_postal else ""
+
+
+def _haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0 * np.arcsin(np.sqrt(a))
+
+
+class ReferenceDepartements:
+    """
+    Rectangle plausible de chaque département, estimé sur les coordonnées existantes :
+    centre = médiane des cinémas du département, demi-étendue = FACTEUR_MAD écarts absolus médians,
+    bornée par DEMI_LARGEUR_MIN / DEMI_LARGEUR_MAX. Médiane et MAD ne sont pas déplacées
+    par les quelques cinémas mal placés que l'on cherche justement à détecter.
+    Les départements de RECTANGLES_CONNUS utilisent leur rectangle fixe.
+    """
+
+    def __init__(self, centres: dict, demi_largeurs: dict):
+        self.centres = centres
+        self.demi_largeurs = demi_largeurs
+
+    @classmethod
+    def depuis_cinemas(cls, cinemas):
+        points = defaultdict(list)
+        for cinema in cinemas:
+            dep = departement_adresse(cinema.get("adresse"))
+            if dep and cinema.get("lat") is not None and cinema.get("lon") is not None:
+                points[dep].append((cinema["lat"], cinema["lon"]))
+        centres, demi_largeurs = {}, {}
+        for dep, coords in points.items():
+            coords = np.asarray(coords, dtype=float)
+            centre = np.median(coords, axis=0)
+            mad = 1.4826 * np.median(np.abs(coords - centre), axis=0)
+            demi = np.clip(FACTEUR_MAD * mad, DEMI_LARGEUR_MIN, DEMI_LARGEUR_MAX)
+            centres[dep], demi_largeurs[dep] = tuple(centre), tuple(demi)
+        for dep, (lat_min, lat_max, lon_min, lon_max) in RECTANGLES_CONNUS.items():
+            centres[dep] = ((lat_min + lat_max) / 2, (lon_min + lon_max) / 2)
+            demi_largeurs[dep] = ((lat_max - lat_min) / 2, (lon_max - lon_min) / 2)
+        return cls(centres, demi_largeurs)
+
+    def plausible(self, adresse: str, coords) -> bool:
+        """
+        Coordonnées compatibles avec le code postal de l'adresse (toujours vrai si le département
+        est inconnu). Sert de validation dans geocodeurs.geocoder_cascade.
+        """
+        dep = departement_adresse(adresse)
+        lat, lon = coords
+        if dep and not dep.startswith("97"):
+            if not (LAT_FRANCE[0] <= lat <= LAT_FRANCE[1] and LON_FRANCE[0] <= lon <= LON_FRANCE[1]):
+                return False
+        if dep not in self.centres:
+            return True
+        (lat_c, lon_c), (dlat, dlon) = self.centres[dep], self.demi_largeurs[dep]
+        return abs(lat - lat_c) <= dlat and abs(lon - lon_c) <= dlon
+
+
+def evaluer(cinemas: list, reference: ReferenceDepartements = None) -> list:
+    """
+    Note chaque cinéma géocodé (0 = rien à signaler) et retourne les suspects, du plus au moins suspect :
+    dicts cinema, adresse, lat, lon, departement, score, motifs, ecart_km (au centre du département),
+    partage_avec (nombre d'autres adresses aux mêmes coordonnées).
+    """
+    cinemas = [c for c in cinemas if c.get("lat") is not None and c.get("lon") is not None]
+    if not cinemas:
+        return []
+    reference = reference or ReferenceDepartements.depuis_cinemas(cinemas)
+    n = len(cinemas)
+    lats = np.fromiter((c["lat"] for c in cinemas), float, n)
+    lons = np.fromiter((c["lon"] for c in cinemas), float, n)
+    deps = [departement_adresse(c.get("adresse")) for c in cinemas]
+
+    # Rectangle du département de chaque cinéma (NaN si inconnu : la comparaison est alors fausse)
+    centres = np.array([reference.centres.get(d, (np.nan, np.nan)) for d in deps], dtype=float)
+    demi = np.array([reference.demi_largeurs.get(d, (np.nan, np.nan)) for d in deps], dtype=float)
+    connu = ~np.isnan(centres[:, 0])
+    hors_departement = connu & ((np.abs(lats - centres[:, 0]) > demi[:, 0]) | (np.abs(lons - centres[:, 1]) > demi[:, 1]))
+    ecart_km = np.where(connu, _haversine_km(lats, lons, centres[:, 0], centres[:, 1]), np.nan)
+
+    metropole = np.array([bool(d) and not d.startswith("97") for d in deps])
+    hors_france = metropole & ((lats < LAT_FRANCE[0]) | (lats > LAT_FRANCE[1]) | (lons < LON_FRANCE[0]) | (lons > LON_FRANCE[1]))
+
+    # Coordonnées identiques pour des adresses différentes : centre de commune ou repli commun
+    _, groupe = np.unique(np.round(np.column_stack((lats, lons)), 6), axis=0, return_inverse=True)
+    groupe = groupe.ravel()
+    adresses = defaultdict(set)
+    for g, cinema in zip(groupe, cinemas):
+        adresses[g].add(normaliser_nom(cinema.get("adresse", "")))
+    partage = np.array([len(adresses[g]) - 1 for g in groupe])
+    partagees = partage > 0
+
+    score = (POIDS["hors_france"] * hors_france
+             + (POIDS["hors_departement"] + np.minimum(np.nan_to_num(ecart_km) / 500, 0.4)) * hors_departement
+             + (POIDS["coordonnees_partagees"] + np.minimum(0.1 * (partage - 1), 0.2)) * partagees)
+
+    suspects = []
+    for i in np.argsort(-score, kind="stable"):
+        if score[i] <= 0:
+            break
+        motifs = [nom for nom, masque in (("hors_france", hors_france), ("hors_departement", hors_departement),
+                                          ("coordonnees_partagees", partagees)) if masque[i]]
+        suspects.append({
+            "cinema": cinemas[i].get("cinema", ""), "adresse": cinemas[i].get("adresse", ""),
+            "lat": cinemas[i]["lat"], "lon": cinemas[i]["lon"], "departement": deps[i],
+            "score": round(float(score[i]), 3), "motifs": motifs,
+            "ecart_km": None if np.isnan(ecart_km[i]) else round(float(ecart_km[i]), 1),
+            "partage_avec": int(partage[i]),
+        })
+    return suspects
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Repère les coordonnées suspectes d'un fichier cinemas_grouped*.json.")
+    parser.add_argument("groupes", help="Fichier cinemas_grouped*.json")
+    parser.add_argument("--seuil", type=float, default=SEUIL_PAR_DEFAUT, help="Score à partir duquel un cinéma est à regéocoder")
+    parser.add_argument("--rapport", help="Écrit la liste complète des suspects (JSON)")
+    parser.add_argument("--invalider", action="store_true",
+                        help="Efface lat/lon des suspects au-dessus du seuil et leurs réponses du cache de géocodage : "
+                             "preprocess_cinemas.py --incremental ne regéocodera qu'eux")
+    parser.add_argument("--cache", default=CHEMIN_CACHE_PAR_DEFAUT, help="Cache de géocodage à nettoyer avec --invalider")
+    args = parser.parse_args()
+
+    groupes = list(iterer_elements(args.groupes))
+    suspects = evaluer(groupes)
+    a_regeocoder = [s for s in suspects if s["score"] >= args.seuil]
+    for suspect in suspects[:20]:
+        print(f"{suspect['score']:.2f} {', '.join(suspect['motifs']):<40} {suspect['cinema']} ({suspect['adresse']})")
+    print(f"{len(suspects)} cinémas signalés, dont {len(a_regeocoder)} au-dessus du seuil {args.seuil}.")
+    if args.rapport:
+        with open(args.rapport, "w", encoding="utf-8") as f:
+            json.dump(suspects, f, indent=4, ensure_ascii=False)
+    if args.invalider and a_regeocoder:
+        cles = {(s["cinema"], s["adresse"]) for s in a_regeocoder}
+        for groupe in groupes:
+            if (groupe.get("cinema", ""), groupe.get("adresse", "")) in cles:
+                groupe["lat"] = groupe["lon"] = None
+        ecrire_elements(args.groupes, groupes)
+        print(f"Coordonnées effacées pour {len(cles)} cinémas dans {args.groupes}.")
+        # Sans cela, les mêmes requêtes retrouveraient les mêmes coordonnées dans le cache (180 jours)
+        oubliees = CacheGeocodage(args.cache).oublier_coordonnees((s["lat"], s["lon"]) for s in a_regeocoder)
+        print(f"{oubliees} réponses à ces coordonnées retirées du cache de géocodage ({args.cache}).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# --- flux_json.py ---
+# Lecture / écriture en flux des fichiers de salles et de cinémas (tableau JSON ou JSONL), un élément à la fois
+# -*- coding: utf-8 -*-
+
+import json
+
+try:  # Analyseur incrémental natif, plus rapide, s'il est installé
+    import ijson
+except ImportError:
+    ijson = None
+
+try:  # Encodage compact accéléré, facultatif
+    import orjson
+except ImportError:
+    orjson = None
+
+TAILLE_BLOC = 1 << 16
+_decodeur = json.JSONDecoder()
+_BLANCS = " \t\n\r"
+_SEPARATEURS = _BLANCS + ",]"
+
+
+def est_jsonl(chemin: str) -> bool:
+    return chemin.endswith(".jsonl")
+
+
+def _iterer_tableau(f):
+    """
+    Analyse incrémentale d'un tableau JSON de premier niveau : seuls l'élément en cours
+    et un bloc de lecture sont en mémoire. Lève json.JSONDecodeError comme json.load.
+    """
+    tampon, pos, fin_fichier = "", 0, False
+
+    def completer():
+        nonlocal tampon, pos, fin_fichier
+        bloc = f.read(TAILLE_BLOC)
+        fin_fichier = not bloc
+        tampon, pos = tampon[pos:] + bloc, 0
+        return not fin_fichier
+
+    def sauter_blancs():
+        nonlocal pos
+        while True:
+            while pos < len(tampon) and tampon[pos] in _BLANCS:
+                pos += 1
+            if pos < len(tampon) or not completer():
+                return
+
+    sauter_blancs()
+    if pos >= len(tampon) or tampon[pos] != "[":
+        raise json.JSONDecodeError("Tableau JSON attendu", tampon, pos)
+    pos += 1
+    premier = True
+    while True:
+        sauter_blancs()
+        if pos >= len(tampon):
+            raise json.JSONDecodeError("Tableau JSON non terminé", tampon, pos)
+        if tampon[pos] == "]":
+            return
+        if not premier:
+            if tampon[pos] != ",":
+                raise json.JSONDecodeError("Virgule attendue", tampon, pos)
+            pos += 1
+            sauter_blancs()
+        while True:
+            try:
+                element, fin = _decodeur.raw_decode(tampon, pos)
+                # Un nombre coupé en fin de bloc serait lu tronqué : on exige un séparateur après l'élément
+                if fin_fichier or (fin < len(tampon) and tampon[fin] in _SEPARATEURS):
+                    break
+            except json.JSONDecodeError:
+                if fin_fichier:
+                    raise
+            completer()
+        pos = fin
+        premier = False
+        yield element
+
+
+def iterer_elements(chemin: str):
+    """
+    Produit un à un les éléments d'un fichier : tableau JSON (ijson si disponible, sinon analyse
+    incrémentale intégrée) ou JSONL (une valeur par ligne, lignes vides ignorées).
+    """
+    if est_jsonl(chemin):
+        with open(chemin, "r", encoding="utf-8") as f:
+            for ligne in f:
+                if ligne.strip():
+                    yield json.loads(ligne)
+    elif ijson is not None:
+        with open(chemin, "rb") as f:
+            try:
+                yield from ijson.items(f, "item", use_float=True)
+            except ijson.JSONError as e:  # Même exception que json.load pour les appelants
+                raise json.JSONDecodeError(str(e), "", 0) from e
+    else:
+        with open(chemin, "r", encoding="utf-8") as f:
+            yield from _iterer_tableau(f)
+
+
+def _encodeur(indent):
+    """Fonction élément -> texte ; un seul JSONEncoder par fichier écrit."""
+    if indent is None:
+        if orjson is not None:
+            return lambda element: orjson.dumps(element).decode("utf-8")
+        return json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    return json.JSONEncoder(ensure_ascii=False, indent=indent).encode
+
+
+def ecrire_elements(chemin: str, elements, indent: int = 4) -> int:
+    """
+    Écrit un itérable élément par élément, sans construire le document en mémoire.
+    - .jsonl : une valeur compacte par ligne ;
+    - indent=None : tableau JSON compact, un élément par ligne (orjson si disponible) ;
+    - sinon : même texte que json.dump(elements, indent=indent, ensure_ascii=False).
+    Retourne le nombre d'éléments écrits.
+    """
+    nb = 0
+    encoder = _encodeur(None if est_jsonl(chemin) else indent)
+    with open(chemin, "w", encoding="utf-8") as f:
+        if est_jsonl(chemin):
+            for element in elements:
+                f.write(encoder(element) + "\n")
+                nb += 1
+            return nb
+        marge = "\n" + " " * (indent or 0)
+        for element in elements:
+            texte = encoder(element)
+            if indent is not None:
+                texte = texte.replace("\n", marge)
+            f.write(("[" if nb == 0 else ",") + marge + texte)
+            nb += 1
+        f.write("[]" if nb == 0 else "\n]")
+    return nb
@@ -0,0 +1,193 @@
+# --- geocodeurs.py ---
+# Géocodeurs interchangeables (Nominatim, Nominatim auto-hébergé, table hors ligne) avec limitation de débit
+# -*- coding: utf-8 -*-
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from typing import NamedTuple
+from geopy.geocoders import Nominatim
+from geopy.exc import GeocoderTimedOut, GeocoderUnavailable
+from cache_geocodage import geocoder_avec_cache
+from communes_france import TableCommunes, analyser_adresse
+
+ERREURS_TRANSITOIRES = (GeocoderTimedOut, GeocoderUnavailable)
+DEBIT_NOMINATIM = 1.0        # Politique d'usage du service public : 1 requête/s au maximum
+DEBIT_AUTO_HEBERGE = 20.0    # Instance Nominatim interne : à ajuster à sa capacité
+URL_AUTO_HEBERGE = os.getenv("NOMINATIM_URL", "localhost:8080")
+
+
+class Position(NamedTuple):
+    """Résultat minimal compatible avec geopy.Location (latitude / longitude)."""
+    latitude: float
+    longitude: float
+
+
+class LimiteurDebit:
+    """
+    Seau à jetons partagé entre threads : au plus `debit` requêtes par seconde en moyenne,
+    avec des rafales de `capacite` requêtes. debit=None désactive la limite.
+    """
+
+    def __init__(self, debit: float = None, capacite: int = 1):
+        self.debit = debit
+        self.capacite = capacite
+        self.jetons = float(capacite)
+        self.dernier = time.monotonic()
+        self._verrou = threading.Lock()
+
+    def acquerir(self):
+        """Bloque jusqu'à ce qu'un jeton soit disponible, puis le consomme."""
+        if not self.debit:
+            return
+        while True:
+            with self._verrou:
+                maintenant = time.monotonic()
+                self.jetons = min(self.capacite, self.jetons + (maintenant - self.dernier) * self.debit)
+                self.dernier = maintenant
+                if self.jetons >= 1:
+                    self.jetons -= 1
+                    return
+                attente = (1 - self.jetons) / self.debit
+            time.sleep(attente)
+
+
+class Geocodeur:
+    """
+    Interface commune : geocode(requete) -> objet avec latitude/longitude, ou None si introuvable.
+    Les erreurs transitoires (ERREURS_TRANSITOIRES) sont propagées pour être retentées.
+    Chaque géocodeur a son propre limiteur de débit.
+    """
+    nom = "abstrait"
+    utilise_cache = True  # Résultats mémorisés dans le cache SQLite partagé
+
+    def __init__(self, debit: float = None, capacite: int = 1):
+        self.limiteur = LimiteurDebit(debit, capacite)
+
+    def geocode(self, requete: str):
+        self.limiteur.acquerir()
+        return self._geocode(requete)
+
+    def _geocode(self, requete: str):
+        raise NotImplementedError
+
+
+class GeocodeurNominatim(Geocodeur):
+    """Service public nominatim.openstreetmap.org (1 requête/s)."""
+    nom = "nominatim"
+
+    def __init__(self, user_agent: str, timeout: int = 15, debit: float = DEBIT_NOMINATIM, domaine: str = "nominatim.openstreetmap.org", scheme: str = "https"):
+        super().__init__(debit)
+        self.client = Nominatim(user_agent=user_agent, timeout=timeout, domain=domaine, scheme=scheme)
+
+    def _geocode(self, requete: str):
+        return self.client.geocode(requete)
+
+
+class GeocodeurAutoHeberge(GeocodeurNominatim):
+    """Instance Nominatim interne (même API, sans la limite du service public). URL : $NOMINATIM_URL."""
+    nom = "auto-heberge"
+
+    def __init__(self, user_agent: str, timeout: int = 15, debit: float = DEBIT_AUTO_HEBERGE, url: str = URL_AUTO_HEBERGE):
+        scheme, _, domaine = url.rpartition("://")
+        super().__init__(user_agent, timeout, debit, domaine=domaine, scheme=scheme or "http")
+        self.limiteur.capacite = max(1, int(debit or 1))  # Rafales autorisées sur un serveur interne
+
+
+class GeocodeurHorsLigne(Geocodeur):
+    """
+    Table des communes (communes_france.csv) : aucun appel réseau, précision à la commune.
+    Sans base La Poste, la table est déduite des cinémas déjà géocodés (cache, pas référence).
+    """
+    nom = "hors-ligne"
+    utilise_cache = False  # Réponse immédiate ; un « introuvable » ne doit pas bloquer Nominatim ensuite
+
+    def __init__(self, table_communes):
+        super().__init__(None)
+        self.table = table_communes
+
+    def _geocode(self, requete: str):
+        coords = self.table.rechercher(requete) or self.table.resoudre_adresse(requete)[0]
+        return Position(*coords) if coords else None
+
+
+def etapes_cascade(nom_cinema: str, adresse: str):
+    """
+    Requêtes successives pour un cinéma, de la plus précise à la plus grossière :
+    (nom + adresse), (adresse), (ville + code postal). adresse est l'adresse nettoyée.
+    """
+    etapes = [("nom+adresse", f"{nom_cinema}, {adresse}"), ("adresse", adresse)]
+    analyse = analyser_adresse(adresse)  # Code postal et commune sans boîte postale ni cedex
+    if analyse.code_postal and analyse.commune:
+        etapes.append(("cp+ville", f"{analyse.commune}, {analyse.code_postal}, France"))
+    return etapes
+
+
+BUDGETS_PAR_DEFAUT = {"nom+adresse": 2, "adresse": 3, "cp+ville": 3}
+
+
+def geocoder_cascade(etapes, geocodeur: Geocodeur, cache, budgets: dict = None, pause_apres_erreur: float = 5, valider=None):
+    """
+    Essaie les étapes dans l'ordre. Chaque étape dispose de son propre nombre de tentatives
+    (budgets[etape]) face aux erreurs transitoires ; une réponse « introuvable » passe à l'étape suivante,
+    de même qu'une réponse refusée par valider(coords) (par exemple hors du département de l'adresse).
+    Retourne (coords ou None, etape ayant réussi ou None, dernière erreur transitoire ou None).
+    """
+    budgets = budgets or BUDGETS_PAR_DEFAUT
+    derniere_erreur = None
+    for etape, requete in etapes:
+        for tentative in range(budgets.get(etape, 1)):
+            try:
+                if geocodeur.utilise_cache and cache is not None:
+                    coords = geocoder_avec_cache(requete, geocodeur.geocode, cache, source=geocodeur.nom)
+                else:
+                    location = geocodeur.geocode(requete)
+                    coords = (location.latitude, location.longitude) if location else None
+            except ERREURS_TRANSITOIRES as e:
+                derniere_erreur = f"{etape} : {e}"
+                if tentative + 1 < budgets.get(etape, 1):
+                    time.sleep(pause_apres_erreur * (tentative + 1))
+                continue
+            if coords and (valider is None or valider(coords)):
+                return coords, etape, None
+            break  # Introuvable (éventuellement depuis le cache négatif) : étape suivante
+    return None, None, derniere_erreur
+
+
+def geocoder_en_parallele(taches, geocodeur: Geocodeur, cache, nb_workers: int = 4, budgets: dict = None, pause_apres_erreur: float = 5, valider=None):
+    """
+    taches : itérable de (cle, etapes). Les cascades s'exécutent dans un pool borné de nb_workers threads ;
+    le limiteur du géocodeur fixe le débit réel. Produit (cle, coords, etape, erreur) au fil des résultats,
+    dans le thread appelant (écriture du journal sans verrou).
+    valider(cle, coords), facultatif, refuse une réponse implausible pour ce cinéma (étape suivante).
+    """
+    with ThreadPoolExecutor(max_workers=nb_workers) as executor:
+        futurs = {
+            executor.submit(geocoder_cascade, etapes, geocodeur, cache, budgets, pause_apres_erreur,
+                            partial(valider, cle) if valider else None): cle
+            for cle, etapes in taches
+        }
+        for futur in as_completed(futurs):
+            try:
+                coords, etape, erreur = futur.result()
+            except Exception as e:  # Erreur inattendue : le cinéma est compté en échec, les autres continuent
+                coords, etape, erreur = None, None, str(e)
+            yield futurs[futur], coords, etape, erreur
+
+
+def creer_geocodeur(nom: str, user_agent: str, timeout: int = 15, debit: float = None, url: str = None, table_communes=None) -> Geocodeur:
+    """Fabrique utilisée par les scripts (option --geocodeur)."""
+    if nom == GeocodeurNominatim.nom:
+        return GeocodeurNominatim(user_agent, timeout, debit or DEBIT_NOMINATIM)
+    if nom == GeocodeurAutoHeberge.nom:
+        return GeocodeurAutoHeberge(user_agent, timeout, debit or DEBIT_AUTO_HEBERGE, url or URL_AUTO_HEBERGE)
+    if nom == GeocodeurHorsLigne.nom:
+        if table_communes is None:
+            table_communes = TableCommunes.charger()
+        return GeocodeurHorsLigne(table_communes)
+    raise ValueError(f"Géocodeur inconnu : {nom}")
+
+
+NOMS_GEOCODEURS = [GeocodeurNominatim.nom, GeocodeurAutoHeberge.nom, GeocodeurHorsLigne.nom]
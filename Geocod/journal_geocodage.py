@@ -0,0 +1,56 @@
+# --- journal_geocodage.py ---
+# Journal de reprise (JSONL, ajout seul) des scripts preprocess_cinemas.py
+# -*- coding: utf-8 -*-
+
+import json
+import os
+
+
+class JournalGeocodage:
+    """
+    Une ligne JSON par cinéma traité, écrite (et synchronisée sur disque) dès que le résultat est connu :
+    {"cinema", "adresse", "lat", "lon"} et "erreur" en cas d'échec.
+    Un arrêt brutal ne perd au plus que le cinéma en cours ; une ligne tronquée est ignorée à la relecture.
+    En cas de doublon, la dernière ligne d'un cinéma l'emporte (un échec repris puis résolu).
+    """
+
+    def __init__(self, chemin: str):
+        self.chemin = chemin
+
+    @staticmethod
+    def cle(cinema: dict):
+        return (cinema.get("cinema", ""), cinema.get("adresse", ""))
+
+    def charger(self) -> dict:
+        """Retourne un dict (cinema, adresse) -> dernière entrée du journal (vide si pas de journal)."""
+        entrees = {}
+        if not os.path.exists(self.chemin):
+            return entrees
+        ligne = ""
+        with open(self.chemin, "r", encoding="utf-8") as f:
+            for ligne in f:
+                try:
+                    entree = json.loads(ligne)
+                except json.JSONDecodeError:
+                    continue  # Dernière ligne interrompue par un arrêt brutal
+                entrees[self.cle(entree)] = entree
+        if ligne and not ligne.endswith("\n"):
+            # Termine la ligne interrompue pour que les prochains ajouts restent lisibles
+            with open(self.chemin, "a", encoding="utf-8") as f:
+                f.write("\n")
+        return entrees
+
+    def reinitialiser(self):
+        """Démarre un nouveau journal (traitement complet, sans reprise)."""
+        open(self.chemin, "w", encoding="utf-8").close()
+
+    def ajouter(self, cinema: dict, erreur: str = None):
+        """Enregistre le résultat d'un cinéma (lat/lon à None en cas d'échec)."""
+        entree = {"cinema": cinema.get("cinema", ""), "adresse": cinema.get("adresse", ""),
+                  "lat": cinema.get("lat"), "lon": cinema.get("lon")}
+        if erreur:
+            entree["erreur"] = erreur
+        with open(self.chemin, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entree, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
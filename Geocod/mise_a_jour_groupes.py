@@ -0,0 +1,122 @@
+# --- mise_a_jour_groupes.py ---
+# Mise à jour incrémentale de cinemas_grouped*.json à partir d'un nouvel export Cinego
+# -*- coding: utf-8 -*-
+
+import os
+from flux_json import iterer_elements
+
+
+def cle_groupe(groupe: dict):
+    return (groupe.get("cinema", ""), groupe.get("adresse", ""))
+
+
+def charger_groupes(chemin: str) -> list:
+    """Fichier groupé précédent, ou liste vide s'il n'existe pas encore."""
+    if not os.path.exists(chemin):
+        return []
+    return list(iterer_elements(chemin))
+
+
+def coordonnees_connues(groupes: list):
+    """
+    Coordonnées déjà obtenues, par (cinema, adresse) et par adresse seule :
+    un cinéma renommé à la même adresse n'a pas besoin d'être géocodé à nouveau.
+    """
+    par_cle, par_adresse = {}, {}
+    for groupe in groupes:
+        if groupe.get("lat") is None or groupe.get("lon") is None:
+            continue
+        coords = (groupe["lat"], groupe["lon"])
+        par_cle[cle_groupe(groupe)] = coords
+        if groupe.get("adresse"):
+            par_adresse.setdefault(groupe["adresse"], coords)
+    return par_cle, par_adresse
+
+
+def appliquer_coordonnees_connues(cinemas_uniques: list, groupes_precedents: list) -> int:
+    """
+    Reporte sur les cinémas uniques les coordonnées du fichier précédent ; seuls les cinémas
+    sans coordonnées (nouvelle adresse ou échec précédent) partiront au géocodage.
+    Retourne le nombre de cinémas complétés.
+    """
+    par_cle, par_adresse = coordonnees_connues(groupes_precedents)
+    reportes = 0
+    for cinema in cinemas_uniques:
+        coords = par_cle.get(cle_groupe(cinema)) or par_adresse.get(cinema.get("adresse", ""))
+        if coords:
+            cinema["lat"], cinema["lon"] = coords
+            reportes += 1
+    return reportes
+
+
+def _cncs(groupe: dict) -> set:
+    return {salle.get("cnc", "") for salle in groupe.get("salles", []) if salle.get("cnc")}
+
+
+def comparer_groupes(precedents: list, nouveaux: list) -> dict:
+    """
+    Rapport des différences entre deux fichiers groupés :
+    cinémas ajoutés / supprimés (par clé cinema + adresse), cinémas modifiés (salles ajoutées ou retirées
+    par numéro CNC, autres champs), et salles déplacées d'un cinéma à un autre (même CNC, clé différente).
+    """
+    anciens = {cle_groupe(g): g for g in precedents}
+    recents = {cle_groupe(g): g for g in nouveaux}
+    rapport = {"ajoutes": [], "supprimes": [], "modifies": [], "deplaces": [], "inchanges": 0}
+
+    for cle, groupe in recents.items():
+        ancien = anciens.get(cle)
+        if ancien is None:
+            rapport["ajoutes"].append({"cinema": cle[0], "adresse": cle[1], "salles": len(groupe.get("salles", []))})
+        elif ancien == groupe:
+            rapport["inchanges"] += 1
+        else:
+            modification = {"cinema": cle[0], "adresse": cle[1]}
+            ajoutees, retirees = sorted(_cncs(groupe) - _cncs(ancien)), sorted(_cncs(ancien) - _cncs(groupe))
+            if ajoutees:
+                modification["salles_ajoutees"] = ajoutees
+            if retirees:
+                modification["salles_retirees"] = retirees
+            champs = sorted(k for k in set(groupe) | set(ancien) if k != "salles" and groupe.get(k) != ancien.get(k))
+            if groupe.get("salles") != ancien.get("salles") and not ajoutees and not retirees:
+                champs.append("salles")
+            if champs:
+                modification["champs_modifies"] = champs
+            rapport["modifies"].append(modification)
+    for cle in anciens:
+        if cle not in recents:
+            rapport["supprimes"].append({"cinema": cle[0], "adresse": cle[1]})
+
+    ancien_cnc = {cnc: cle for cle, g in anciens.items() for cnc in _cncs(g)}
+    for cle, groupe in recents.items():
+        for cnc in sorted(_cncs(groupe)):
+            origine = ancien_cnc.get(cnc)
+            if origine is not None and origine != cle:
+                rapport["deplaces"].append({"cnc": cnc, "de": list(origine), "vers": list(cle)})
+    return rapport
+
+
+def _salles_export(groupe: dict) -> set:
+    """Salles du groupe telles que l'export les identifie : (numéro CNC, numéro de salle)."""
+    return {(salle.get("cnc", ""), salle.get("salle", "")) for salle in groupe.get("salles", [])}
+
+
+def fusionner_groupes(precedents: list, nouveaux: list) -> list:
+    """
+    Résultat final dans l'ordre du nouvel export. Un groupe dont la clé (cinema, adresse) et les salles
+    (CNC, numéro) n'ont pas changé est repris tel quel du fichier précédent, corrections manuelles
+    comprises (coordonnées rectifiées, contact complété...). Les nouveaux groupes et ceux dont les salles
+    ont changé viennent du nouvel export. Les autres changements de l'export (capacité, contact) d'un groupe
+    repris ne sont pas appliqués : comparer_groupes les signale dans champs_modifies.
+    """
+    anciens = {cle_groupe(g): g for g in precedents}
+    fusion = []
+    for groupe in nouveaux:
+        ancien = anciens.get(cle_groupe(groupe))
+        fusion.append(ancien if ancien is not None and _salles_export(ancien) == _salles_export(groupe) else groupe)
+    return fusion
+
+
+def resumer_rapport(rapport: dict) -> str:
+    return (f"{len(rapport['ajoutes'])} ajoutés, {len(rapport['supprimes'])} supprimés, "
+            f"{len(rapport['modifies'])} modifiés, {len(rapport['deplaces'])} salles déplacées, "
+            f"{rapport['inchanges']} inchangés")
@@ -0,0 +1,80 @@
+# --- resoudre_erreurs.py ---
+# Reprend hors ligne les adresses en échec (geocoding_errors*.json) avec la table des communes
+# (position approximative à la commune ; sans base La Poste, la table n'est qu'un cache des géocodages passés)
+# Usage : python resoudre_erreurs.py erreurs.json groupes.json [--geocodes geocodes.json] [--ecrire]
+# -*- coding: utf-8 -*-
+
+import argparse
+import json
+from communes_france import CHEMIN_TABLE_PAR_DEFAUT, TableCommunes
+from controle_geocodes import ReferenceDepartements
+
+
+def charger(chemin):
+    with open(chemin, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def sauvegarder(chemin, donnees):
+    with open(chemin, "w", encoding="utf-8") as f:
+        json.dump(donnees, f, indent=4, ensure_ascii=False)
+
+
+def completer(cinemas, resolus):
+    """Renseigne lat/lon des cinémas sans coordonnées présents dans resolus. Retourne le nombre modifié."""
+    modifies = 0
+    for cinema in cinemas:
+        coords = resolus.get((cinema.get("cinema", ""), cinema.get("adresse", "")))
+        if coords and cinema.get("lat") is None:
+            cinema["lat"], cinema["lon"] = coords
+            modifies += 1
+    return modifies
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Résout hors ligne les adresses restées en échec au géocodage, au centre de leur commune. "
+                    "La table livrée est déduite des cinémas déjà géocodés : c'est un cache des résultats passés, "
+                    "pas une référence (construire_table_communes.py --laposte pour une table indépendante).")
+    parser.add_argument("erreurs", help="Fichier geocoding_errors*.json")
+    parser.add_argument("groupes", help="Fichier cinemas_grouped*.json à compléter")
+    parser.add_argument("--geocodes", help="Fichier cinemas_geocoded*.json à compléter également")
+    parser.add_argument("--table", default=CHEMIN_TABLE_PAR_DEFAUT, help="Table des communes (communes_france.csv)")
+    parser.add_argument("--ecrire", action="store_true", help="Écrit les fichiers (sinon, simple rapport)")
+    args = parser.parse_args()
+
+    table = TableCommunes.charger(args.table)
+    if not table.independante:
+        print("⚠️ Table des communes sans base La Poste : positions déduites des cinémas déjà géocodés "
+              "(médiane par commune), à vérifier.")
+    erreurs = charger(args.erreurs)
+    groupes = charger(args.groupes)
+    # Rectangle plausible de chaque département, estimé sur les cinémas déjà géocodés (controle_geocodes.py)
+    reference = ReferenceDepartements.depuis_cinemas(groupes)
+    resolus, restants = {}, []
+    for erreur in erreurs:
+        coords, precision = table.resoudre_adresse(erreur.get("adresse", ""))
+        if coords and not reference.plausible(erreur.get("adresse", ""), coords):
+            print(f"❌ {erreur.get('cinema')} ({precision}) : {coords[0]:.5f}, {coords[1]:.5f} hors du département, ignoré")
+            coords = None
+        if coords:
+            resolus[(erreur.get("cinema", ""), erreur.get("adresse", ""))] = coords
+            print(f"✅ {erreur.get('cinema')} ({precision}) : {coords[0]:.5f}, {coords[1]:.5f}")
+        else:
+            restants.append(erreur)
+    print(f"{len(resolus)} adresses résolues hors ligne, {len(restants)} restent en échec.")
+
+    if not args.ecrire:
+        print("(Rapport seulement : relancer avec --ecrire pour mettre à jour les fichiers.)")
+        return
+    print(f"{completer(groupes, resolus)} cinémas complétés dans {args.groupes}")
+    sauvegarder(args.groupes, groupes)
+    if args.geocodes:
+        geocodes = charger(args.geocodes)
+        print(f"{completer(geocodes, resolus)} cinémas complétés dans {args.geocodes}")
+        sauvegarder(args.geocodes, geocodes)
+    sauvegarder(args.erreurs, restants)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+Résolution hors ligne des adresses (communes_france.py) : un nom de commune n'est accepté
+que pour la commune analysée de l'adresse, et un résultat hors du département est refusé.
+"""
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from communes_france import TableCommunes, analyser_adresse
+from controle_geocodes import ReferenceDepartements
+
+# (code postal, commune, lat, lon, poids)
+LIGNES = [
+    ("93200", "Saint-Denis", 48.936, 2.357, 10),
+    ("97400", "Saint-Denis", -20.882, 55.450, 5),
+    ("50500", "Carentan-les-Marais", 49.304, -1.246, 1),
+    ("69001", "Lyon", 45.767, 4.835, 1),
+]
+
+
+def test_analyse_adresse_cinego():
+    assert analyser_adresse("rue Holgate - BP 12 - 50500 Carentan-les-Marais Cedex") == (
+        "rue Holgate", "50500", "Carentan-les-Marais")
+    assert analyser_adresse("1 rue de la Gare - Saint-Denis").code_postal == ""
+
+
+def test_nom_de_commune_seulement_pour_la_commune_analysee():
+    table = TableCommunes(LIGNES)
+    assert table.resoudre_adresse("rue X - 50500 Carentan-les-Marais") == ((49.304, -1.246), "commune")
+    assert table.resoudre_adresse("rue X - 69999 Lyon") == ((45.767, 4.835), "nom")
+    # Sans code postal, une voie ou un lieu homonyme d'une commune ne place pas le cinéma
+    assert table.resoudre_adresse("Place Saint-Denis - Gare") == (None, None)
+    assert table.resoudre_adresse("1 rue de la Gare - Saint-Denis") == (None, None)
+
+
+def test_resultat_hors_departement_refuse():
+    reference = ReferenceDepartements.depuis_cinemas([
+        {"adresse": "rue A - 50100 Cherbourg", "lat": 49.64, "lon": -1.62},
+        {"adresse": "rue B - 50000 Saint-Lô", "lat": 49.12, "lon": -1.09},
+    ])
+    assert reference.plausible("rue X - 50500 Carentan-les-Marais", (49.304, -1.246))
+    assert not reference.plausible("rue X - 50500 Saint-Denis", (48.936, 2.357))
+
+
+def test_source_de_la_table(tmp_path):
+    # Ancien fichier sans colonne source : lignes déduites des cinémas, table non indépendante
+    ancien, mixte = tmp_path / "ancien.csv", tmp_path / "mixte.csv"
+    ancien.write_text("code_postal;commune;lat;lon;poids\n69001;Lyon;45.767;4.835;1\n", encoding="utf-8")
+    mixte.write_text("code_postal;commune;lat;lon;poids;source\n69001;Lyon;45.767;4.835;1;cinemas\n"
+                     "50500;Carentan-les-Marais;49.304;-1.246;1;laposte\n", encoding="utf-8")
+    table = TableCommunes.charger(str(ancien))
+    assert (table.sources, table.independante) == ({"cinemas": 1}, False)
+    table = TableCommunes.charger(str(mixte))
+    assert table.independante and table.rechercher("50500 Carentan-les-Marais") == (49.304, -1.246)
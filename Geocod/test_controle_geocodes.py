@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+Contrôle qualité des coordonnées (controle_geocodes.py) : cinémas hors de leur département ou
+à des coordonnées partagées, puis --invalider qui efface leurs coordonnées et les réponses du cache.
+"""
+
+import sys
+import pytest
+
+pytest.importorskip("numpy")
+
+import controle_geocodes
+from cache_geocodage import CacheGeocodage
+from controle_geocodes import ReferenceDepartements, evaluer
+from flux_json import ecrire_elements, iterer_elements
+
+# Huit cinémas lyonnais bien placés, un « lyonnais » géocodé à Lille et deux adresses nantaises au même point
+GROUPES = [{"cinema": f"Lyon {i}", "adresse": f"{i} rue A - 69001 Lyon", "lat": 45.75 + 0.01 * i, "lon": 4.85}
+           for i in range(8)] + [
+    {"cinema": "Égaré", "adresse": "9 rue B - 69002 Lyon", "lat": 50.63, "lon": 3.06},
+    {"cinema": "Nantes 1", "adresse": "1 rue C - 44000 Nantes", "lat": 47.218, "lon": -1.553},
+    {"cinema": "Nantes 2", "adresse": "2 rue D - 44000 Nantes", "lat": 47.218, "lon": -1.553},
+]
+
+
+def test_suspects_hors_departement_puis_coordonnees_partagees():
+    suspects = evaluer(GROUPES + [{"cinema": "Sans coordonnées", "adresse": "", "lat": None, "lon": None}])
+    assert [s["cinema"] for s in suspects] == ["Égaré", "Nantes 1", "Nantes 2"]
+    assert suspects[0]["motifs"] == ["hors_departement"] and suspects[0]["departement"] == "69"
+    assert suspects[0]["ecart_km"] > 400 and suspects[0]["score"] >= 0.9
+    assert suspects[1]["motifs"] == ["coordonnees_partagees"] and suspects[1]["partage_avec"] == 1
+    assert evaluer([]) == []
+
+
+def test_reference_plausible():
+    reference = ReferenceDepartements.depuis_cinemas(GROUPES)
+    assert reference.plausible("5 rue A - 69003 Lyon", (45.76, 4.84))
+    assert not reference.plausible("5 rue A - 69003 Lyon", (50.63, 3.06))
+    assert not reference.plausible("1 rue X - 75001 Paris", (48.70, 2.35))  # Rectangle fixe de Paris
+    assert reference.plausible("Adresse sans code postal", (0.0, 0.0))
+
+
+def test_invalider_efface_coordonnees_et_cache(tmp_path, monkeypatch, capsys):
+    chemin_groupes, chemin_cache = str(tmp_path / "groupes.json"), str(tmp_path / "cache.sqlite")
+    ecrire_elements(chemin_groupes, GROUPES)
+    cache = CacheGeocodage(chemin_cache)
+    cache.ecrire("Égaré, 9 rue B, Lyon", (50.63, 3.06))
+    cache.ecrire("9 rue B, Lyon", (50.63, 3.06), source="auto-heberge")
+    cache.ecrire("1 rue A, Lyon", (45.76, 4.85))
+
+    monkeypatch.setattr(sys, "argv", ["controle_geocodes.py", chemin_groupes, "--seuil", "0.9",
+                                      "--invalider", "--cache", chemin_cache])
+    controle_geocodes.main()
+    assert "2 réponses à ces coordonnées retirées" in capsys.readouterr().out
+
+    groupes = {g["cinema"]: g for g in iterer_elements(chemin_groupes)}
+    assert (groupes["Égaré"]["lat"], groupes["Égaré"]["lon"]) == (None, None)
+    assert groupes["Nantes 1"]["lat"] == 47.218  # Sous le seuil : conservé
+    assert cache.lire("Égaré, 9 rue B, Lyon") == (False, None)
+    assert cache.lire("9 rue B, Lyon", source="auto-heberge") == (False, None)
+    assert cache.lire("1 rue A, Lyon") == (True, (45.76, 4.85))
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+Lecture / écriture en flux (flux_json.py) : ecrire_elements puis iterer_elements restitue les éléments,
+dans les trois formats, et l'analyse intégrée résiste aux éléments coupés entre deux blocs.
+"""
+
+import io
+import json
+import pytest
+
+import flux_json
+from flux_json import _iterer_tableau, ecrire_elements, iterer_elements
+
+ELEMENTS = [
+    {"cinema": "Ciné « Étoile »", "adresse": "1 rue A\n75002 Paris", "lat": 48.8712345, "lon": 2.3456789,
+     "salles": [{"salle": "1", "cnc": "100", "capacite": 120}]},
+    {"cinema": "Le Rex", "adresse": "", "lat": None, "lon": -0.5, "salles": []},
+    [1, 2.5e-7, "]", ",", {"x": [[]]}],
+    1234567890,
+    "texte",
+]
+
+
+@pytest.mark.parametrize("avec_ijson", [True, False])
+@pytest.mark.parametrize("nom, indent", [("salles.json", 4), ("salles.json", None), ("salles.jsonl", 4)])
+def test_aller_retour(tmp_path, monkeypatch, nom, indent, avec_ijson):
+    if not avec_ijson:
+        monkeypatch.setattr(flux_json, "ijson", None)  # Analyse incrémentale intégrée
+    chemin = str(tmp_path / nom)
+    assert ecrire_elements(chemin, iter(ELEMENTS), indent=indent) == len(ELEMENTS)
+    assert list(iterer_elements(chemin)) == ELEMENTS
+
+
+def test_meme_texte_que_json_dump(tmp_path):
+    chemin = tmp_path / "salles.json"
+    ecrire_elements(str(chemin), ELEMENTS, indent=4)
+    assert chemin.read_text(encoding="utf-8") == json.dumps(ELEMENTS, indent=4, ensure_ascii=False)
+    ecrire_elements(str(chemin), [], indent=4)
+    assert list(iterer_elements(str(chemin))) == []
+
+
+def test_analyse_integree_par_petits_blocs(monkeypatch):
+    # Blocs de 7 caractères : chaînes, nombres et objets sont coupés en cours d'élément
+    monkeypatch.setattr(flux_json, "TAILLE_BLOC", 7)
+    texte = json.dumps(ELEMENTS, indent=2, ensure_ascii=False)
+    assert list(_iterer_tableau(io.StringIO(texte))) == ELEMENTS
+    with pytest.raises(json.JSONDecodeError):
+        list(_iterer_tableau(io.StringIO(texte[:-3])))
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Géocodeurs interchangeables (geocodeurs.py) : limiteur de débit, budgets de la cascade face aux
+erreurs transitoires, validation des réponses et cache séparé par géocodeur.
+"""
+
+import time
+import pytest
+
+pytest.importorskip("geopy")
+from geopy.exc import GeocoderTimedOut
+
+from cache_geocodage import CacheGeocodage
+from geocodeurs import Geocodeur, LimiteurDebit, Position, geocoder_cascade, geocoder_en_parallele
+
+ETAPES = [("nom+adresse", "Le Rex, 1 rue A, Paris"), ("adresse", "1 rue A, Paris"), ("cp+ville", "Paris, 75002, France")]
+
+
+class GeocodeurFactice(Geocodeur):
+    """Réponses scriptées par requête : Position, None (introuvable) ou exception levée."""
+
+    def __init__(self, reponses, nom="factice"):
+        super().__init__(None)
+        self.nom = nom
+        self.reponses = reponses
+        self.appels = []
+
+    def _geocode(self, requete):
+        self.appels.append(requete)
+        reponse = self.reponses.get(requete)
+        if isinstance(reponse, list):  # Une réponse par appel successif
+            reponse = reponse.pop(0)
+        if isinstance(reponse, Exception):
+            raise reponse
+        return reponse
+
+
+def test_limiteur_debit():
+    limiteur = LimiteurDebit(debit=50, capacite=1)
+    debut = time.monotonic()
+    for _ in range(6):
+        limiteur.acquerir()
+    assert time.monotonic() - debut >= 5 / 50 * 0.9  # Premier jeton immédiat, puis un toutes les 20 ms
+    LimiteurDebit(None).acquerir()  # Sans limite : jamais bloquant
+
+
+def test_budget_par_etape_puis_etape_suivante():
+    geocodeur = GeocodeurFactice({
+        ETAPES[0][1]: [GeocoderTimedOut("lent"), GeocoderTimedOut("lent")],
+        ETAPES[1][1]: None,
+        ETAPES[2][1]: Position(48.87, 2.34),
+    })
+    coords, etape, erreur = geocoder_cascade(ETAPES, geocodeur, None, pause_apres_erreur=0)
+    assert (coords, etape, erreur) == ((48.87, 2.34), "cp+ville", None)
+    # Deux tentatives (budget de nom+adresse), un seul appel pour une réponse « introuvable »
+    assert geocodeur.appels == [ETAPES[0][1], ETAPES[0][1], ETAPES[1][1], ETAPES[2][1]]
+
+
+def test_erreur_transitoire_remontee_si_tout_echoue():
+    geocodeur = GeocodeurFactice({requete: GeocoderTimedOut("lent") for _, requete in ETAPES})
+    coords, etape, erreur = geocoder_cascade(ETAPES, geocodeur, None, budgets={"nom+adresse": 1, "adresse": 1, "cp+ville": 3},
+                                             pause_apres_erreur=0)
+    assert (coords, etape) == (None, None) and erreur.startswith("cp+ville")
+    assert len(geocodeur.appels) == 5
+
+
+def test_reponse_refusee_par_valider():
+    geocodeur = GeocodeurFactice({ETAPES[0][1]: Position(43.3, 5.4), ETAPES[1][1]: Position(48.87, 2.34)})
+    coords, etape, _ = geocoder_cascade(ETAPES, geocodeur, None, valider=lambda c: c[0] > 45)
+    assert (coords, etape) == ((48.87, 2.34), "adresse")
+
+
+def test_cache_separe_par_geocodeur(tmp_path):
+    cache = CacheGeocodage(str(tmp_path / "cache.sqlite"))
+    auto_heberge = GeocodeurFactice({}, nom="auto-heberge")  # Ne trouve rien
+    assert geocoder_cascade(ETAPES[:1], auto_heberge, cache) == (None, None, None)
+    nominatim = GeocodeurFactice({ETAPES[0][1]: Position(48.87, 2.34)}, nom="nominatim")
+    # Le « introuvable » de l'instance auto-hébergée n'empêche pas d'interroger Nominatim
+    assert geocoder_cascade(ETAPES[:1], nominatim, cache)[0] == (48.87, 2.34)
+    assert geocoder_cascade(ETAPES[:1], nominatim, cache)[0] == (48.87, 2.34)
+    assert len(nominatim.appels) == 1 and len(auto_heberge.appels) == 1  # Le second appel vient du cache
+    assert geocoder_cascade(ETAPES[:1], auto_heberge, cache)[0] is None
+
+
+def test_cascades_en_parallele():
+    geocodeur = GeocodeurFactice({f"{i}, rue": Position(float(i), 0.0) for i in range(8)})
+    taches = [(i, [("adresse", f"{i}, rue")]) for i in range(8)]
+    resultats = {cle: coords for cle, coords, _, _ in geocoder_en_parallele(taches, geocodeur, None, nb_workers=3)}
+    assert resultats == {i: (float(i), 0.0) for i in range(8)}
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""
+Journal de reprise (journal_geocodage.py) : relecture après un arrêt brutal au milieu d'une ligne,
+et dernière entrée d'un cinéma retenue.
+"""
+
+from journal_geocodage import JournalGeocodage
+
+A = {"cinema": "Le Rex", "adresse": "1 rue A - 75002 Paris"}
+B = {"cinema": "Le Rex", "adresse": "2 rue B - 06000 Nice"}
+
+
+def test_reprise_apres_ligne_tronquee(tmp_path):
+    chemin = tmp_path / "journal.jsonl"
+    journal = JournalGeocodage(str(chemin))
+    journal.reinitialiser()
+    journal.ajouter(dict(A, lat=48.87, lon=2.34))
+    journal.ajouter(dict(B, lat=None, lon=None), erreur="Timeout")
+    with open(chemin, "a", encoding="utf-8") as f:
+        f.write('{"cinema": "Cinéma coupé", "adresse": "3 ru')  # Arrêt brutal pendant l'écriture
+
+    entrees = JournalGeocodage(str(chemin)).charger()
+    assert set(entrees) == {JournalGeocodage.cle(A), JournalGeocodage.cle(B)}
+    assert entrees[JournalGeocodage.cle(B)]["erreur"] == "Timeout"
+
+    # La ligne interrompue est terminée : un ajout après reprise reste lisible et l'emporte
+    journal.ajouter(dict(B, lat=43.70, lon=7.27))
+    entrees = journal.charger()
+    assert (entrees[JournalGeocodage.cle(B)]["lat"], "erreur" in entrees[JournalGeocodage.cle(B)]) == (43.70, False)
+    assert len(entrees) == 2
+
+
+def test_pas_de_journal(tmp_path):
+    assert JournalGeocodage(str(tmp_path / "absent.jsonl")).charger() == {}
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Mise à jour incrémentale des fichiers groupés (mise_a_jour_groupes.py) : rapport des différences
+entre deux petits fichiers et fusion qui conserve les groupes inchangés.
+"""
+
+from flux_json import ecrire_elements
+from mise_a_jour_groupes import (appliquer_coordonnees_connues, charger_groupes, comparer_groupes,
+                                 fusionner_groupes, resumer_rapport)
+
+
+def _groupe(cinema, adresse, cncs, **champs):
+    return dict({"cinema": cinema, "adresse": adresse, "lat": 48.0, "lon": 2.0,
+                 "salles": [{"salle": str(i + 1), "cnc": cnc} for i, cnc in enumerate(cncs)]}, **champs)
+
+
+PRECEDENTS = [
+    _groupe("Le Rex", "1 rue A - 75002 Paris", ["100", "101"]),
+    _groupe("Le Palace", "2 rue B - 69001 Lyon", ["200"]),
+    _groupe("Ciné Sud", "3 rue C - 13001 Marseille", ["300", "301"], contact="a@b.fr"),
+    _groupe("Le Vieux", "4 rue D - 33000 Bordeaux", ["400"]),
+]
+NOUVEAUX = [
+    _groupe("Le Rex", "1 rue A - 75002 Paris", ["100", "101"]),             # Inchangé
+    _groupe("Le Palace", "2 rue B - 69001 Lyon", ["200", "201", "301"]),    # 201 ajoutée, 301 venue de Ciné Sud
+    _groupe("Ciné Sud", "3 rue C - 13001 Marseille", ["300"], contact="c@d.fr"),
+    _groupe("Le Neuf", "5 rue E - 44000 Nantes", ["500"]),
+]
+
+
+def test_comparer_deux_fichiers_groupes(tmp_path):
+    chemin_precedent, chemin_nouveau = tmp_path / "avant.json", tmp_path / "apres.json"
+    ecrire_elements(str(chemin_precedent), PRECEDENTS)
+    ecrire_elements(str(chemin_nouveau), NOUVEAUX)
+    rapport = comparer_groupes(charger_groupes(str(chemin_precedent)), charger_groupes(str(chemin_nouveau)))
+
+    assert rapport["inchanges"] == 1
+    assert rapport["ajoutes"] == [{"cinema": "Le Neuf", "adresse": "5 rue E - 44000 Nantes", "salles": 1}]
+    assert rapport["supprimes"] == [{"cinema": "Le Vieux", "adresse": "4 rue D - 33000 Bordeaux"}]
+    modifies = {m["cinema"]: m for m in rapport["modifies"]}
+    assert modifies["Le Palace"]["salles_ajoutees"] == ["201", "301"]
+    assert modifies["Ciné Sud"] == {"cinema": "Ciné Sud", "adresse": "3 rue C - 13001 Marseille",
+                                    "salles_retirees": ["301"], "champs_modifies": ["contact"]}
+    assert rapport["deplaces"] == [{"cnc": "301", "de": ["Ciné Sud", "3 rue C - 13001 Marseille"],
+                                    "vers": ["Le Palace", "2 rue B - 69001 Lyon"]}]
+    assert resumer_rapport(rapport) == "1 ajoutés, 1 supprimés, 2 modifiés, 1 salles déplacées, 1 inchangés"
+    assert charger_groupes(str(tmp_path / "absent.json")) == []
+
+
+def test_fusion_conserve_les_corrections_manuelles():
+    # Le Rex corrigé à la main dans le fichier précédent : coordonnées et contact ne viennent pas de l'export
+    precedents = [dict(PRECEDENTS[0], lat=48.8691, lon=2.3478, contact={"email": "rex@exemple.fr"})] + PRECEDENTS[1:]
+    rex_reconstruit = dict(NOUVEAUX[0], salles=list(reversed(NOUVEAUX[0]["salles"])))  # Ordre des salles sans effet
+    fusion = fusionner_groupes(precedents, [rex_reconstruit] + NOUVEAUX[1:])
+    assert [g["cinema"] for g in fusion] == ["Le Rex", "Le Palace", "Ciné Sud", "Le Neuf"]
+    assert (fusion[0]["lat"], fusion[0]["lon"], fusion[0]["contact"]) == (48.8691, 2.3478, {"email": "rex@exemple.fr"})
+    # Salles changées (Le Palace, Ciné Sud) ou nouveau cinéma : valeurs du nouvel export
+    assert [g["salles"] for g in fusion[1:]] == [g["salles"] for g in NOUVEAUX[1:]]
+    assert fusion[2]["contact"] == "c@d.fr"
+
+
+def test_coordonnees_reprises_par_cle_puis_par_adresse():
+    cinemas = [{"cinema": "Le Rex", "adresse": "1 rue A - 75002 Paris"},
+               {"cinema": "Rex Renommé", "adresse": "2 rue B - 69001 Lyon"},
+               {"cinema": "Inconnu", "adresse": "9 rue Z - 59000 Lille"}]
+    assert appliquer_coordonnees_connues(cinemas, PRECEDENTS) == 2
+    assert "lat" not in cinemas[2] and cinemas[1]["lat"] == 48.0
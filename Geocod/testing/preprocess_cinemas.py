@@ -1,20 +1,32 @@
+import argparse
 import json
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut, GeocoderUnavailable
-import time
+import os
+import sys
 import re
 from collections import defaultdict
 
+# Modules partagés du dossier Geocod (cache de géocodage commun avec l'application)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cache_geocodage import CacheGeocodage
+from communes_france import TableCommunes
+from controle_geocodes import SEUIL_PAR_DEFAUT, ReferenceDepartements, evaluer
+from geocodeurs import NOMS_GEOCODEURS, creer_geocodeur, etapes_cascade, geocoder_en_parallele
+from flux_json import ecrire_elements, iterer_elements
+from journal_geocodage import JournalGeocodage
+from mise_a_jour_groupes import (appliquer_coordonnees_connues, charger_groupes, comparer_groupes,
+                                 fusionner_groupes, resumer_rapport)
+
 # --- Configuration ---
 input_filename = "test.json"
 geocoded_filename = "cinemas_geocoded.json"
 grouped_filename = "cinemas_grouped.json"
+journal_filename = "geocodage_journal.jsonl"  # Reprise après interruption (--resume)
 errors_filename = "geocoding_errors.json"
+rapport_filename = "rapport_modifications.json"  # Différences avec le fichier groupé précédent (--incremental)
 GEOCODER_USER_AGENT = "CinemaMapApp/1.0 (Preprocessing)"
 GEOCODER_TIMEOUT = 15
-SLEEP_BETWEEN_REQUESTS = 1.1
-SLEEP_AFTER_ERROR = 5
-MAX_RETRIES = 3  # Maximum number of retries in case of a timeout
+SLEEP_AFTER_ERROR = 5  # Pause avant de retenter une étape après un timeout (multipliée à chaque essai)
+NB_WORKERS = 4  # Cascades menées en parallèle ; le débit réel est fixé par le géocodeur choisi
 
 # --- Fonction de nettoyage d'adresse améliorée ---
 def nettoyer_adresse(adresse_brute):
@@ -128,16 +140,38 @@ def regrouper_cinemas(cinemas_geocodes, salles_originales):
     # Conversion en liste finale
     return list(cinemas_groupes.values())
 
+# --- Options de la ligne de commande ---
+parser = argparse.ArgumentParser(description="Géocode et regroupe les salles de cinéma.")
+parser.add_argument("--resume", action="store_true",
+                    help=f"Reprend le traitement à partir de '{journal_filename}' : les cinémas déjà géocodés sont sautés, seuls les échecs sont retentés")
+parser.add_argument("--geocodeur", choices=NOMS_GEOCODEURS, default="nominatim",
+                    help="nominatim (service public, 1 req/s), auto-heberge ($NOMINATIM_URL) ou hors-ligne (table des communes, "
+                         "déduite des cinémas déjà géocodés sans base La Poste)")
+parser.add_argument("--debit", type=float, help="Requêtes par seconde autorisées (par défaut : celui du géocodeur)")
+parser.add_argument("--url", help="URL de l'instance Nominatim auto-hébergée")
+parser.add_argument("--workers", type=int, default=NB_WORKERS, help="Nombre de cinémas géocodés en parallèle")
+parser.add_argument("--local-d-abord", action="store_true",
+                    help="Résout d'abord hors ligne (code postal + commune, précision à la commune) et n'interroge le géocodeur que pour le reste ; "
+                         "sans base La Poste, la table des communes reprend les positions des cinémas déjà géocodés")
+parser.add_argument("--incremental", action="store_true",
+                    help=f"Reprend les coordonnées de '{grouped_filename}' et ne géocode que les adresses nouvelles ou modifiées ; rapport dans '{rapport_filename}'")
+parser.add_argument("--compact", action="store_true",
+                    help="Écrit les fichiers géocodé et regroupé en JSON compact (un cinéma par ligne, orjson si installé)")
+args = parser.parse_args()
+indentation = None if args.compact else 4
+
 # --- Chargement des données d'entrée ---
 try:
     print(f"Chargement du fichier d'entrée : {input_filename}")
-    with open(input_filename, "r", encoding="utf-8") as f:
-        salles_data = json.load(f)
-    print(f"Trouvé {len(salles_data)} salles dans le fichier.")
-    
-    # Identifier les cinémas uniques pour le géocodage
-    cinemas_uniques = identifier_cinemas_uniques(salles_data)
+    # Identifier les cinémas uniques pour le géocodage (lecture en flux : une salle à la fois en mémoire)
+    cinemas_uniques = identifier_cinemas_uniques(iterer_elements(input_filename))
     print(f"Identifié {len(cinemas_uniques)} cinémas uniques à géocoder.")
+
+    # Mode incrémental : coordonnées reprises du fichier groupé précédent (même cinéma + adresse, ou même adresse)
+    groupes_precedents = charger_groupes(grouped_filename) if args.incremental else []
+    if args.incremental:
+        reportes = appliquer_coordonnees_connues(cinemas_uniques, groupes_precedents)
+        print(f"Incrémental : {reportes} cinémas repris de '{grouped_filename}', {len(cinemas_uniques) - reportes} à géocoder.")
     
 except FileNotFoundError:
     print(f"ERREUR : Le fichier '{input_filename}' est introuvable.")
@@ -147,22 +181,58 @@ except json.JSONDecodeError:
     exit(1)
 
 # --- Initialisation du géocodeur ---
-geolocator = Nominatim(user_agent=GEOCODER_USER_AGENT, timeout=GEOCODER_TIMEOUT)
+geocodeur = creer_geocodeur(args.geocodeur, GEOCODER_USER_AGENT, GEOCODER_TIMEOUT, debit=args.debit, url=args.url)
+# Cache SQLite partagé : une adresse déjà vue (trouvée ou non) ne repart pas sur le réseau
+cache_geocodage = CacheGeocodage()
+# Résolveur local : premier niveau avec --local-d-abord, et repli pour les adresses introuvables
+try:
+    table_communes = TableCommunes.charger()
+except (OSError, ValueError, KeyError):
+    table_communes = None
+# Contrôle de plausibilité : une réponse hors du département de l'adresse passe à l'étape suivante de la cascade
+groupes_reference = groupes_precedents or charger_groupes(grouped_filename)
+reference_departements = ReferenceDepartements.depuis_cinemas(groupes_reference) if groupes_reference else None
+print(f"Géocodeur : {geocodeur.nom} ({geocodeur.limiteur.debit or 'sans limite'} req/s, {args.workers} en parallèle)")
+
+# --- Journal de reprise ---
+journal = JournalGeocodage(journal_filename)
+if args.resume:
+    deja_traites = journal.charger()
+    print(f"Reprise : {sum(1 for e in deja_traites.values() if e.get('lat') is not None)} cinémas déjà géocodés dans '{journal_filename}'.")
+else:
+    deja_traites = {}
+    journal.reinitialiser()
 
 # --- Géocodage ---
 cinemas_geocoded = []
 failed_addresses = []
 
+def enregistrer(cinema, echec=None):
+    # Résultat conservé en mémoire et écrit immédiatement dans le journal de reprise
+    cinemas_geocoded.append(cinema)
+    if echec is not None:
+        failed_addresses.append(echec)
+    journal.ajouter(cinema, erreur=echec.get("erreur", "non trouvé") if echec is not None else None)
+
 print("\nDébut du géocodage...")
 
+a_geocoder = {}
 for index, cinema in enumerate(cinemas_uniques):
     cinema_name = cinema.get('cinema', f'Cinéma #{index+1}')
     adresse_brute = cinema.get('adresse')
 
+    # Skip si déjà géocodé lors d'une exécution précédente (--resume)
+    entree = deja_traites.get(JournalGeocodage.cle(cinema))
+    if entree and entree.get("lat") is not None:
+        cinema['lat'], cinema['lon'] = entree['lat'], entree['lon']
+        cinemas_geocoded.append(cinema)
+        continue
+
     # Skip si coordonnées déjà présentes
     if 'lat' in cinema and 'lon' in cinema and isinstance(cinema['lat'], (int, float)) and isinstance(cinema['lon'], (int, float)):
-        print(f"({index+1}/{len(cinemas_uniques)}) Ignoré (déjà géocodé) : '{cinema_name}'")
-        cinemas_geocoded.append(cinema)
+        if not args.incremental:
+            print(f"({index+1}/{len(cinemas_uniques)}) Ignoré (déjà géocodé) : '{cinema_name}'")
+        enregistrer(cinema)
         continue
 
     # Nettoie l'adresse
@@ -172,78 +242,56 @@ for index, cinema in enumerate(cinemas_uniques):
         print(f"({index+1}/{len(cinemas_uniques)}) Ignoré (adresse vide ou invalide après nettoyage) : '{cinema_name}'")
         cinema['lat'] = None
         cinema['lon'] = None
-        cinemas_geocoded.append(cinema)
-        failed_addresses.append({"cinema": cinema_name, "adresse": adresse_brute})
+        enregistrer(cinema, {"cinema": cinema_name, "adresse": adresse_brute})
         continue
 
-    # Essayer d'abord avec le nom du cinéma dans la requête pour plus de précision
-    adresse_query = f"{cinema_name}, {adresse}"  
-    print(f"({index+1}/{len(cinemas_uniques)}) Géocodage : '{cinema_name}' -> '{adresse_query}'")
+    if args.local_d_abord and table_communes is not None:
+        coords, precision = table_communes.resoudre_adresse(adresse_brute)
+        if coords:
+            cinema['lat'], cinema['lon'] = coords
+            enregistrer(cinema)
+            print(f"({index+1}/{len(cinemas_uniques)}) Résolu hors ligne ({precision}) : '{cinema_name}'")
+            continue
 
-    retries = 0
-    location = None
-    
-    while retries < MAX_RETRIES and not location:
-        try:
-            # Premier essai avec le nom du cinéma inclus
-            location = geolocator.geocode(adresse_query)
-            
-            # Si ça échoue, essayer sans le nom du cinéma
-            if not location and retries == 0:
-                print(f"  -> Tentative sans le nom du cinéma")
-                adresse_query = adresse
-                location = geolocator.geocode(adresse_query)
-            
-            # Si toujours pas de résultat et qu'on a un code postal, essayer juste avec ville et code postal
-            if not location and retries == 1:
-                code_postal = re.search(r"\d{5}", adresse)
-                if code_postal:
-                    cp = code_postal.group(0)
-                    ville_match = re.search(rf"{cp}\s+([^,]+)", adresse)
-                    if ville_match:
-                        ville = ville_match.group(1)
-                        adresse_query = f"{ville}, {cp}, France"
-                        print(f"  -> Tentative simplifiée : '{adresse_query}'")
-                        location = geolocator.geocode(adresse_query)
-            
-            if location:
-                cinema['lat'] = location.latitude
-                cinema['lon'] = location.longitude
-                cinemas_geocoded.append(cinema)
-                print(f"  -> OK : ({location.latitude:.5f}, {location.longitude:.5f})")
-                break
-            else:
-                retries += 1
-                if retries >= MAX_RETRIES:
-                    cinema['lat'] = None
-                    cinema['lon'] = None
-                    cinemas_geocoded.append(cinema)
-                    failed_addresses.append({"cinema": cinema_name, "adresse": adresse_brute})
-                    print("  -> ÉCHEC : Adresse non trouvée après plusieurs tentatives.")
-                else:
-                    print(f"  -> Tentative {retries}/{MAX_RETRIES} échouée, nouvel essai...")
-                    time.sleep(SLEEP_BETWEEN_REQUESTS)
-                
-        except (GeocoderTimedOut, GeocoderUnavailable) as e:
-            retries += 1
-            print(f"  -> ERREUR (timeout/service) : {e} - tentative {retries}/{MAX_RETRIES}")
-            time.sleep(SLEEP_AFTER_ERROR)
-        except Exception as e:
-            retries += 1
-            print(f"  -> ERREUR inattendue : {e} - tentative {retries}/{MAX_RETRIES}")
-            if retries >= MAX_RETRIES:
-                cinema['lat'] = None
-                cinema['lon'] = None
-                cinemas_geocoded.append(cinema)
-                failed_addresses.append({"cinema": cinema_name, "adresse": adresse_brute, "erreur": str(e)})
-            time.sleep(SLEEP_BETWEEN_REQUESTS)
-    
-    time.sleep(SLEEP_BETWEEN_REQUESTS)  # Pause entre chaque requête
+    # Cascade : nom du cinéma + adresse, puis adresse seule, puis ville + code postal
+    a_geocoder[index] = etapes_cascade(cinema_name, adresse)
+
+print(f"{len(a_geocoder)} cinémas à interroger.")
+valider = None
+if reference_departements is not None:
+    valider = lambda index, coords: reference_departements.plausible(cinemas_uniques[index].get('adresse'), coords)
+resultats = geocoder_en_parallele(a_geocoder.items(), geocodeur, cache_geocodage, args.workers,
+                                  pause_apres_erreur=SLEEP_AFTER_ERROR, valider=valider)
+for traites, (index, coords, etape, erreur) in enumerate(resultats, start=1):
+    cinema = cinemas_uniques[index]
+    cinema_name = cinema.get('cinema', f'Cinéma #{index+1}')
+    if not coords and not erreur and table_communes is not None:
+        # Introuvable en ligne (pas une panne) : centre de la commune ou du code postal
+        coords, precision = table_communes.resoudre_adresse(cinema.get('adresse'))
+        etape = f"hors ligne, {precision}"
+        if coords and valider is not None and not valider(index, coords):
+            coords = None  # La table des communes est construite sur les coordonnées existantes : elle peut reproduire une erreur
+    if coords:
+        cinema['lat'], cinema['lon'] = coords
+        enregistrer(cinema)
+        print(f"({traites}/{len(a_geocoder)}) OK [{etape}] : '{cinema_name}' ({cinema['lat']:.5f}, {cinema['lon']:.5f})")
+    else:
+        cinema['lat'] = None
+        cinema['lon'] = None
+        echec = {"cinema": cinema_name, "adresse": cinema.get('adresse')}
+        if erreur:
+            # Service indisponible à chaque tentative : à retenter avec --resume
+            echec["erreur"] = erreur
+        enregistrer(cinema, echec)
+        print(f"({traites}/{len(a_geocoder)}) ÉCHEC : '{cinema_name}' -> {erreur or 'adresse non trouvée'}")
+
+# Les résultats arrivent dans l'ordre de fin des requêtes : on restitue l'ordre du fichier d'entrée
+ordre_entree = {id(cinema): index for index, cinema in enumerate(cinemas_uniques)}
+cinemas_geocoded.sort(key=lambda cinema: ordre_entree[id(cinema)])
 
 # --- Sauvegarde du fichier géocodé ---
 try:
-    with open(geocoded_filename, "w", encoding="utf-8") as f:
-        json.dump(cinemas_geocoded, f, indent=4, ensure_ascii=False)
+    ecrire_elements(geocoded_filename, cinemas_geocoded, indent=indentation)
     print(f"\n✅ Fichier géocodé sauvegardé : {geocoded_filename}")
 except Exception as e:
     print(f"ERREUR : Impossible de sauvegarder '{geocoded_filename}' : {e}")
@@ -261,12 +309,19 @@ else:
 print("\nDébut du regroupement des cinémas...")
 
 # Regrouper les cinémas en utilisant les données originales et les coordonnées géocodées
-cinemas_grouped = regrouper_cinemas(cinemas_geocoded, salles_data)
+cinemas_grouped = regrouper_cinemas(cinemas_geocoded, iterer_elements(input_filename))
+
+if args.incremental:
+    # Seuls les groupes touchés remplacent ceux du fichier précédent ; le rapport liste les différences
+    rapport = comparer_groupes(groupes_precedents, cinemas_grouped)
+    cinemas_grouped = fusionner_groupes(groupes_precedents, cinemas_grouped)
+    with open(rapport_filename, "w", encoding="utf-8") as f:
+        json.dump(rapport, f, indent=4, ensure_ascii=False)
+    print(f"Modifications : {resumer_rapport(rapport)}. Détail : {rapport_filename}")
 
 # Sauvegarde du fichier regroupé
 try:
-    with open(grouped_filename, "w", encoding="utf-8") as f:
-        json.dump(cinemas_grouped, f, indent=4, ensure_ascii=False)
+    ecrire_elements(grouped_filename, cinemas_grouped, indent=indentation)
     print(f"✅ Cinémas regroupés enregistrés dans : {grouped_filename}")
 except Exception as e:
     print(f"ERREUR : Impossible de sauvegarder '{grouped_filename}' : {e}")
@@ -275,4 +330,8 @@ except Exception as e:
 print("\nTraitement terminé avec succès.")
 print(f"- {len(cinemas_geocoded)} cinémas uniques géocodés")
 print(f"- {len(failed_addresses)} adresses en échec")
-print(f"- {len(cinemas_grouped)} cinémas regroupés contenant {sum(len(c['salles']) for c in cinemas_grouped)} salles au total")
\ No newline at end of file
+print(f"- {len(cinemas_grouped)} cinémas regroupés contenant {sum(len(c['salles']) for c in cinemas_grouped)} salles au total")
+suspects = [s for s in evaluer(cinemas_grouped) if s["score"] >= SEUIL_PAR_DEFAUT]
+if suspects:
+    print(f"- {len(suspects)} coordonnées suspectes (hors département, partagées...) : "
+          f"python ../controle_geocodes.py {grouped_filename} --invalider, puis relancer avec --incremental")
\ No newline at end of file
@@ -1,42 +1,56 @@
 from playwright.sync_api import sync_playwright
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+import argparse
+import asyncio
 import json
 import re
 import time
 from datetime import datetime
 import traceback
+from film_sections import clean_large_text_block, film_info_from_sections, split_sections
+from catalogue_sync import build_delta, film_key, latest_export, load_previous_export, merge_export, plan_sync, row_fingerprint
 
 login_url = "https://otto-bo.vodfactory.com/"
 catalogue_url = "https://otto-bo.vodfactory.com/catalogue"
+base_url = "https://otto-bo.vodfactory.com"
+
+NB_PAGES = 6             # Fiches film ouvertes en parallèle (même session)
+DETAIL_TIMEOUT = 15000   # ms : attente maximale du contenu d'une fiche
+# La fiche est prête quand ses valeurs sont rendues, pas seulement les libellés du gabarit
+# (remplace networkidle + time.sleep(2)) : synopsis non vide ou date de sortie renseignée
+JS_FILM_READY = """() => {
+    const date = document.querySelector('input[name="date"]');
+    return (document.body && /Synopsis\\s*:[ \\t]*\\S/.test(document.body.innerText)) || !!(date && date.value);
+}"""
+# Tout ce qu'on lit sur une fiche, en un seul aller-retour navigateur
+JS_FILM_PAGE = """() => ({
+    text: document.body.innerText,
+    annee: (document.querySelector('input[name="date"]') || {getAttribute: () => ''}).getAttribute('value') || '',
+    participants: Array.from(document.querySelectorAll('.movie-participants-item'), b => [
+        (b.querySelector('h4.participant-name') || {}).innerText || '',
+        (b.querySelector('p.participant-role') || {}).innerText || ''
+    ])
+})"""
 
 def log(msg):
     print(f"[LOG] {msg}")
 
-def clean_large_text_block(raw_text):
-    noisy_headers = [
-        "CATALOGUE", "MARKETING", "STATISTIQUES", "PARAMÈTRES", "Page d'accueil",
-        "Toutes mes fiches", "Mettre en ligne", "Enregistrer les modifications",
-        "Sélectionner", "Ajouter un participant", "Supprimer la fiche"
-    ]
-    for header in noisy_headers:
-        raw_text = raw_text.replace(header, "")
-    lines = raw_text.splitlines()
-    cleaned_lines = [line.strip() for line in lines if line.strip() and not line.strip().isdigit()]
-    return "\n".join(cleaned_lines)
-
-def extract_from_raw_text(raw_text, label, end_labels=[]):
-    if end_labels:
-        end_patterns = "|".join([re.escape(end) for end in end_labels])
-        pattern = re.compile(re.escape(label) + r"\s*:\s*(.*?)(?=\n(?:{}))".format(end_patterns), re.DOTALL)
-    else:
-        pattern = re.compile(re.escape(label) + r"\s*:\s*(.*?)\n", re.DOTALL)
-    match = pattern.search(raw_text)
-    if match:
-        text = match.group(1).strip()
-        text = re.sub(r"\s{2,}", " ", text)
-        return text
-    return ""
-
 def main():
+    parser = argparse.ArgumentParser(description="Export du catalogue Otto (VOD Factory) en JSON.")
+    parser.add_argument("--incremental", nargs="?", const="auto", metavar="EXPORT",
+                        help="Ne revisite que les films nouveaux ou modifiés depuis EXPORT (par défaut : le dernier otto_catalogue_export_*.json)")
+    parser.add_argument("--pages", type=int, default=NB_PAGES, help="Fiches film ouvertes en parallèle")
+    args = parser.parse_args()
+
+    previous = {}
+    if args.incremental:
+        previous_path = latest_export() if args.incremental == "auto" else args.incremental
+        if previous_path:
+            previous = load_previous_export(previous_path)
+            log(f"Export précédent : {previous_path} ({len(previous)} films identifiés)")
+        if not previous:
+            log("Aucun export précédent avec ID ou lien des films : synchronisation complète")
+
     with sync_playwright() as p:
         log("Lancement de Playwright...")
         browser = p.chromium.launch(headless=False)
@@ -54,16 +68,28 @@ def main():
         time.sleep(3)
 
         films = extract_catalogue_data(page)
-        if not films:
-            log("Aucun film trouvé dans le catalogue.")
-            browser.close()
-            return
+        # La session connectée est transmise aux pages parallèles de collect_film_details
+        storage_state = context.storage_state()
+        browser.close()
 
-        films_details = collect_film_details(page, films)
-        export_to_json(films_details)
+    if not films:
+        log("Aucun film trouvé dans le catalogue.")
+        return
 
-        log(f"Extraction terminée : {len(films_details)} films exportés")
-        browser.close()
+    to_fetch, reused = plan_sync(films, previous)
+    log(f"{len(reused)} films inchangés repris, {len(to_fetch)} fiches à visiter")
+    fetched = {film_key(detail): detail for detail in collect_film_details(storage_state, to_fetch, args.pages)}
+    films_details = merge_export(films, fetched, previous)
+
+    now = datetime.now().strftime("%Y%m%d_%H%M")
+    export_to_json(films_details, now)
+    if args.incremental:
+        delta = build_delta(previous, films_details)
+        export_delta(delta, now)
+        log(f"Delta : {len(delta['ajoutes'])} ajoutés, {len(delta['modifies'])} modifiés, "
+            f"{len(delta['supprimes'])} supprimés, {delta['inchanges']} inchangés")
+
+    log(f"Extraction terminée : {len(films_details)} films exportés")
 
 def extract_catalogue_data(page):
     log("Récupération de la liste des films sur toutes les pages...")
@@ -110,7 +136,9 @@ def extract_catalogue_data(page):
                 
                 # Si nous avons les informations nécessaires et que ce n'est pas un doublon par URL
                 if title and href and href not in hrefs_seen:
-                    all_films.append({"title": title, "href": href, "id": film_id})
+                    # Cellules de la ligne : leur changement déclenche la revisite de la fiche (--incremental)
+                    row = element.evaluate("r => Array.from(r.querySelectorAll('td'), td => td.innerText.trim())")
+                    all_films.append({"title": title, "href": href, "id": film_id, "row": row})
                     hrefs_seen.add(href)
                     new_films_on_page += 1
             except Exception as e:
@@ -170,72 +198,78 @@ def extract_catalogue_data(page):
     log(f"Fin de la récupération : {len(all_films)} films trouvés au total.")
     return all_films
 
-def collect_film_details(page, films):
-    films_details = []
-    for index, film in enumerate(films, 1):
-        log(f"{index}/{len(films)} - {film['title']}")
-        if not film["href"]:
-            continue
+def film_url(href):
+    if href.startswith("http"):
+        return href
+    return f"{base_url}{href if href.startswith('/') else '/' + href}"
 
-        film_url = film["href"]
-        if not film_url.startswith("http"):
-            film_url = f"https://otto-bo.vodfactory.com{film_url if film_url.startswith('/') else '/' + film_url}"
+def collect_film_details(storage_state, films, nb_pages=NB_PAGES, headless=False):
+    """
+    Ouvre les fiches avec nb_pages pages en parallèle dans un contexte qui reprend la session connectée.
+    Les films sont rendus dans l'ordre du catalogue ; une fiche en erreur est ignorée.
+    """
+    if not films:
+        return []
+    return asyncio.run(_collect_film_details(storage_state, films, nb_pages, headless))
 
-        try:
-            page.goto(film_url)
-            page.wait_for_load_state("networkidle")
-            time.sleep(2)
-            film_detail = extract_film_info(page, film)
-            films_details.append(film_detail)
-        except Exception as e:
-            log(f"Erreur accès fiche : {e}")
-    return films_details
-
-def extract_film_info(page, film_base):
-    film_info = {"titre": film_base["title"].strip()}
-    raw_text = page.inner_text("body")
-    clean_text = clean_large_text_block(raw_text)
-    film_info["notre_avis"] = re.sub(r"\d{1,4}/5000$", "", extract_from_raw_text(clean_text, "Notre avis", ["Titre L'auteur", "Comédiens/Comédiennes"])).strip()
-    film_info["synopsis"] = extract_from_raw_text(clean_text, "Synopsis", ["Comédiens/Comédiennes", "Cinéastes"]).replace("Synopsis\nSynopsis :", "").strip()
-    film_info["durée"] = extract_from_raw_text(clean_text, "Durée").replace("Durée de ma vidéo ", "").strip()
-    genre_raw = extract_from_raw_text(clean_text, "Genre", ["Type", "Catégories"])
-    film_info["genre"] = re.sub(r"^Type\s*:\s*", "", genre_raw).split("\n")[0].strip()
-    film_info["type"] = extract_from_raw_text(clean_text, "Type", ["Date"])
-    film_info["pays"] = extract_from_raw_text(clean_text, "Pays", ["Lien vers films"])
-    film_info["csa"] = extract_from_raw_text(clean_text, "CSA", ["Version"])
-    film_info["version"] = extract_from_raw_text(clean_text, "Version", ["Pays"])
-    try:
-        date_input = page.query_selector('input[name="date"]')
-        film_info["année"] = date_input.get_attribute("value").strip() if date_input else ""
-    except:
-        film_info["année"] = ""
+async def _collect_film_details(storage_state, films, nb_pages, headless):
+    films = [film for film in films if film["href"]]
+    details = [None] * len(films)
+    queue = asyncio.Queue()
+    for index, film in enumerate(films):
+        queue.put_nowait((index, film))
+    done = 0
 
-    comediens = extract_from_raw_text(clean_text, "Comédiens/Comédiennes", ["Titre A la sortie...", "Titre Sa sélection"])
-    if "Titre A la sortie" in comediens or "Texte A la sortie" in comediens:
-        comediens = ""
-    film_info["comédiens"] = comediens
+    async def worker(context):
+        nonlocal done
+        page = await context.new_page()
+        while not queue.empty():
+            index, film = queue.get_nowait()
+            try:
+                details[index] = await read_film_page(page, film)
+            except Exception as e:
+                log(f"Erreur accès fiche {film['title']} : {e}")
+            done += 1
+            log(f"{done}/{len(films)} - {film['title']}")
+        await page.close()
 
-    try:
-        cineastes_blocks = page.query_selector_all(".movie-participants-item")
-        cineastes = []
-        for block in cineastes_blocks:
-            name_el = block.query_selector("h4.participant-name")
-            role_el = block.query_selector("p.participant-role")
-            if name_el and role_el and "Réalisateur" in role_el.inner_text():
-                cineastes.append(name_el.inner_text().strip())
-        film_info["réalisateur"] = ", ".join(cineastes)
-    except:
-        film_info["réalisateur"] = ""
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=headless)
+        context = await browser.new_context(storage_state=storage_state)
+        await asyncio.gather(*(worker(context) for _ in range(max(1, nb_pages))))
+        await browser.close()
+    return [detail for detail in details if detail is not None]
 
+async def read_film_page(page, film):
+    await page.goto(film_url(film["href"]))
+    try:
+        await page.wait_for_function(JS_FILM_READY, timeout=DETAIL_TIMEOUT)
+    except PlaywrightTimeoutError:
+        # Fiche en échec : l'export incrémental garde la version précédente au lieu d'une fiche vide
+        raise RuntimeError(f"fiche non chargée en {DETAIL_TIMEOUT // 1000} s (ni synopsis ni date affichés)")
+    contenu = await page.evaluate(JS_FILM_PAGE)
+    film_info = extract_film_info(contenu, film)
+    # Rattachement à la ligne du catalogue pour la synchronisation incrémentale
+    film_info.update({"id": film["id"], "href": film["href"], "empreinte_liste": row_fingerprint(film)})
     return film_info
 
-def export_to_json(films_details):
+def extract_film_info(contenu, film_base):
+    """contenu : {"text", "annee", "participants"} lu par JS_FILM_PAGE."""
+    sections = split_sections(clean_large_text_block(contenu["text"]))
+    return film_info_from_sections(sections, film_base["title"], contenu["annee"], contenu["participants"])
+
+def export_to_json(films_details, now):
     log("Génération du fichier JSON...")
-    now = datetime.now().strftime("%Y%m%d_%H%M")
     filename = f"otto_catalogue_export_{now}.json"
     with open(filename, "w", encoding="utf-8") as f:
         json.dump(films_details, f, ensure_ascii=False, indent=2)
     log(f"Fichier JSON généré : {filename}")
 
+def export_delta(delta, now):
+    filename = f"otto_catalogue_delta_{now}.json"
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump(delta, f, ensure_ascii=False, indent=2)
+    log(f"Fichier delta généré : {filename}")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
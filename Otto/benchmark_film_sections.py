@@ -0,0 +1,47 @@
+# --- benchmark_film_sections.py ---
+# Coût d'analyse d'une fiche film : découpage en un passage (split_sections) contre une recherche par rubrique
+# Usage : python benchmark_film_sections.py [repetitions]
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import time
+from film_sections import SECTIONS, clean_large_text_block, extract_from_raw_text, split_sections
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def extraction_par_rubrique(texte):
+    """Référence : extract_film_info avant découpage, un parcours du texte par rubrique."""
+    return {label: extract_from_raw_text(texte, label, ends) for label, ends in SECTIONS.items()}
+
+
+def mesurer(fonction, textes, repetitions):
+    debut = time.perf_counter()
+    for _ in range(repetitions):
+        for texte in textes:
+            fonction(texte)
+    return (time.perf_counter() - debut) / (repetitions * len(textes)) * 1e6
+
+
+def main():
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    bruts = []
+    for nom in sorted(os.listdir(FIXTURES)):
+        if nom.endswith(".txt"):
+            with open(os.path.join(FIXTURES, nom), encoding="utf-8") as f:
+                bruts.append(f.read())
+    textes = [clean_large_text_block(brut) for brut in bruts]
+    for texte in textes:
+        assert split_sections(texte) == extraction_par_rubrique(texte)
+
+    print(f"{len(textes)} fiches du corpus, {repetitions} répétitions")
+    print(f"  nettoyage du texte          : {mesurer(clean_large_text_block, bruts, repetitions):8.1f} µs / fiche")
+    ancien = mesurer(extraction_par_rubrique, textes, repetitions)
+    nouveau = mesurer(split_sections, textes, repetitions)
+    print(f"  une recherche par rubrique  : {ancien:8.1f} µs / fiche")
+    print(f"  découpage en un passage     : {nouveau:8.1f} µs / fiche  (x{ancien / nouveau:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# --- catalogue_sync.py ---
+# Synchronisation incrémentale du catalogue Otto : seules les fiches nouvelles ou modifiées sont revisitées
+# -*- coding: utf-8 -*-
+
+import glob
+import hashlib
+import json
+import os
+
+EXPORT_PATTERN = "otto_catalogue_export_*.json"
+
+
+def film_key(film):
+    """Identifiant stable d'un film : ID du catalogue, sinon lien de la fiche."""
+    return film.get("id") or film.get("href")
+
+
+def row_fingerprint(film):
+    """Empreinte de la ligne du catalogue (titre, lien et cellules affichées)."""
+    row = [film.get("title", ""), film.get("href", "")] + list(film.get("row", []))
+    return hashlib.sha1(json.dumps(row, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def latest_export(directory="."):
+    """Export le plus récent du dossier (nom horodaté), None s'il n'y en a pas."""
+    exports = sorted(glob.glob(os.path.join(directory, EXPORT_PATTERN)))
+    return exports[-1] if exports else None
+
+
+def load_previous_export(path):
+    """Fiches de l'export précédent indexées par film_key (les exports sans ID ni lien sont ignorés)."""
+    with open(path, "r", encoding="utf-8") as f:
+        details = json.load(f)
+    return {film_key(detail): detail for detail in details if film_key(detail)}
+
+
+def plan_sync(films, previous):
+    """
+    Répartit la liste du catalogue : (à revisiter, fiches reprises telles quelles).
+    Un film est revisité s'il est nouveau ou si sa ligne du catalogue a changé.
+    """
+    to_fetch, reused = [], {}
+    for film in films:
+        key = film_key(film)
+        detail = previous.get(key)
+        if detail is not None and detail.get("empreinte_liste") == row_fingerprint(film):
+            reused[key] = detail
+        else:
+            to_fetch.append(film)
+    return to_fetch, reused
+
+
+def merge_export(films, fetched, previous):
+    """
+    Export complet dans l'ordre du catalogue : fiche revisitée, sinon celle de l'export précédent
+    (fiche inchangée, ou revisite en échec : on garde la dernière version connue).
+    """
+    merged = []
+    for film in films:
+        key = film_key(film)
+        detail = fetched.get(key) or previous.get(key)
+        if detail is not None:
+            merged.append(detail)
+    return merged
+
+
+def build_delta(previous, merged):
+    """
+    Différences avec l'export précédent : films ajoutés, modifiés (avec les champs changés)
+    et supprimés du catalogue, nombre de films inchangés.
+    """
+    current = {film_key(detail): detail for detail in merged}
+    added = [detail for key, detail in current.items() if key not in previous]
+    removed = [detail for key, detail in previous.items() if key not in current]
+    modified, unchanged = [], 0
+    for key, detail in current.items():
+        before = previous.get(key)
+        if before is None:
+            continue
+        fields = sorted(field for field in set(before) | set(detail)
+                        if field != "empreinte_liste" and before.get(field) != detail.get(field))
+        if fields:
+            modified.append({"film": detail, "champs_modifies": fields})
+        else:
+            unchanged += 1
+    return {"ajoutes": added, "modifies": modified, "supprimes": removed, "inchanges": unchanged}
@@ -0,0 +1,129 @@
+# --- film_sections.py ---
+# Découpage en un seul passage du texte d'une fiche film Otto en rubriques (label -> valeur)
+# -*- coding: utf-8 -*-
+
+import re
+
+NOISY_HEADERS = [
+    "CATALOGUE", "MARKETING", "STATISTIQUES", "PARAMÈTRES", "Page d'accueil",
+    "Toutes mes fiches", "Mettre en ligne", "Enregistrer les modifications",
+    "Sélectionner", "Ajouter un participant", "Supprimer la fiche"
+]
+# Rubrique -> labels qui la terminent en début de ligne (aucun : la valeur s'arrête à la fin de la ligne)
+SECTIONS = {
+    "Notre avis": ["Titre L'auteur", "Comédiens/Comédiennes"],
+    "Synopsis": ["Comédiens/Comédiennes", "Cinéastes"],
+    "Durée": [],
+    "Genre": ["Type", "Catégories"],
+    "Type": ["Date"],
+    "Pays": ["Lien vers films"],
+    "CSA": ["Version"],
+    "Version": ["Pays"],
+    "Comédiens/Comédiennes": ["Titre A la sortie...", "Titre Sa sélection"],
+}
+END_LABELS = sorted({end for ends in SECTIONS.values() for end in ends})
+
+_NOISY = re.compile("|".join(re.escape(header) for header in NOISY_HEADERS))
+# Un seul motif pour tout le texte : début d'une rubrique ("Label :") ou ligne commençant par un label de fin.
+# Aucun label de fin n'est le préfixe d'un autre : au plus un label de fin par début de ligne.
+# Le premier lookahead écarte d'un coup les positions qui ne peuvent commencer aucun des deux.
+_TOKENS = re.compile(
+    r"(?=[{}\n])(?:(?P<label>{})\s*:|\n(?=(?P<end>{})))".format(
+        re.escape("".join(sorted({label[0] for label in SECTIONS}))),
+        "|".join(re.escape(label) for label in sorted(SECTIONS, key=len, reverse=True)),
+        "|".join(re.escape(end) for end in sorted(END_LABELS, key=len, reverse=True)),
+    )
+)
+_SPACES = re.compile(r"\s*")
+_MULTI_SPACES = re.compile(r"\s{2,}")
+_DOUBLE_SPACE = re.compile(r"\s\s")  # Même présence que _MULTI_SPACES, recherche plus rapide
+
+
+def clean_large_text_block(raw_text):
+    """Retire les en-têtes de navigation, les lignes vides et les lignes purement numériques."""
+    raw_text = _NOISY.sub("", raw_text)
+    return "\n".join(line for line in (line.strip() for line in raw_text.splitlines()) if line and not line.isdigit())
+
+
+def split_sections(clean_text):
+    """
+    Parcourt le texte une seule fois et retourne {label: valeur} pour chaque rubrique de SECTIONS.
+    Même résultat que extract_from_raw_text(clean_text, label, SECTIONS[label]) pour chaque label :
+    première occurrence de "Label :", valeur jusqu'à la première ligne qui commence par un de ses
+    labels de fin (ou jusqu'à la fin de ligne), "" si la rubrique n'est jamais terminée.
+    """
+    starts = {}      # label -> début de la valeur (première occurrence)
+    pending = {}     # label de fin attendu -> labels ouverts qu'il terminerait
+    values = {}
+    for match in _TOKENS.finditer(clean_text):
+        label = match.group("label")
+        if label is not None:
+            if label in starts:
+                continue
+            start = _SPACES.match(clean_text, match.end()).end()
+            starts[label] = start
+            ends = SECTIONS[label]
+            if not ends:
+                stop = clean_text.find("\n", start)
+                values[label] = clean_text[start:stop] if stop >= 0 else None
+            for end in ends:
+                pending.setdefault(end, []).append(label)
+            continue
+        end, position = match.group("end"), match.start()
+        if end not in pending:
+            continue
+        still_open = []
+        for opened in pending[end]:
+            if opened in values:
+                continue
+            if starts[opened] <= position:
+                values[opened] = clean_text[starts[opened]:position]
+            else:
+                still_open.append(opened)  # Fin située dans les espaces qui suivent "Label :"
+        pending[end] = still_open
+    # Une seule recherche d'espaces multiples sur la page plutôt qu'une substitution par valeur
+    collapse = _DOUBLE_SPACE.search(clean_text) is not None
+    sections = {}
+    for label in SECTIONS:
+        value = values.get(label)
+        value = value.strip() if value else ""
+        sections[label] = _MULTI_SPACES.sub(" ", value) if collapse else value
+    return sections
+
+
+def extract_from_raw_text(raw_text, label, end_labels=[]):
+    """Ancienne extraction, un parcours du texte par rubrique : référence des tests et du benchmark."""
+    if end_labels:
+        end_patterns = "|".join([re.escape(end) for end in end_labels])
+        pattern = re.compile(re.escape(label) + r"\s*:\s*(.*?)(?=\n(?:{}))".format(end_patterns), re.DOTALL)
+    else:
+        pattern = re.compile(re.escape(label) + r"\s*:\s*(.*?)\n", re.DOTALL)
+    match = pattern.search(raw_text)
+    if match:
+        text = match.group(1).strip()
+        text = re.sub(r"\s{2,}", " ", text)
+        return text
+    return ""
+
+
+def film_info_from_sections(sections, title, year, participants):
+    """Champs exportés d'une fiche à partir des rubriques, de l'année et des participants [(nom, rôle)]."""
+    film_info = {"titre": title.strip()}
+    film_info["notre_avis"] = re.sub(r"\d{1,4}/5000$", "", sections["Notre avis"]).strip()
+    film_info["synopsis"] = sections["Synopsis"].replace("Synopsis\nSynopsis :", "").strip()
+    film_info["durée"] = sections["Durée"].replace("Durée de ma vidéo ", "").strip()
+    film_info["genre"] = re.sub(r"^Type\s*:\s*", "", sections["Genre"]).split("\n")[0].strip()
+    film_info["type"] = sections["Type"]
+    film_info["pays"] = sections["Pays"]
+    film_info["csa"] = sections["CSA"]
+    film_info["version"] = sections["Version"]
+    film_info["année"] = year.strip()
+
+    comediens = sections["Comédiens/Comédiennes"]
+    if "Titre A la sortie" in comediens or "Texte A la sortie" in comediens:
+        comediens = ""
+    film_info["comédiens"] = comediens
+
+    film_info["réalisateur"] = ", ".join(name.strip() for name, role in participants
+                                        if name and "Réalisateur" in role)
+    return film_info
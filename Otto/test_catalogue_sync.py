@@ -0,0 +1,36 @@
+import json
+from catalogue_sync import build_delta, latest_export, load_previous_export, merge_export, plan_sync, row_fingerprint
+
+
+def fiche(film, **champs):
+    return dict({"titre": film["title"], "id": film["id"], "href": film["href"], "empreinte_liste": row_fingerprint(film)}, **champs)
+
+
+def test_synchronisation_incrementale(tmp_path):
+    a = {"title": "A", "href": "/catalogue/1", "id": "1", "row": ["A ID : 1", "En ligne"]}
+    b = {"title": "B", "href": "/catalogue/2", "id": "2", "row": ["B ID : 2", "En ligne"]}
+    c = {"title": "C", "href": "/catalogue/3", "id": "3", "row": ["C ID : 3", "En ligne"]}
+    ancien = tmp_path / "otto_catalogue_export_20250101_0000.json"
+    ancien.write_text(json.dumps([fiche(a, genre="Drame"), fiche(b, genre="Comédie"), fiche(c)]), encoding="utf-8")
+    (tmp_path / "otto_catalogue_delta_20250101_0000.json").write_text("{}", encoding="utf-8")
+    assert latest_export(str(tmp_path)) == str(ancien)
+    precedent = load_previous_export(str(ancien))
+
+    # B passe hors ligne (ligne modifiée), C disparaît, D est nouveau
+    b2 = dict(b, row=["B ID : 2", "Hors ligne"])
+    d = {"title": "D", "href": "/catalogue/4", "id": "4", "row": ["D ID : 4", "En ligne"]}
+    catalogue = [d, a, b2]
+    a_visiter, repris = plan_sync(catalogue, precedent)
+    assert [f["id"] for f in a_visiter] == ["4", "2"] and list(repris) == ["1"]
+
+    revisites = {"2": fiche(b2, genre="Drame"), "4": fiche(d)}
+    fusion = merge_export(catalogue, revisites, precedent)
+    assert [f["titre"] for f in fusion] == ["D", "A", "B"]
+    delta = build_delta(precedent, fusion)
+    assert [f["id"] for f in delta["ajoutes"]] == ["4"]
+    assert [f["id"] for f in delta["supprimes"]] == ["3"]
+    assert delta["modifies"] == [{"film": revisites["2"], "champs_modifies": ["genre"]}]
+    assert delta["inchanges"] == 1
+
+    # Revisite en échec : la dernière fiche connue est conservée
+    assert [f["genre"] for f in merge_export(catalogue, {}, precedent)] == ["Drame", "Comédie"]
@@ -0,0 +1,38 @@
+import json
+import os
+import pytest
+from film_sections import SECTIONS, clean_large_text_block, extract_from_raw_text, film_info_from_sections, split_sections
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+with open(os.path.join(FIXTURES, "attendu.json"), encoding="utf-8") as f:
+    ATTENDU = json.load(f)
+
+
+def lire_fiche(nom):
+    with open(os.path.join(FIXTURES, nom), encoding="utf-8") as f:
+        return clean_large_text_block(f.read())
+
+
+@pytest.mark.parametrize("nom", sorted(ATTENDU))
+def test_rubriques_du_corpus(nom):
+    texte = lire_fiche(nom)
+    assert split_sections(texte) == ATTENDU[nom]
+    # Même résultat que l'ancienne extraction, une recherche par rubrique
+    assert split_sections(texte) == {label: extract_from_raw_text(texte, label, ends) for label, ends in SECTIONS.items()}
+
+
+def test_cas_limites():
+    # Rubrique jamais terminée, label de fin dans les espaces qui suivent "Label :", valeur en dernière ligne
+    texte = "Genre :\nType : Court\nCatégories\nCSA : Tous publics\nDurée : 1h30"
+    sections = split_sections(texte)
+    assert sections["Genre"] == "Type : Court"
+    assert sections["Type"] == "" and sections["CSA"] == "" and sections["Durée"] == ""
+    assert sections == {label: extract_from_raw_text(texte, label, ends) for label, ends in SECTIONS.items()}
+
+
+def test_champs_exportes():
+    info = film_info_from_sections(split_sections(lire_fiche("film_05.txt")), " Titre ", " 2019 ",
+                                   [["Ann ", "Réalisateur, Scénariste"], ["Bob", "Monteur"], ["", "Réalisateur"]])
+    assert info["titre"] == "Titre" and info["année"] == "2019" and info["réalisateur"] == "Ann"
+    assert info["genre"] == ATTENDU["film_05.txt"]["Genre"].replace("Type : ", "").split("\n")[0]
+    assert info["comédiens"] == ""  # "Titre A la sortie..." : pas de comédiens renseignés
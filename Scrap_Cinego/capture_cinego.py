@@ -0,0 +1,40 @@
+# --- capture_cinego.py ---
+# Mode capture : lit les réponses JSON (XHR) que l'application Cinego charge déjà, au lieu du texte des pages
+# -*- coding: utf-8 -*-
+
+import re
+from moteur_cinego import DELAI_SELECTEUR, ouvrir
+from payloads_cinego import cinemas_depuis_liste, general_depuis_payload, salles_depuis_equipement
+
+# Adresses des appels d'API reconnus (expressions régulières sur l'URL de la réponse)
+MOTIFS_API = {
+    "liste": re.compile(r"/cinemas/?(\?|$)"),
+    "equipement": re.compile(r"/cinemas/[^/?#]+/(equipement|equipment|salles|screens)\b"),
+    "general": re.compile(r"/cinemas/[^/?#]+/(general|contacts?)\b"),
+}
+
+
+async def capturer(page, url: str, motif):
+    """Ouvre url et retourne le JSON de la première réponse XHR/fetch dont l'adresse correspond à motif."""
+    async with page.expect_response(
+            lambda r: r.request.resource_type in ("xhr", "fetch") and r.ok and motif.search(r.url),
+            timeout=DELAI_SELECTEUR) as reponse:
+        await ouvrir(page, url)
+    return await (await reponse.value).json()
+
+
+async def lister_cinemas_capture(page, url_liste: str) -> list:
+    """La liste complète arrive en une réponse : pas de défilement de la liste virtuelle."""
+    return cinemas_depuis_liste(await capturer(page, url_liste, MOTIFS_API["liste"]))
+
+
+async def extraire_cinema_capture(page, url_site: str, cinema: dict) -> list:
+    """Équivalent de moteur_cinego.extraire_cinema à partir des réponses JSON (mêmes lignes CSV)."""
+    url_fiche = f"{url_site}{cinema['href'].split('?')[0]}"
+    salles = salles_depuis_equipement(await capturer(page, f"{url_fiche}/equipement?view_id=1", MOTIFS_API["equipement"]))
+    if not salles:
+        return []
+    adresse, contact_nom, contact_mail, contact_tel = general_depuis_payload(
+        await capturer(page, f"{url_fiche}/general?view_id=1", MOTIFS_API["general"]))
+    return [[cinema["name"], adresse, salle, cnc, capacite, equipement, format_proj, contact_nom, contact_mail, contact_tel]
+            for salle, cnc, capacite, equipement, format_proj in salles]
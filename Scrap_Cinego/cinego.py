@@ -1,182 +1,131 @@
-from playwright.sync_api import sync_playwright
+from playwright.async_api import async_playwright
+import argparse
+import asyncio
 import csv
-import time
 import credentials
-import json
+import os
+import sys
 
-login_url = "https://distri.cinego.net"
-cinemas_url = "https://distri.cinego.net/#/cinemas/list?view_id=1"
+from moteur_cinego import NB_CONTEXTES, connecter, explorer, extraire_cinema, lister_cinemas, log
+from capture_cinego import extraire_cinema_capture, lister_cinemas_capture
+from etat_crawl import CHEMIN_ETAT_PAR_DEFAUT, FRAICHEUR, EtatCrawl
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Geocod"))
+from flux_json import ecrire_elements # Écriture en flux (même texte que json.dump)
+
+site_url = "https://distri.cinego.net"
+cinemas_path = "/#/cinemas/list?view_id=1"
 output_csv = "cinemas_export.csv"
 
-def log(msg):
-    print(f"[🧩] {msg}")
-
-with sync_playwright() as p:
-    log("Lancement de Playwright...")
-    browser = p.chromium.launch(headless=False)
-    context = browser.new_context()
-    page = context.new_page()
-
-    log("Connexion en cours...")
-    page.goto(login_url)
-    page.fill('input[placeholder="Nom d\'utilisateur"]', credentials.USERNAME)
-    page.fill('input[placeholder="Mot de passe"]', credentials.PASSWORD)
-    page.click("button:has-text('Se connecter')")
-    page.wait_for_load_state("networkidle")
-    time.sleep(2)
-
-    log("Navigation vers la liste des cinémas...")
-    page.goto(cinemas_url)
-    page.wait_for_load_state("networkidle")
-    time.sleep(3)
-
-    scroll_container = page.query_selector("cdk-virtual-scroll-viewport")
-    if not scroll_container:
-        raise Exception("Scroll container not found")
-
-    seen = set()
-    cinemas = []
-
-    log("🔽 Début du scroll pour récupérer tous les cinémas...")
-    previous_count = -1
-
-    while len(seen) != previous_count:
-        previous_count = len(seen)
-        links = page.query_selector_all("a.link-content")
-
-        for link in links:
-            name = link.inner_text().strip()
-            href = link.get_attribute("href")
-            if name and href and name not in seen:
-                seen.add(name)
-                cinemas.append({"name": name, "href": href})
-
-        page.evaluate("el => el.scrollBy(0, 600)", scroll_container)
-        time.sleep(0.6)
-
-    log(f"✅ Fin du scroll. {len(cinemas)} cinémas collectés.")
-    cinemas = sorted(cinemas, key=lambda c: c["href"])
-
-    data = []
-    for index, c in enumerate(cinemas, 1):
-        log(f"\n🎬 {index}/{len(cinemas)} - Traitement de : {c['name']}")
-        base_url = f"https://distri.cinego.net{c['href'].split('?')[0]}"
-
-        adresse = ""
-        contact_nom = ""
-        contact_mail = ""
-        contact_tel = ""
-
-        # ÉQUIPEMENT
-        salles = []
-        try:
-            page.goto(f"{base_url}/equipement?view_id=1")
-            page.wait_for_load_state("networkidle")
-            page.wait_for_selector("table", timeout=5000)
-            time.sleep(1.5)
-
-            salle_rows = page.query_selector_all("table tr")
-            if len(salle_rows) < 2:
-                log(f"⚠️ Pas de salles listées pour {c['name']}")
-                continue
-
-            for row in salle_rows[1:]:
-                cols = row.query_selector_all("td")
-                if len(cols) < 6:
-                    continue
-                try:
-                    salle = cols[0].inner_text().strip()
-                    cnc = cols[1].inner_text().strip()
-                    capacite = cols[2].inner_text().strip()
-                    equipement = cols[4].inner_text().strip()
-                    format_proj = cols[5].inner_text().strip()
-                    if not salle or not salle[0].isdigit():
-                        continue
-                    salles.append((salle, cnc, capacite, equipement, format_proj))
-                except Exception as e:
-                    log(f"⚠️ Erreur de parsing dans une salle ({c['name']}) : {e}")
-                    continue
-        except Exception as e:
-            log(f"❌ Échec d'accès à l'onglet équipement pour {c['name']} : {e}")
-            continue
-
-        if not salles:
-            log(f"⚠️ Aucune salle trouvée pour {c['name']}")
-            continue
-
-        # GÉNÉRAL
-        try:
-            page.goto(f"{base_url}/general?view_id=1")
-            page.wait_for_load_state("networkidle")
-            time.sleep(1.5)
-
-            contact_locator = page.locator("tr.contact-item").first
-            contact_locator.wait_for(timeout=5000)
-            cells = contact_locator.locator("td")
-            if cells.count() >= 3:
-                contact_nom = cells.nth(0).inner_text().strip()
-                contact_mail = cells.nth(1).inner_text().strip()
-                contact_tel = cells.nth(2).inner_text().strip()
-                log(f"📇 Contact : {contact_nom} / {contact_mail} / {contact_tel}")
+entetes_csv = [
+    "Cinéma", "Adresse du cinéma",
+    "Salle", "CNC", "Capacité", "Équipement", "Format de projection",
+    "Nom contact", "Email", "Téléphone"
+]
+champs = ["cinema", "adresse", "salle", "cnc", "capacite", "equipement", "format_projection",
+          "nom_contact", "email", "telephone"]
+
+
+async def extraire(site, identifiant, mot_de_passe, nb_contextes, headless, etat, fraicheur=FRAICHEUR, capture=False,
+                   retirer_absents=False):
+    """
+    Connexion unique, liste des cinémas, puis fiches en parallèle (nb_contextes contextes partageant la session).
+    Chaque cinéma terminé est enregistré tout de suite dans etat (EtatCrawl) : un arrêt en cours de route
+    ne perd rien et le crawl suivant reprend. Les fiches extraites depuis moins de fraicheur secondes
+    (ou dont la version annoncée par la liste n'a pas changé) ne sont pas revisitées.
+    capture : données lues dans les réponses JSON de l'application (capture_cinego.py) plutôt que dans les pages.
+    Les cinémas connus absents de la liste sont gardés (liste peut-être tronquée) sauf si retirer_absents
+    et que la liste semble complète (EtatCrawl.liste_complete).
+    Retourne toutes les lignes connues dans l'ordre des href, et le décompte nouveau/modifie/inchange/erreur.
+    """
+    lister, extraction = (lister_cinemas_capture, extraire_cinema_capture) if capture else (lister_cinemas, extraire_cinema)
+    debut = etat.demarrer()
+    async with async_playwright() as p:
+        log("Lancement de Playwright...")
+        browser = await p.chromium.launch(headless=headless)
+
+        log("Connexion en cours...")
+        etat_session = await connecter(browser, site, identifiant, mot_de_passe)
+
+        log("Navigation vers la liste des cinémas...")
+        context = await browser.new_context(storage_state=etat_session)
+        cinemas = await lister(await context.new_page(), f"{site}{cinemas_path}")
+        await context.close()
+        log(f"✅ {len(cinemas)} cinémas collectés.")
+        absents = etat.absents(c["href"] for c in cinemas)
+        if absents and retirer_absents and cinemas and etat.liste_complete(cinemas):
+            log(f"🗑️ {etat.retirer_absents(c['href'] for c in cinemas)} cinémas retirés du site oubliés.")
+        elif absents:
+            raison = "liste probablement tronquée" if retirer_absents else "--retirer-absents pour les oublier"
+            log(f"⚠️ {len(absents)} cinémas connus absents de la liste, conservés dans l'export ({raison}).")
+
+        a_faire = etat.a_extraire(cinemas, debut, fraicheur)
+        log(f"⏭️ {len(cinemas) - len(a_faire)} fiches à jour sautées, {len(a_faire)} à extraire.")
+        decompte = {"nouveau": 0, "modifie": 0, "inchange": 0, "erreur": 0}
+
+        def au_resultat(cinema, lignes, erreur):
+            statut = etat.enregistrer(cinema, lignes, erreur)
+            decompte[statut] += 1
+            if erreur:
+                log(f"❌ Échec pour {cinema['name']} : {erreur}")
+            elif not lignes:
+                log(f"⚠️ Aucune salle trouvée pour {cinema['name']}")
             else:
-                log("⚠️ Contact incomplet")
-
-            bloc_adresse_label = page.locator("text=Adresse du cinéma")
-            bloc_adresse_label.wait_for(timeout=5000)
-            bloc_adresse = bloc_adresse_label.locator("xpath=following-sibling::*[1]")
-            full_text = bloc_adresse.inner_text().strip().split("\n")
-            adresse_lines = [line.strip() for line in full_text if line.strip()][:2]
-            adresse = " - ".join(adresse_lines)
-            log(f"🏠 Adresse : {adresse}")
-
-        except Exception as e:
-            log(f"⚠️ Erreur infos générales pour {c['name']} : {e}")
-            continue
-
-        for salle, cnc, capacite, equipement, format_proj in salles:
-            data.append([
-                c["name"], adresse,
-                salle, cnc, capacite, equipement, format_proj,
-                contact_nom, contact_mail, contact_tel
-            ])
+                log(f"🎬 {sum(decompte.values())}/{len(a_faire)} - {cinema['name']} : {len(lignes)} salle(s) ({statut})")
+
+        log(f"🚀 Extraction des fiches avec {nb_contextes} contextes en parallèle...")
+        await explorer(browser, etat_session, a_faire, site, au_resultat, nb_contextes, extraction)
+        await browser.close()
+
+    etat.terminer()
+    return etat.lignes(), decompte
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export des cinémas et salles de Cinego (CSV + JSON).")
+    parser.add_argument("--contextes", type=int, default=NB_CONTEXTES, help="Fiches cinéma traitées en parallèle")
+    parser.add_argument("--headless", action="store_true", help="Navigateur sans fenêtre")
+    parser.add_argument("--site", default=site_url, help="Adresse du site (ex. serveur_fixtures.py en local)")
+    parser.add_argument("--identifiant", default=None, help="Par défaut : credentials.USERNAME")
+    parser.add_argument("--mot-de-passe", default=None, help="Par défaut : credentials.PASSWORD")
+    parser.add_argument("--capture", action="store_true",
+                        help="Lit les réponses JSON de l'application (liste en un appel) au lieu du texte des pages")
+    parser.add_argument("--sortie", default=output_csv,
+                        help="Fichier CSV ; le JSON est écrit à côté (ex. ../Geocod/testing/test.csv pour alimenter preprocess_cinemas.py)")
+    parser.add_argument("--etat", default=CHEMIN_ETAT_PAR_DEFAUT, help="Base d'état du crawl (reprise, fiches inchangées)")
+    parser.add_argument("--fraicheur", type=float, default=FRAICHEUR / 86400,
+                        help="Jours pendant lesquels une fiche extraite n'est pas revisitée (0 : tout revisiter)")
+    parser.add_argument("--retirer-absents", action="store_true",
+                        help="Oublie les cinémas absents de la liste du site (si elle compte au moins 90 %% des cinémas connus)")
+    args = parser.parse_args()
+
+    data, decompte = asyncio.run(extraire(args.site.rstrip("/"), args.identifiant or credentials.USERNAME,
+                                          args.mot_de_passe or credentials.PASSWORD, max(1, args.contextes),
+                                          args.headless, EtatCrawl(args.etat), args.fraicheur * 86400, args.capture,
+                                          args.retirer_absents))
+    log("📊 " + ", ".join(f"{n} {statut}" for statut, n in decompte.items()))
 
     if len(data) == 0:
         log("⚠️ Aucune donnée collectée, fallback de test ajouté.")
         data.append(["TEST", "TEST", "1", "000000", "100", "Numérique", "Numérique 2D", "Jean Dupont", "test@email.com", "0600000000"])
 
     log("💾 Écriture du fichier CSV...")
-    with open(output_csv, "w", newline="", encoding="utf-8") as f:
+    with open(args.sortie, "w", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
-        writer.writerow([
-            "Cinéma", "Adresse du cinéma",
-            "Salle", "CNC", "Capacité", "Équipement", "Format de projection",
-            "Nom contact", "Email", "Téléphone"
-        ])
+        writer.writerow(entetes_csv)
         writer.writerows(data)
 
     log("🧾 Génération du fichier JSON...")
-    json_output = output_csv.replace(".csv", ".json")
-    json_data = []
-
-    for row in data:
-        json_data.append({
-            "cinema": row[0],
-            "adresse": row[1],
-            "salle": row[2],
-            "cnc": row[3],
-            "capacite": row[4],
-            "equipement": row[5],
-            "format_projection": row[6],
-            "nom_contact": row[7],
-            "email": row[8],
-            "telephone": row[9]
-        })
-
-    with open(json_output, "w", encoding="utf-8") as f_json:
-        json.dump(json_data, f_json, ensure_ascii=False, indent=2)
+    json_output = args.sortie.replace(".csv", ".json")
+    # Écrit ligne par ligne, sans construire une seconde copie des données en mémoire
+    ecrire_elements(json_output, (dict(zip(champs, row)) for row in data), indent=2)
 
     log(f"✅ Extraction terminée : {len(data)} lignes exportées")
-    log(f"📁 CSV : {output_csv}")
+    log(f"📁 CSV : {args.sortie}")
     log(f"📁 JSON : {json_output}")
+    if decompte["nouveau"] or decompte["modifie"]:
+        log("➡️ Cinémas nouveaux ou modifiés : relancer preprocess_cinemas.py --incremental sur ce JSON")
+
 
-    browser.close()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# --- etat_crawl.py ---
+# État persistant (SQLite) du crawl Cinego : reprise après interruption et fiches inchangées sautées
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Geocod"))
+from connexion_sqlite import connexion_sqlite # Connexion par opération, commune aux bases SQLite
+
+CHEMIN_ETAT_PAR_DEFAUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cinego_etat.sqlite")
+FRAICHEUR = 7 * 24 * 3600  # Une fiche extraite depuis moins d'une semaine n'est pas revisitée
+PART_LISTE_COMPLETE = 0.9  # Liste plus courte que 90 % des cinémas connus : probablement tronquée
+
+
+def empreinte(lignes: list) -> str:
+    """Empreinte du contenu extrait d'un cinéma (change si une salle, l'adresse ou le contact change)."""
+    return hashlib.sha1(json.dumps(lignes, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class EtatCrawl:
+    """
+    Une ligne par fiche cinéma (href) : lignes extraites (JSON), empreinte, version annoncée par la
+    liste (mode capture, si l'API en fournit une), dates de dernière visite, de dernière extraction
+    réussie et de dernier changement de contenu, dernière erreur.
+    Chaque résultat est enregistré dès qu'il arrive : un crawl interrompu reprend là où il s'est arrêté.
+    Une connexion est ouverte par opération, comme pour CacheGeocodage.
+    """
+
+    def __init__(self, chemin: str = CHEMIN_ETAT_PAR_DEFAUT):
+        self.chemin = chemin
+        with self._connexion() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cinemas ("
+                " href TEXT PRIMARY KEY, nom TEXT NOT NULL, version TEXT, empreinte TEXT, lignes TEXT,"
+                " vu_le REAL NOT NULL, extrait_le REAL, modifie_le REAL, erreur TEXT)"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS executions (id INTEGER PRIMARY KEY, debut REAL NOT NULL, fin REAL)")
+
+    def _connexion(self):
+        return connexion_sqlite(self.chemin)
+
+    def demarrer(self) -> float:
+        """
+        Début du crawl en cours. Si le précédent ne s'est pas terminé, il est repris :
+        sa date de début est conservée et les fiches déjà extraites depuis ne sont pas refaites.
+        """
+        with self._connexion() as conn:
+            ligne = conn.execute("SELECT debut FROM executions WHERE fin IS NULL ORDER BY id DESC LIMIT 1").fetchone()
+            if ligne:
+                return ligne[0]
+            debut = time.time()
+            conn.execute("INSERT INTO executions (debut) VALUES (?)", (debut,))
+            return debut
+
+    def terminer(self):
+        with self._connexion() as conn:
+            conn.execute("UPDATE executions SET fin = ? WHERE fin IS NULL", (time.time(),))
+
+    def a_extraire(self, cinemas: list, debut: float, fraicheur: float = FRAICHEUR) -> list:
+        """
+        Cinémas à (re)visiter, dans l'ordre de cinemas : nouveaux, en erreur, version changée,
+        ou extraits il y a plus de fraicheur secondes (tous si fraicheur <= 0).
+        Les fiches extraites depuis debut sont sautées.
+        """
+        with self._connexion() as conn:
+            connus = {href: (version, extrait_le, erreur) for href, version, extrait_le, erreur
+                      in conn.execute("SELECT href, version, extrait_le, erreur FROM cinemas")}
+        limite = time.time() - fraicheur
+        retenus = []
+        for cinema in cinemas:
+            version, extrait_le, erreur = connus.get(cinema["href"], (None, None, None))
+            if extrait_le is None or erreur is not None:
+                retenus.append(cinema)
+            elif extrait_le >= debut:
+                continue  # Déjà fait dans ce crawl (reprise)
+            elif fraicheur <= 0:
+                retenus.append(cinema)
+            elif cinema.get("version") and version:
+                if cinema["version"] != version:
+                    retenus.append(cinema)
+            elif extrait_le < limite:
+                retenus.append(cinema)
+        return retenus
+
+    def enregistrer(self, cinema: dict, lignes: list, erreur: str = None) -> str:
+        """
+        Mémorise le résultat d'une fiche. En cas d'erreur, les lignes précédentes sont conservées.
+        Retourne "nouveau", "modifie", "inchange" ou "erreur".
+        """
+        maintenant = time.time()
+        with self._connexion() as conn:
+            precedent = conn.execute("SELECT empreinte FROM cinemas WHERE href = ?", (cinema["href"],)).fetchone()
+            if erreur:
+                conn.execute(
+                    "INSERT INTO cinemas (href, nom, vu_le, erreur) VALUES (?, ?, ?, ?)"
+                    " ON CONFLICT(href) DO UPDATE SET nom = excluded.nom, vu_le = excluded.vu_le, erreur = excluded.erreur",
+                    (cinema["href"], cinema["name"], maintenant, erreur),
+                )
+                return "erreur"
+            nouvelle = empreinte(lignes)
+            statut = "nouveau" if not precedent or precedent[0] is None else "inchange" if precedent[0] == nouvelle else "modifie"
+            conn.execute(
+                "INSERT INTO cinemas (href, nom, version, empreinte, lignes, vu_le, extrait_le, modifie_le, erreur)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, NULL)"
+                " ON CONFLICT(href) DO UPDATE SET nom = excluded.nom, version = excluded.version,"
+                " empreinte = excluded.empreinte, lignes = excluded.lignes, vu_le = excluded.vu_le,"
+                " extrait_le = excluded.extrait_le, erreur = NULL,"
+                " modifie_le = CASE WHEN cinemas.empreinte IS excluded.empreinte THEN cinemas.modifie_le ELSE excluded.modifie_le END",
+                (cinema["href"], cinema["name"], cinema.get("version"), nouvelle,
+                 json.dumps(lignes, ensure_ascii=False), maintenant, maintenant, maintenant),
+            )
+            return statut
+
+    def nombre(self) -> int:
+        """Nombre de cinémas connus."""
+        with self._connexion() as conn:
+            return conn.execute("SELECT COUNT(*) FROM cinemas").fetchone()[0]
+
+    def liste_complete(self, cinemas: list) -> bool:
+        """
+        Faux si la liste lue sur le site compte moins de PART_LISTE_COMPLETE des cinémas connus :
+        un parcours interrompu (défilement sans réponse) ne doit pas faire oublier les autres.
+        """
+        return len(cinemas) >= PART_LISTE_COMPLETE * self.nombre()
+
+    def absents(self, hrefs) -> list:
+        """Fiches connues qui ne sont pas dans hrefs (liste du site)."""
+        hrefs = set(hrefs)
+        with self._connexion() as conn:
+            return [h for (h,) in conn.execute("SELECT href FROM cinemas ORDER BY href") if h not in hrefs]
+
+    def retirer_absents(self, hrefs) -> int:
+        """Oublie les fiches qui ne sont plus dans la liste du site. Retourne le nombre de fiches retirées."""
+        absents = self.absents(hrefs)
+        with self._connexion() as conn:
+            conn.executemany("DELETE FROM cinemas WHERE href = ?", [(h,) for h in absents])
+        return len(absents)
+
+    def lignes(self, cinemas: list = None) -> list:
+        """
+        Dernières lignes connues de chaque cinéma, dans l'ordre de cinemas, ou de tous les cinémas
+        connus par href (ordre de la liste du site) si cinemas vaut None : export complet.
+        """
+        with self._connexion() as conn:
+            par_href = {href: json.loads(lignes) for href, lignes
+                        in conn.execute("SELECT href, lignes FROM cinemas WHERE lignes IS NOT NULL ORDER BY href")}
+        if cinemas is None:
+            return [ligne for lignes in par_href.values() for ligne in lignes]
+        return [ligne for c in cinemas for ligne in par_href.get(c["href"], [])]
@@ -0,0 +1,166 @@
+# --- moteur_cinego.py ---
+# Moteur d'extraction Cinego asynchrone : une session authentifiée partagée par N contextes Playwright
+# -*- coding: utf-8 -*-
+
+import asyncio
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+NB_CONTEXTES = 4      # Fiches cinéma ouvertes en parallèle
+DELAI_SELECTEUR = 10000  # ms : attente maximale d'un élément de page (remplace les time.sleep fixes)
+DELAI_DEFILEMENT = 2000  # ms : sans nouvelle ligne après un défilement, la liste est terminée
+TENTATIVES = 2
+PAS_DEFILEMENT = 600
+
+# Une ligne du tableau d'équipement -> textes des cellules (un seul aller-retour navigateur par page)
+JS_LIGNES_TABLEAU = "rows => rows.slice(1).map(r => Array.from(r.querySelectorAll('td'), td => td.innerText.trim()))"
+JS_LIENS = "links => links.map(a => [a.innerText.trim(), a.getAttribute('href')])"
+JS_DERNIER_LIEN_CHANGE = """prev => {
+    const liens = document.querySelectorAll('a.link-content');
+    return liens.length > 0 && liens[liens.length - 1].innerText.trim() !== prev;
+}"""
+
+
+def log(msg):
+    print(f"[🧩] {msg}")
+
+
+async def ouvrir(page, url: str):
+    """
+    Navigation complète vers url. Avec le routage par fragment (#/...) de l'application, un simple
+    changement d'URL garde la vue précédente affichée pendant le chargement : les attentes de
+    sélecteurs trouveraient alors le tableau du cinéma précédent.
+    """
+    await page.goto("about:blank")
+    await page.goto(url)
+
+
+async def connecter(browser, url_connexion: str, identifiant: str, mot_de_passe: str) -> dict:
+    """Se connecte une seule fois et retourne l'état de session (cookies + localStorage) à partager."""
+    context = await browser.new_context()
+    page = await context.new_page()
+    await page.goto(url_connexion)
+    await page.fill('input[placeholder="Nom d\'utilisateur"]', identifiant)
+    await page.fill('input[placeholder="Mot de passe"]', mot_de_passe)
+    await page.click("button:has-text('Se connecter')")
+    await page.wait_for_load_state("networkidle")
+    etat = await context.storage_state()
+    await context.close()
+    return etat
+
+
+async def lister_cinemas(page, url_liste: str) -> list:
+    """
+    Parcourt la liste virtuelle (cdk-virtual-scroll-viewport) : après chaque défilement, on attend
+    que la dernière ligne affichée change plutôt qu'une pause fixe. Retourne [{"name", "href"}] triés par href.
+    """
+    await page.goto(url_liste)
+    await page.wait_for_selector("a.link-content", timeout=DELAI_SELECTEUR)
+    viewport = await page.query_selector("cdk-virtual-scroll-viewport")
+    if not viewport:
+        raise Exception("Scroll container not found")
+
+    vus = {}
+    while True:
+        liens = await page.eval_on_selector_all("a.link-content", JS_LIENS)
+        for nom, href in liens:
+            if nom and href and nom not in vus:
+                vus[nom] = href
+        dernier = liens[-1][0] if liens else ""
+        await viewport.evaluate(f"el => el.scrollBy(0, {PAS_DEFILEMENT})")
+        try:
+            await page.wait_for_function(JS_DERNIER_LIEN_CHANGE, arg=dernier, timeout=DELAI_DEFILEMENT)
+        except PlaywrightTimeoutError:
+            break  # Plus rien ne défile : fin de la liste
+    return sorted(({"name": nom, "href": href} for nom, href in vus.items()), key=lambda c: c["href"])
+
+
+async def extraire_salles(page, url_fiche: str) -> list:
+    """Onglet équipement : [(salle, cnc, capacite, equipement, format_projection)]."""
+    await ouvrir(page, f"{url_fiche}/equipement?view_id=1")
+    await page.wait_for_selector("table", timeout=DELAI_SELECTEUR)
+    try:
+        # Les lignes sont rendues après le tableau : on attend la première ligne de données
+        await page.wait_for_selector("table tr:nth-child(2) td", timeout=DELAI_SELECTEUR)
+    except PlaywrightTimeoutError:
+        return []  # Tableau sans salle
+    salles = []
+    for cols in await page.eval_on_selector_all("table tr", JS_LIGNES_TABLEAU):
+        if len(cols) < 6:
+            continue
+        salle, cnc, capacite, _, equipement, format_proj = cols[:6]
+        if salle and salle[0].isdigit():
+            salles.append((salle, cnc, capacite, equipement, format_proj))
+    return salles
+
+
+async def extraire_general(page, url_fiche: str):
+    """Onglet général : (adresse, nom contact, email, téléphone)."""
+    await ouvrir(page, f"{url_fiche}/general?view_id=1")
+    contact = page.locator("tr.contact-item").first
+    await contact.wait_for(timeout=DELAI_SELECTEUR)
+    cellules = await contact.locator("td").all_inner_texts()
+    contact_nom, contact_mail, contact_tel = ([c.strip() for c in cellules] + ["", "", ""])[:3]
+
+    libelle = page.locator("text=Adresse du cinéma")
+    await libelle.wait_for(timeout=DELAI_SELECTEUR)
+    texte = await libelle.locator("xpath=following-sibling::*[1]").inner_text()
+    adresse = " - ".join([ligne.strip() for ligne in texte.strip().split("\n") if ligne.strip()][:2])
+    return adresse, contact_nom, contact_mail, contact_tel
+
+
+async def extraire_cinema(page, url_site: str, cinema: dict) -> list:
+    """Lignes CSV d'un cinéma (une par salle). Lève une exception si une page ne répond pas."""
+    url_fiche = f"{url_site}{cinema['href'].split('?')[0]}"
+    salles = await extraire_salles(page, url_fiche)
+    if not salles:
+        return []
+    adresse, contact_nom, contact_mail, contact_tel = await extraire_general(page, url_fiche)
+    return [[cinema["name"], adresse, salle, cnc, capacite, equipement, format_proj, contact_nom, contact_mail, contact_tel]
+            for salle, cnc, capacite, equipement, format_proj in salles]
+
+
+async def explorer(browser, etat_session: dict, cinemas: list, url_site: str, au_resultat,
+                   nb_contextes: int = NB_CONTEXTES, extraction=extraire_cinema):
+    """
+    Traite les cinémas avec nb_contextes contextes (même session) alimentés par une file bornée.
+    au_resultat(cinema, lignes, erreur) est appelé dès qu'un cinéma est terminé, dans la boucle
+    asyncio (un seul écrivain : pas de verrou nécessaire) ; s'il échoue, l'erreur est journalisée et
+    le crawl continue. extraction(page, url_site, cinema) : extraire_cinema (texte des pages) ou
+    capture_cinego.extraire_cinema_capture (réponses JSON).
+    Si un contexte ne peut pas être ouvert, les autres tâches sont annulées et l'erreur est levée.
+    """
+    file = asyncio.Queue(maxsize=nb_contextes * 2)
+
+    async def alimenter():
+        for cinema in cinemas:
+            await file.put(cinema)
+        for _ in range(nb_contextes):
+            await file.put(None)  # Un signal de fin par contexte
+
+    async def travailleur():
+        context = await browser.new_context(storage_state=etat_session)
+        try:
+            page = await context.new_page()
+            while (cinema := await file.get()) is not None:
+                lignes, erreur = [], None
+                for tentative in range(TENTATIVES):
+                    try:
+                        lignes, erreur = await extraction(page, url_site, cinema), None
+                        break
+                    except Exception as e:  # Timeout, page d'erreur... : nouvelle tentative puis échec
+                        erreur = str(e).splitlines()[0] if str(e) else type(e).__name__
+                try:
+                    au_resultat(cinema, lignes, erreur)
+                except Exception as e:  # Écriture de l'état impossible : ce cinéma sera repris au prochain crawl
+                    log(f"❌ Résultat non enregistré pour {cinema.get('name')} : {e}")
+        finally:
+            await context.close()
+
+    # Sans groupe de tâches, un travailleur mort laisserait alimenter() bloqué sur la file pleine
+    try:
+        async with asyncio.TaskGroup() as groupe:
+            groupe.create_task(alimenter())
+            for _ in range(nb_contextes):
+                groupe.create_task(travailleur())
+    except ExceptionGroup as erreurs:
+        raise erreurs.exceptions[0]
@@ -0,0 +1,102 @@
+# --- payloads_cinego.py ---
+# Conversion des réponses JSON de l'API Cinego en lignes d'export (sans navigateur : testable sans Playwright)
+# -*- coding: utf-8 -*-
+
+MODELE_HREF = "/#/cinemas/{id}?view_id=1"  # Lien de la fiche, comme dans la liste affichée
+# Date ou numéro de version d'un cinéma dans la liste : s'il ne change pas, la fiche n'est pas revisitée (etat_crawl.py)
+CLES_VERSION = ("updated_at", "updatedat", "date_modification", "modifie_le", "last_modified", "lastmodified", "version")
+# Clés enveloppant une liste dans les réponses paginées ({"data": [...]}, {"items": [...]}...)
+CLES_ENVELOPPE = ("data", "items", "results", "content", "rows")
+
+
+def _champ(element: dict, *cles, defaut=""):
+    """Première clé présente (sans tenir compte de la casse) parmi cles."""
+    if not isinstance(element, dict):
+        return defaut
+    minuscules = {str(k).lower(): v for k, v in element.items()}
+    for cle in cles:
+        valeur = minuscules.get(cle)
+        if valeur not in (None, ""):
+            return valeur
+    return defaut
+
+
+def _elements(payload) -> list:
+    """Liste contenue dans une réponse : la réponse elle-même ou son enveloppe."""
+    if isinstance(payload, list):
+        return payload
+    if isinstance(payload, dict):
+        for cle in CLES_ENVELOPPE:
+            if isinstance(payload.get(cle), list):
+                return payload[cle]
+    return []
+
+
+def _texte(valeur) -> str:
+    return str(valeur).strip() if valeur is not None else ""
+
+
+def cinemas_depuis_liste(payload) -> list:
+    """
+    Réponse de la liste -> [{"name", "href"}] triés par href (même forme que lister_cinemas),
+    avec "version" quand l'API indique une date de modification.
+    """
+    cinemas, vus = [], set()
+    for element in _elements(payload):
+        ident = _texte(_champ(element, "id", "uuid", "cinema_id"))
+        nom = _texte(_champ(element, "nom", "name", "libelle", "label", "title"))
+        if ident and nom and nom not in vus:
+            vus.add(nom)
+            cinema = {"name": nom, "href": MODELE_HREF.format(id=ident)}
+            version = _texte(_champ(element, *CLES_VERSION))
+            if version:
+                cinema["version"] = version
+            cinemas.append(cinema)
+    return sorted(cinemas, key=lambda c: c["href"])
+
+
+def salles_depuis_equipement(payload) -> list:
+    """Réponse de l'onglet équipement -> [(salle, cnc, capacite, equipement, format_projection)]."""
+    salles = []
+    for element in _elements(payload):
+        salle = _texte(_champ(element, "salle", "numero", "number", "nom", "name"))
+        if not salle or not salle[0].isdigit():
+            continue  # Mêmes lignes ignorées que dans le tableau affiché
+        salles.append((
+            salle,
+            _texte(_champ(element, "cnc", "numero_cnc", "code_cnc", "cnc_code")),
+            _texte(_champ(element, "capacite", "fauteuils", "places", "seats", "capacity")),
+            _texte(_champ(element, "equipement", "equipment", "projection")),
+            _texte(_champ(element, "format_projection", "format", "projection_format")),
+        ))
+    return salles
+
+
+def _adresse(valeur) -> str:
+    """Adresse en liste de lignes, en texte multiligne ou en champs séparés -> 'ligne 1 - ligne 2'."""
+    if isinstance(valeur, dict):
+        rue = _texte(_champ(valeur, "adresse", "rue", "street", "ligne1", "line1"))
+        ville = " ".join(_texte(_champ(valeur, *cles)) for cles in (("code_postal", "cp", "zip", "postal_code"),
+                                                                     ("ville", "commune", "city")))
+        lignes = [rue, ville]
+    elif isinstance(valeur, list):
+        lignes = [_texte(v) for v in valeur]
+    else:
+        lignes = _texte(valeur).split("\n")
+    return " - ".join([ligne.strip() for ligne in lignes if ligne.strip()][:2])
+
+
+def general_depuis_payload(payload):
+    """Réponse de l'onglet général -> (adresse, nom contact, email, téléphone)."""
+    if isinstance(payload, dict) and isinstance(payload.get("data"), dict):
+        payload = payload["data"]
+    contact = _champ(payload, "contact", defaut=None)
+    if not isinstance(contact, dict):
+        contacts = _elements(_champ(payload, "contacts", defaut=[]))
+        contact = contacts[0] if contacts else {}
+    return (
+        _adresse(_champ(payload, "adresse", "address")),
+        _texte(_champ(contact, "nom", "name")),
+        _texte(_champ(contact, "email", "mail")),
+        _texte(_champ(contact, "telephone", "tel", "phone")),
+    )
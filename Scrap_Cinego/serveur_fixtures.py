@@ -0,0 +1,152 @@
+# --- serveur_fixtures.py ---
+# Faux back-office Cinego local (application à routage #/ + API JSON protégée par cookie) pour les tests du moteur
+# Usage : python serveur_fixtures.py [--cinemas 50] [--latence 0.05] [--port 8765]
+# -*- coding: utf-8 -*-
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+IDENTIFIANT, MOT_DE_PASSE = "test", "secret"
+COOKIE_SESSION = "session=fixture"
+
+PAGE = """<!doctype html><html><head><meta charset="utf-8"><title>Cinego (fixtures)</title></head><body>
+<div id="app"></div>
+<script>
+const app = document.getElementById('app');
+const HAUTEUR_LIGNE = 30;
+async function api(chemin) {
+  const r = await fetch(chemin, {credentials: 'same-origin'});
+  if (r.status === 401) { location.hash = '#/login'; throw new Error('401'); }
+  return r.json();
+}
+function connexion() {
+  app.innerHTML = `<input placeholder="Nom d'utilisateur"><input type="password" placeholder="Mot de passe">
+    <button>Se connecter</button>`;
+  app.querySelector('button').onclick = async () => {
+    const [u, p] = app.querySelectorAll('input');
+    const r = await fetch('/api/login', {method: 'POST', body: JSON.stringify({u: u.value, p: p.value})});
+    if (r.ok) location.hash = '#/cinemas/list?view_id=1';
+  };
+}
+async function liste() {
+  const cinemas = await api('/api/cinemas');
+  app.innerHTML = `<cdk-virtual-scroll-viewport style="display:block;height:300px;overflow:auto;position:relative">
+    <div style="height:${cinemas.length * HAUTEUR_LIGNE}px"></div><div class="rows" style="position:absolute;top:0;left:0"></div>
+    </cdk-virtual-scroll-viewport>`;
+  const viewport = app.querySelector('cdk-virtual-scroll-viewport'), rows = app.querySelector('.rows');
+  const rendre = () => {  // Rendu virtuel : seules les lignes visibles existent dans le DOM
+    const debut = Math.max(0, Math.floor(viewport.scrollTop / HAUTEUR_LIGNE) - 2);
+    rows.style.top = (debut * HAUTEUR_LIGNE) + 'px';
+    rows.innerHTML = cinemas.slice(debut, debut + 14).map(c =>
+      `<div style="height:${HAUTEUR_LIGNE}px"><a class="link-content" href="/#/cinemas/${c.id}?view_id=1">${c.nom}</a></div>`).join('');
+  };
+  viewport.addEventListener('scroll', () => requestAnimationFrame(rendre));
+  rendre();
+}
+async function equipement(id) {
+  app.innerHTML = '<table><tr><th>Salle</th><th>CNC</th><th>Fauteuils</th><th>Statut</th><th>Équipement</th><th>Format</th></tr></table>';
+  const salles = await api(`/api/cinemas/${id}/equipement`);
+  app.querySelector('table').insertAdjacentHTML('beforeend', salles.map(s =>
+    `<tr><td>${s.salle}</td><td>${s.cnc}</td><td>${s.capacite}</td><td>Active</td><td>${s.equipement}</td><td>${s.format_projection}</td></tr>`).join(''));
+}
+async function general(id) {
+  const g = await api(`/api/cinemas/${id}/general`);
+  app.innerHTML = `<table><tr class="contact-item"><td>${g.contact.nom}</td><td>${g.contact.email}</td><td>${g.contact.telephone}</td></tr></table>
+    <div><span>Adresse du cinéma</span><div>${g.adresse.join('<br>')}</div></div>`;
+}
+function router() {
+  const m = (location.hash.split('?')[0] || '#/login').match(/^#\\/cinemas\\/(\\w+)(?:\\/(\\w+))?$/);
+  if (location.hash.startsWith('#/cinemas/list')) return liste();
+  if (m && m[2] === 'equipement') return equipement(m[1]);
+  if (m && m[2] === 'general') return general(m[1]);
+  return connexion();
+}
+window.addEventListener('hashchange', router);
+router();
+</script></body></html>"""
+
+
+def cinemas_factices(nombre: int) -> list:
+    """Cinémas déterministes : identifiant, nom, adresse sur deux lignes, contact et 1 à 4 salles."""
+    cinemas = []
+    for i in range(1, nombre + 1):
+        cinemas.append({
+            "id": f"c{i:04d}", "nom": f"Cinéma Test {i:04d}", "modifie_le": "2026-01-01T00:00:00",
+            "adresse": [f"{i} rue du Test", f"{75000 + i % 20:05d} Paris"],
+            "contact": {"nom": f"Contact {i}", "email": f"contact{i}@exemple.fr", "telephone": f"01{i:08d}"},
+            "salles": [{"salle": str(n), "cnc": f"{i:04d}{n:02d}", "capacite": str(80 + 10 * n),
+                        "equipement": "Numérique", "format_projection": "Numérique 2D"} for n in range(1, 2 + i % 4)],
+        })
+    return cinemas
+
+
+def creer_serveur(nombre: int = 50, latence: float = 0.05, port: int = 0) -> ThreadingHTTPServer:
+    """Serveur prêt à démarrer (port 0 : port libre choisi par le système, voir serveur.server_address)."""
+    cinemas = cinemas_factices(nombre)
+    par_id = {c["id"]: c for c in cinemas}
+
+    class Gestionnaire(BaseHTTPRequestHandler):
+        def _repondre(self, statut, corps, type_contenu="application/json", entetes=()):
+            donnees = corps.encode("utf-8")
+            self.send_response(statut)
+            self.send_header("Content-Type", f"{type_contenu}; charset=utf-8")
+            self.send_header("Content-Length", str(len(donnees)))
+            for nom, valeur in entetes:
+                self.send_header(nom, valeur)
+            self.end_headers()
+            self.wfile.write(donnees)
+
+        def do_GET(self):
+            chemin = self.path.split("?")[0]
+            if not chemin.startswith("/api/"):
+                return self._repondre(200, PAGE, "text/html")
+            if COOKIE_SESSION not in (self.headers.get("Cookie") or ""):
+                return self._repondre(401, "{}")
+            time.sleep(latence)  # Temps de réponse du back-office
+            parties = chemin.strip("/").split("/")
+            if parties == ["api", "cinemas"]:
+                return self._repondre(200, json.dumps([{"id": c["id"], "nom": c["nom"], "modifie_le": c["modifie_le"]}
+                                                    for c in cinemas]))
+            if len(parties) == 4 and parties[2] in par_id:
+                cinema = par_id[parties[2]]
+                if parties[3] == "equipement":
+                    return self._repondre(200, json.dumps(cinema["salles"]))
+                if parties[3] == "general":
+                    return self._repondre(200, json.dumps({"adresse": cinema["adresse"], "contact": cinema["contact"]}))
+            self._repondre(404, "{}")
+
+        def do_POST(self):
+            corps = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            if self.path == "/api/login" and corps.get("u") == IDENTIFIANT and corps.get("p") == MOT_DE_PASSE:
+                return self._repondre(200, "{}", entetes=[("Set-Cookie", f"{COOKIE_SESSION}; Path=/")])
+            self._repondre(403, "{}")
+
+        def log_message(self, *args):
+            pass
+
+    return ThreadingHTTPServer(("127.0.0.1", port), Gestionnaire)
+
+
+def demarrer(nombre: int = 50, latence: float = 0.05, port: int = 0):
+    """Démarre le serveur dans un thread. Retourne (serveur, url) ; serveur.shutdown() pour l'arrêter."""
+    serveur = creer_serveur(nombre, latence, port)
+    threading.Thread(target=serveur.serve_forever, daemon=True).start()
+    return serveur, f"http://127.0.0.1:{serveur.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Faux back-office Cinego pour tester cinego.py hors ligne.")
+    parser.add_argument("--cinemas", type=int, default=50)
+    parser.add_argument("--latence", type=float, default=0.05, help="Secondes par appel d'API")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    serveur = creer_serveur(args.cinemas, args.latence, args.port)
+    print(f"http://127.0.0.1:{args.port} (identifiant {IDENTIFIANT!r}, mot de passe {MOT_DE_PASSE!r})")
+    serveur.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""
+État du crawl Cinego (etat_crawl.py) : reprise après interruption, fiches inchangées sautées
+et cinémas absents d'une liste tronquée conservés.
+"""
+
+from etat_crawl import EtatCrawl
+
+
+def test_etat_crawl_reprise_et_fiches_inchangees(tmp_path):
+    etat = EtatCrawl(str(tmp_path / "etat.sqlite"))
+    a, b, c = ({"name": n, "href": f"/#/cinemas/{n}", "version": "v1"} for n in "abc")
+    debut = etat.demarrer()
+    assert etat.a_extraire([a, b, c], debut) == [a, b, c]
+    assert etat.enregistrer(a, [["a", "1"]]) == "nouveau"
+    assert etat.enregistrer(b, [], "Timeout") == "erreur"
+    # Interruption : le crawl repris garde son début, a n'est pas refait, b (en erreur) l'est
+    assert etat.demarrer() == debut
+    assert etat.a_extraire([a, b, c], debut) == [b, c]
+    etat.enregistrer(b, [["b", "1"]])
+    etat.enregistrer(c, [["c", "1"]])
+    etat.terminer()
+
+    debut = etat.demarrer()
+    assert debut > 0 and etat.a_extraire([a, b, c], debut) == []  # Versions inchangées, fiches fraîches
+    c2 = dict(c, version="v2")
+    assert etat.a_extraire([a, b, c2], debut) == [c2]
+    assert etat.a_extraire([{"name": "a", "href": a["href"]}], debut, fraicheur=0) == [{"name": "a", "href": a["href"]}]
+    assert etat.a_extraire([a, b, c], debut, fraicheur=0) == [a, b, c]  # « 0 : tout revisiter », même à version égale
+    assert etat.enregistrer(c2, [["c", "1"]]) == "inchange"
+    assert etat.enregistrer(a, [["a", "2"]]) == "modifie"
+    # Liste tronquée (1 cinéma sur 3) : les absents restent connus et exportés
+    assert not etat.liste_complete([a]) and etat.absents([a["href"]]) == [b["href"], c["href"]]
+    assert etat.lignes() == [["a", "2"], ["b", "1"], ["c", "1"]]
+    assert etat.liste_complete([a, b, c]) and not etat.liste_complete([a, c])
+    assert etat.retirer_absents([a["href"], c["href"]]) == 1
+    assert etat.lignes([c, b, a]) == [["c", "1"], ["a", "2"]]
@@ -0,0 +1,100 @@
+import asyncio
+import pytest
+
+pytest.importorskip("playwright")
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError, async_playwright
+
+from moteur_cinego import connecter, explorer, extraire_cinema, lister_cinemas
+from capture_cinego import extraire_cinema_capture, lister_cinemas_capture
+from serveur_fixtures import IDENTIFIANT, MOT_DE_PASSE, cinemas_factices, demarrer
+
+NB_CINEMAS = 30
+
+
+@pytest.fixture(scope="module")
+def site():
+    serveur, url = demarrer(NB_CINEMAS, latence=0.02)
+    yield url
+    serveur.shutdown()
+
+
+async def _extraire(url, nb_contextes, capture=False):
+    lister, extraction = (lister_cinemas_capture, extraire_cinema_capture) if capture else (lister_cinemas, extraire_cinema)
+    async with async_playwright() as p:
+        try:
+            browser = await p.chromium.launch()
+        except Exception as e:  # Navigateur non installé (playwright install chromium)
+            pytest.skip(f"Chromium indisponible : {e}")
+        etat = await connecter(browser, url, IDENTIFIANT, MOT_DE_PASSE)
+        context = await browser.new_context(storage_state=etat)
+        cinemas = await lister(await context.new_page(), f"{url}/#/cinemas/list?view_id=1")
+        await context.close()
+        resultats = {}
+        await explorer(browser, etat, cinemas, url,
+                       lambda cinema, lignes, erreur: resultats.__setitem__(cinema["name"], (lignes, erreur)), nb_contextes, extraction)
+        await browser.close()
+    return cinemas, resultats
+
+
+@pytest.mark.parametrize("capture", [False, True])
+def test_extraction_parallele_complete(site, capture):
+    cinemas, resultats = asyncio.run(_extraire(site, nb_contextes=4, capture=capture))
+    attendus = cinemas_factices(NB_CINEMAS)
+    # Liste virtuelle entièrement parcourue, triée par href
+    assert [c["name"] for c in cinemas] == [c["nom"] for c in attendus]
+    for cinema in attendus:
+        lignes, erreur = resultats[cinema["nom"]]
+        assert erreur is None
+        # Chaque contexte réutilise la session : l'API (protégée par cookie) a bien répondu
+        assert [ligne[3] for ligne in lignes] == [s["cnc"] for s in cinema["salles"]]
+        assert {ligne[1] for ligne in lignes} == {" - ".join(cinema["adresse"])}
+        assert {ligne[8] for ligne in lignes} == {cinema["contact"]["email"]}
+
+
+class NavigateurFactice:
+    """Contextes sans page réelle ; le contexte n° echec ne peut pas être ouvert."""
+
+    def __init__(self, echec=None):
+        self.echec, self.ouverts, self.fermes = echec, 0, 0
+
+    async def new_context(self, storage_state=None):
+        self.ouverts += 1
+        if self.ouverts == self.echec:
+            raise RuntimeError("navigateur fermé")
+        navigateur = self
+
+        class Contexte:
+            async def new_page(self):
+                return None
+
+            async def close(self):
+                navigateur.fermes += 1
+        return Contexte()
+
+
+async def _extraction_factice(page, url_site, cinema):
+    await asyncio.sleep(0.001)
+    if cinema["name"] == "3":
+        raise PlaywrightTimeoutError("Timeout 10000ms exceeded.\nDétails")
+    return [[cinema["name"]]]
+
+
+def test_explorer_resultat_en_erreur_puis_travailleur_mort():
+    cinemas = [{"name": str(i), "href": f"/#/cinemas/{i}"} for i in range(40)]
+    resultats = {}
+
+    def au_resultat(cinema, lignes, erreur):
+        if cinema["name"] == "5":
+            raise OSError("disque plein")  # Journalisé, les autres cinémas sont traités
+        resultats[cinema["name"]] = (lignes, erreur)
+
+    navigateur = NavigateurFactice()
+    asyncio.run(asyncio.wait_for(explorer(navigateur, {}, cinemas, "", au_resultat, 3, _extraction_factice), 5))
+    assert len(resultats) == 39 and resultats["3"] == ([], "Timeout 10000ms exceeded.")
+    assert navigateur.fermes == 3
+
+    # Un contexte impossible à ouvrir : erreur levée au lieu d'une file pleine attendue indéfiniment
+    navigateur = NavigateurFactice(echec=2)
+    with pytest.raises(RuntimeError, match="navigateur fermé"):
+        asyncio.run(asyncio.wait_for(explorer(navigateur, {}, cinemas, "", lambda *_: None, 3, _extraction_factice), 5))
+    assert navigateur.fermes == navigateur.ouverts - 1
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+"""
+Conversion des réponses JSON de l'API Cinego (payloads_cinego.py) : enveloppes, clés anglaises
+et adresses en champs séparés donnent les mêmes lignes que le texte des pages.
+"""
+
+from payloads_cinego import cinemas_depuis_liste, general_depuis_payload, salles_depuis_equipement
+
+
+def test_conversion_reponses_json():
+    # Formes de réponse courantes : liste enveloppée, clés anglaises, adresse en champs séparés
+    assert cinemas_depuis_liste({"data": [{"id": 7, "name": "B"}, {"id": 3, "name": "A"}, {"id": 9, "name": "A"}]}) == [
+        {"name": "A", "href": "/#/cinemas/3?view_id=1"}, {"name": "B", "href": "/#/cinemas/7?view_id=1"}]
+    assert salles_depuis_equipement({"items": [{"Number": 1, "CNC": "123", "seats": 90, "equipment": "Num", "format": "2D"},
+                                               {"number": "Total", "seats": 90}]}) == [("1", "123", "90", "Num", "2D")]
+    assert general_depuis_payload({"address": {"street": "1 rue A", "zip": "75001", "city": "Paris"},
+                                   "contacts": [{"name": "Jo", "mail": "jo@a.fr", "phone": "01"}]}) == (
+        "1 rue A - 75001 Paris", "Jo", "jo@a.fr", "01")
+    assert general_depuis_payload({"adresse": "1 rue A\n75001 Paris\nFrance"}) == ("1 rue A - 75001 Paris", "", "", "")